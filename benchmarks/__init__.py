@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+性能测量脚本，在项目根目录以 python -m benchmarks.<名称> 运行。
+应用在临时目录中创建，不会读写项目目录中的会话和排行榜数据文件
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 切换到临时目录后仍能导入game、server和utils包
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@contextmanager
+def isolated_dir() -> Iterator[str]:
+    """
+    切换到临时目录并放入项目配置的副本（关闭会话持久化，排行榜文件在临时目录中），产出该目录；
+    在其中首次导入server.leaderboard时，全局排行榜也建在临时目录中。退出时恢复工作目录并删除临时目录
+    """
+    temp_dir = tempfile.mkdtemp(prefix='2048-bench-')
+    cwd = os.getcwd()
+    try:
+        with open(os.path.join(ROOT, 'game_config.json'), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        config['game_store']['persist_file'] = ''
+        config['leaderboard']['storage'] = 'json'
+        config['leaderboard']['data_file'] = os.path.join(temp_dir, 'leaderboard.json')
+        with open(os.path.join(temp_dir, 'game_config.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False)
+        os.chdir(temp_dir)
+        yield temp_dir
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@contextmanager
+def isolated_app() -> Iterator:
+    """在isolated_dir中换用临时排行榜，产出create_app"""
+    with isolated_dir() as temp_dir:
+        import server.flask_app
+        from server.leaderboard import LeaderboardManager
+        saved = server.flask_app.leaderboard
+        server.flask_app.leaderboard = LeaderboardManager(os.path.join(temp_dir, 'leaderboard.json'), autosave=False)
+        try:
+            yield server.flask_app.create_app
+        finally:
+            server.flask_app.leaderboard = saved
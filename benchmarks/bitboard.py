@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+4x4位棋盘引擎的移动速度
+用法: python -m benchmarks.bitboard
+
+原始的列表引擎game.game_logic不在代码库中，对照使用同样支持4x4的CachedGame2048
+"""
+
+import random
+import time
+from typing import Dict
+
+from game.bitboard import SIZE, BitboardGame2048
+from game.cached_game import CachedGame2048
+
+
+def benchmark(moves: int = 100000, seed: int = 0) -> Dict[str, float]:
+    """
+    对比位棋盘与CachedGame2048的每秒移动次数
+    
+    Args:
+        moves: 每个引擎执行的移动次数
+        seed: 随机种子
+    
+    Returns:
+        引擎名称到每秒移动次数的映射
+    """
+    def run(factory):
+        rng = random.Random(seed)
+        directions = ('left', 'right', 'up', 'down')
+        game = factory()
+        start = time.perf_counter()
+        for _ in range(moves):
+            direction = directions[rng.randrange(4)]
+            getattr(game, 'move_' + direction)()
+            if game.game_over:
+                game = factory()
+        return moves / (time.perf_counter() - start)
+    
+    return {
+        'bitboard': run(lambda: BitboardGame2048(seed=seed)),
+        'cached': run(lambda: CachedGame2048(SIZE, seed=seed))
+    }
+
+
+if __name__ == '__main__':
+    for name, rate in benchmark().items():
+        print(f"{name}: {rate:,.0f} 次移动/秒")
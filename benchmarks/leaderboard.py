@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+JSON排行榜在不同规模下的更新和排名查询速度
+用法: python -m benchmarks.leaderboard
+"""
+
+import os
+import random
+import time
+from typing import Dict
+
+from benchmarks import isolated_dir
+
+
+def benchmark(sizes=(100, 10000, 1000000), operations: int = 2000) -> Dict[int, Dict[str, float]]:
+    """
+    测量不同排行榜规模下的更新和排名查询速度（不写文件）
+    
+    Returns:
+        规模 -> {'upserts_per_sec', 'ranks_per_sec', 'player_ranks_per_sec'}
+    """
+    with isolated_dir():
+        from server.leaderboard import LeaderboardManager
+        rng = random.Random(0)
+        results = {}
+        for size in sizes:
+            manager = LeaderboardManager(data_file=os.devnull, autosave=False)
+            manager._rebuild([
+                {'score': rng.randrange(100000), 'max_tile': 0, 'moves': 0, 'size': 4, 'player_name': f"p{i}"}
+                for i in range(size)
+            ])
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.add_or_update_score(f"p{rng.randrange(size * 2)}", rng.randrange(100000), 0, 0, 4)
+            upsert_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.get_rank_by_score(rng.randrange(100000))
+            rank_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.get_player_rank(f"p{rng.randrange(size)}", around=5)
+            player_rank_time = time.perf_counter() - start
+            
+            results[size] = {
+                'upserts_per_sec': operations / upsert_time,
+                'ranks_per_sec': operations / rank_time,
+                'player_ranks_per_sec': operations / player_rank_time
+            }
+    return results
+
+
+if __name__ == '__main__':
+    for size, rates in benchmark().items():
+        print(f"{size:>8} 条: 更新 {rates['upserts_per_sec']:,.0f} 次/秒, 排名查询 {rates['ranks_per_sec']:,.0f} 次/秒, "
+              f"玩家名次查询 {rates['player_ranks_per_sec']:,.0f} 次/秒")
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+单人游戏移动：REST与Socket.IO的单步延迟和CPU开销
+用法: python -m benchmarks.move_channel
+"""
+
+import time
+from typing import Any, Dict
+
+from benchmarks import isolated_app
+
+
+def benchmark(moves: int = 2000) -> Dict[str, Dict[str, float]]:
+    """
+    在进程内分别通过REST和Socket.IO执行moves次移动，
+    统计单步平均延迟和CPU时间（不含网络传输）
+    """
+    directions = ('left', 'up', 'right', 'down')
+    results = {}
+    with isolated_app() as create_app:
+        app = create_app()
+        socketio = app.extensions['socketio']
+        
+        http = app.test_client()
+        http.get('/')
+        start, cpu = time.perf_counter(), time.process_time()
+        for i in range(moves):
+            http.post('/api/game/move', json={'direction': directions[i % 4]})
+        results['rest'] = _per_move(start, cpu, moves)
+        
+        client = socketio.test_client(app, flask_test_client=http)
+        start, cpu = time.perf_counter(), time.process_time()
+        for i in range(moves):
+            client.emit('move', {'seq': i + 1, 'direction': directions[i % 4]}, callback=True)
+        results['socketio'] = _per_move(start, cpu, moves)
+        client.disconnect()
+    return results
+
+
+def _per_move(start: float, cpu: float, moves: int) -> Dict[str, Any]:
+    """由起始时间计算每步的平均耗时"""
+    return {
+        'latency_us': round((time.perf_counter() - start) / moves * 1e6, 1),
+        'cpu_us': round((time.process_time() - cpu) / moves * 1e6, 1)
+    }
+
+
+if __name__ == '__main__':
+    for path, stats in benchmark().items():
+        print(f"{path}: 延迟 {stats['latency_us']} 微秒/步, CPU {stats['cpu_us']} 微秒/步")
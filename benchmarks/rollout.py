@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛推演在不同进程数下的吞吐量
+用法: python -m benchmarks.rollout
+"""
+
+import os
+import time
+
+from game.bitboard import BitboardGame2048
+from game.rollout import RolloutEvaluator
+
+
+if __name__ == '__main__':
+    game = BitboardGame2048(seed=1)
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        with RolloutEvaluator(workers=workers) as evaluator:
+            evaluator.evaluate(game, batches=1)  # 预热进程池
+            start = time.perf_counter()
+            result = evaluator.evaluate(game, batches=16, min_samples=10 ** 9)
+            elapsed = time.perf_counter() - start
+        rollouts = sum(s['count'] for s in result['moves'].values())
+        print(f"{workers} 进程: {rollouts / elapsed:,.0f} 次推演/秒, 推荐 {result['direction']}")
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+各服务器运行时的请求吞吐量
+用法: python -m benchmarks.runner
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+from benchmarks import ROOT, isolated_dir
+from server.runner import RUNTIMES, available_runtime
+
+
+def benchmark(runtimes=RUNTIMES, clients: int = 16, seconds: float = 3.0) -> Dict[str, Dict[str, Any]]:
+    """
+    每个运行时在子进程中启动服务器，由clients个线程持续请求/api/game/state，
+    长连接运行时复用连接，dev每个请求新建连接（与其HTTP/1.0行为一致）
+    
+    Returns:
+        运行时 -> {'requests_per_sec', 'errors'}，不可用的运行时不出现在结果中
+    """
+    results = {}
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # 服务器在临时目录中运行，会话日志和密钥文件不落在项目目录
+    with isolated_dir() as workdir:
+        for runtime in runtimes:
+            if available_runtime(runtime) != runtime:
+                continue
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                port = probe.getsockname()[1]
+            process = subprocess.Popen([sys.executable, '-m', 'server.runner', '--runtime', runtime,
+                                        '--host', '127.0.0.1', '--port', str(port)],
+                                       cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                       text=True)
+            try:
+                # 服务器打印运行信息即已绑定端口
+                while 'http://' not in (process.stdout.readline() or 'http://'):
+                    pass
+                results[runtime] = _measure(port, clients, seconds)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    return results
+
+
+def _measure(port: int, clients: int, seconds: float) -> Dict[str, Any]:
+    """clients个线程在seconds秒内持续请求，返回每秒成功请求数和错误数"""
+    counts = [0] * clients
+    errors = [0] * clients
+    deadline = time.perf_counter() + seconds
+    
+    def work(index):
+        connection = None
+        cookie = None
+        while time.perf_counter() < deadline:
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                if cookie is None:
+                    connection.request('POST', '/api/game/new', body='{"size": 4}',
+                                       headers={'Content-Type': 'application/json'})
+                    response = connection.getresponse()
+                    response.read()
+                    cookie = response.getheader('Set-Cookie', '').split(';')[0]
+                    if response.will_close:
+                        connection.close()
+                        connection = None
+                    continue
+                connection.request('GET', '/api/game/state', headers={'Cookie': cookie})
+                response = connection.getresponse()
+                response.read()
+                counts[index] += response.status == 200
+                if response.will_close:
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                connection = None
+    
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_sec': round(sum(counts) / elapsed, 1),
+        'errors': sum(errors)
+    }
+
+
+if __name__ == '__main__':
+    for name, stats in benchmark().items():
+        print(f"{name}: {stats['requests_per_sec']} 请求/秒, 错误 {stats['errors']}")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+观战推送的广播开销
+用法: python -m benchmarks.spectators
+"""
+
+import json
+import time
+from typing import Dict
+
+from benchmarks import isolated_app
+
+
+def benchmark(spectator_counts=(0, 10, 50, 100), actions: int = 100, actions_per_sec: float = 50.0,
+              players: int = 2) -> Dict[int, Dict[str, Dict[str, float]]]:
+    """
+    比较观战者作为普通成员（每步立即收到完整状态）与观战角色（合并推送）时的广播开销
+    
+    每种观战人数下由一名玩家按actions_per_sec的速度执行actions步，
+    统计服务器CPU时间、观战者收到的消息数和字节数
+    
+    Returns:
+        观战人数 -> {'immediate': ..., 'spectator': ...}
+    """
+    directions = ('move_left', 'move_up', 'move_right', 'move_down')
+    results = {}
+    with isolated_app() as create_app:
+        for count in spectator_counts:
+            results[count] = {}
+            for mode in ('immediate', 'spectator'):
+                app = create_app()
+                socketio = app.extensions['socketio']
+                room_id = f"bench-{mode}-{count}"
+                members = [socketio.test_client(app) for _ in range(players)]
+                for client in members:
+                    client.emit('join_room', {'room_id': room_id})
+                watchers = [socketio.test_client(app) for _ in range(count)]
+                for client in watchers:
+                    client.emit('join_room', {'room_id': room_id,
+                                              'role': 'spectator' if mode == 'spectator' else 'player'})
+                for client in members + watchers:
+                    client.get_received()
+                
+                start, cpu = time.perf_counter(), time.process_time()
+                for i in range(actions):
+                    members[0].emit('game_action', {'room_id': room_id, 'action': directions[i % 4]})
+                    time.sleep(max(0.0, start + (i + 1) / actions_per_sec - time.perf_counter()))
+                time.sleep(0.5)
+                cpu = time.process_time() - cpu
+                
+                received = [m for client in watchers for m in client.get_received() if m['name'] == 'game_state']
+                results[count][mode] = {
+                    'cpu_ms': round(cpu * 1000, 1),
+                    'messages': len(received),
+                    'bytes': sum(len(json.dumps(m['args'][0], separators=(',', ':'))) for m in received)
+                }
+                for client in members + watchers:
+                    client.disconnect()
+    return results
+
+
+if __name__ == '__main__':
+    for spectators, modes in benchmark().items():
+        for mode, stats in modes.items():
+            print(f"观战者 {spectators} ({mode}): CPU {stats['cpu_ms']} 毫秒, "
+                  f"消息 {stats['messages']} 条, {stats['bytes']} 字节")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite排行榜在不同规模下的更新和排名查询速度，与benchmarks.leaderboard对应
+用法: python -m benchmarks.sqlite_leaderboard
+"""
+
+import os
+import random
+import tempfile
+import time
+from typing import Dict
+
+from server.sqlite_leaderboard import SQLiteLeaderboardManager
+
+
+def benchmark(sizes=(100, 10000, 1000000), operations: int = 2000) -> Dict[int, Dict[str, float]]:
+    """
+    测量不同排行榜规模下的更新和排名查询速度（数据库建在临时目录中）
+    
+    Returns:
+        规模 -> {'upserts_per_sec', 'ranks_per_sec', 'percentiles_per_sec', 'player_ranks_per_sec'}
+    """
+    rng = random.Random(0)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='2048-bench-') as workdir:
+        for size in sizes:
+            manager = SQLiteLeaderboardManager(os.path.join(workdir, f"leaderboard_{size}.db"), import_file=None)
+            # 直接批量写入总榜和4x4榜（时间早于当前周期，不进入日/周榜），再重建分段人数
+            rows = [(f"p{i}", rng.randrange(100000), i) for i in range(size)]
+            with manager._write_lock:
+                manager._writer.execute("BEGIN")
+                for board in ('all', 'all:4'):
+                    manager._writer.executemany(
+                        "INSERT INTO board_scores (board, player_name, score, max_tile, moves, size, timestamp, date, seq) "
+                        "VALUES (?, ?, ?, 0, 0, 4, '2000-01-01T00:00:00', '', ?)",
+                        [(board,) + row for row in rows])
+                manager._writer.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(size),))
+                manager._writer.execute("COMMIT")
+                manager._rebuild_counts()
+            
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.add_or_update_score(f"p{rng.randrange(size * 2)}", rng.randrange(100000), 0, 0, 4)
+            upsert_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.get_rank_by_score(rng.randrange(100000))
+            rank_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.get_score_percentile(rng.randrange(100000))
+            percentile_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            for _ in range(operations):
+                manager.get_player_rank(f"p{rng.randrange(size)}", around=5)
+            player_rank_time = time.perf_counter() - start
+            
+            manager.close()
+            manager._reader().close()
+            results[size] = {
+                'upserts_per_sec': operations / upsert_time,
+                'ranks_per_sec': operations / rank_time,
+                'percentiles_per_sec': operations / percentile_time,
+                'player_ranks_per_sec': operations / player_rank_time
+            }
+    return results
+
+
+if __name__ == '__main__':
+    for size, rates in benchmark().items():
+        print(f"{size:>8} 条: 更新 {rates['upserts_per_sec']:,.0f} 次/秒, 排名查询 {rates['ranks_per_sec']:,.0f} 次/秒, "
+              f"百分位查询 {rates['percentiles_per_sec']:,.0f} 次/秒, "
+              f"玩家名次查询 {rates['player_ranks_per_sec']:,.0f} 次/秒")
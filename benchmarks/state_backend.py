@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+进程内与共享状态后端的每步开销
+用法: python -m benchmarks.state_backend
+"""
+
+import secrets
+import time
+from typing import Dict
+
+from benchmarks import isolated_dir
+from game.engine import create_game
+from server.game_store import GameStore
+from server.state_backend import LocalBackend, SharedBackend, StateServer
+from utils.config import GameConfig
+
+
+def benchmark(moves: int = 2000) -> Dict[str, Dict[str, float]]:
+    """
+    比较进程内后端与共享后端（本进程内的StateServer，经本地套接字访问）下
+    每步“加锁-读出-移动-写回”的耗时和每步跨进程传输的游戏字节数
+    """
+    with isolated_dir():
+        engine = GameConfig().get('game.engine', 'auto')
+    authkey = secrets.token_bytes(16)
+    server = StateServer('127.0.0.1:0', authkey)
+    server.start()
+    host, port = server.address
+    backends = {
+        'local': LocalBackend(GameStore()),
+        'shared': SharedBackend(f"{host}:{port}", authkey)
+    }
+    directions = ('left', 'up', 'right', 'down')
+    results = {}
+    for name, backend in backends.items():
+        for size in (4, 8):
+            key = f"bench-{size}"
+            with backend.edit(key) as entry:
+                entry.update(create_game(size, engine, seed=0))
+            start = time.perf_counter()
+            for i in range(moves):
+                with backend.edit(key) as entry:
+                    if entry.game.game_over:
+                        entry.update(create_game(size, engine, seed=i))
+                    elif entry.game.move(directions[i % 4]):
+                        entry.update()
+            elapsed = time.perf_counter() - start
+            stats = backend.get_stats()
+            client = stats.get('client', {})
+            results[f"{name} {size}x{size}"] = {
+                'us_per_move': round(elapsed / moves * 1e6, 1),
+                'bytes_per_move': round((client.get('bytes_sent', 0) + client.get('bytes_received', 0)) / moves, 1)
+            }
+            if name == 'shared':
+                backend.stats.update(bytes_sent=0, bytes_received=0)
+    backends['shared'].close()
+    server.close()
+    return results
+
+
+if __name__ == '__main__':
+    for name, stats in benchmark().items():
+        print(f"{name}: {stats['us_per_move']} 微秒/步, {stats['bytes_per_move']} 字节/步")
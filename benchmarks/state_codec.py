@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑状态编码的体积
+用法: python -m benchmarks.state_codec
+"""
+
+import json
+import random
+from typing import Dict
+
+from game.cached_game import CachedGame2048
+from game.engine import pack_game
+from server.state_codec import StateEncoder, apply_delta
+
+
+def payload_sizes(size: int = 10, moves: int = 500, seed: int = 0) -> Dict[str, float]:
+    """比较每步移动后完整JSON状态与紧凑增量的平均字节数（版本与状态后端一样从1逐步递增）"""
+    game = CachedGame2048(size, seed=seed)
+    rng = random.Random(seed)
+    encoder = StateEncoder()
+    version = 1
+    encoder.encode('bench', game, version)
+    cells = bytearray(pack_game(game))
+    full = 0
+    compact = 0
+    count = 0
+    for _ in range(moves):
+        if game.game_over:
+            break
+        if not game.move(rng.choice(('left', 'right', 'up', 'down'))):
+            continue
+        version += 1
+        count += 1
+        full += len(json.dumps(game.get_state(), separators=(',', ':')))
+        payload = encoder.encode('bench', game, version, version - 1)
+        compact += len(json.dumps(payload['delta'], separators=(',', ':')))
+        # 校验增量还原结果
+        assert apply_delta(cells, payload['delta']) == pack_game(game)
+    return {
+        'size': size,
+        'moves': count,
+        'full_bytes_per_move': round(full / count, 1) if count else 0.0,
+        'delta_bytes_per_move': round(compact / count, 1) if count else 0.0,
+        'snapshot_bytes': len(json.dumps(encoder.encode('snapshot', game, version)['snapshot'],
+                                         separators=(',', ':')))
+    }
+
+
+if __name__ == '__main__':
+    for board_size in (4, 6, 8, 10):
+        print(payload_sizes(board_size))
@@ -0,0 +1 @@
+# game模块初始化
\ No newline at end of file
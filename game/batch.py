@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量模拟器
+用NumPy同时推进K个相同大小的棋盘，供离线分析和AI评估使用
+"""
+
+import random
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game.engine import choose_spawn, TILE_FOUR_PROBABILITY
+
+DIRECTIONS = ('left', 'right', 'up', 'down')
+
+
+def _slide_left(lines: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    向左滑动合并一组行
+
+    Args:
+        lines: (M, N) 方块指数数组
+
+    Returns:
+        (新行数组, 每行得分)
+    """
+    n = lines.shape[1]
+    # 稳定排序把非空格子按原顺序移到左侧
+    order = np.argsort(lines == 0, axis=1, kind='stable')
+    lines = np.take_along_axis(lines, order, axis=1)
+    scores = np.zeros(lines.shape[0], dtype=np.int64)
+    for j in range(n - 1):
+        left = lines[:, j]
+        merge = (left != 0) & (left == lines[:, j + 1])
+        if merge.any():
+            left[merge] += 1
+            lines[merge, j + 1] = 0
+            scores[merge] += np.left_shift(1, left[merge].astype(np.int64))
+    order = np.argsort(lines == 0, axis=1, kind='stable')
+    return np.take_along_axis(lines, order, axis=1), scores
+
+
+def _to_left(boards: np.ndarray, direction: int) -> np.ndarray:
+    """把棋盘变换为向左移动的视角"""
+    if direction == 1:
+        return boards[:, :, ::-1]
+    if direction == 2:
+        return boards.transpose(0, 2, 1)
+    if direction == 3:
+        return boards.transpose(0, 2, 1)[:, :, ::-1]
+    return boards
+
+
+def _from_left(boards: np.ndarray, direction: int) -> np.ndarray:
+    """把向左移动视角的棋盘变换回原方向"""
+    if direction == 1:
+        return boards[:, :, ::-1]
+    if direction == 2:
+        return boards.transpose(0, 2, 1)
+    if direction == 3:
+        return boards[:, :, ::-1].transpose(0, 2, 1)
+    return boards
+
+
+class BatchGame2048:
+    """批量Game2048模拟器，K个棋盘保存在一个(K, N, N)的uint8指数数组中"""
+
+    def __init__(self, count: int, size: int = 4, seed: Optional[int] = None,
+                 seeds: Optional[Sequence[int]] = None):
+        """
+        Args:
+            count: 棋盘数量K
+            size: 棋盘大小N
+            seed: NumPy随机种子（向量化生成新方块）
+            seeds: 每个棋盘的种子；给定时逐盘使用与Game2048相同的生成规则，
+                   结果与相同种子的单盘引擎完全一致
+        """
+        if seeds is not None and len(seeds) != count:
+            raise ValueError("seeds数量必须与棋盘数量一致")
+        self.count = count
+        self.size = size
+        self.boards = np.zeros((count, size, size), dtype=np.uint8)
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.moves = np.zeros(count, dtype=np.int64)
+        self.game_over = np.zeros(count, dtype=bool)
+        self._np_rng = np.random.default_rng(seed)
+        self._rngs = [random.Random(s) for s in seeds] if seeds is not None else None
+        everyone = np.arange(count)
+        self._spawn(everyone)
+        self._spawn(everyone)
+
+    def _spawn(self, indices: np.ndarray):
+        """在指定棋盘的随机空格中生成新方块"""
+        if not len(indices):
+            return
+        flat = self.boards.reshape(self.count, -1)
+        empty = flat[indices] == 0
+        empty_counts = empty.sum(axis=1)
+        has_empty = empty_counts > 0
+        indices = indices[has_empty]
+        empty = empty[has_empty]
+        empty_counts = empty_counts[has_empty]
+
+        if self._rngs is not None:
+            picks = [choose_spawn(self._rngs[i], int(c)) for i, c in zip(indices.tolist(), empty_counts.tolist())]
+            ranks = np.array([p[0] for p in picks], dtype=np.int64)
+            exponents = np.array([p[1] for p in picks], dtype=np.uint8)
+        else:
+            u = self._np_rng.random((len(indices), 2))
+            ranks = (u[:, 0] * empty_counts).astype(np.int64)
+            exponents = np.where(u[:, 1] < TILE_FOUR_PROBABILITY, 2, 1).astype(np.uint8)
+
+        # 第ranks个空格（行优先）是累计空格数首次超过ranks的位置
+        cells = np.argmax(np.cumsum(empty, axis=1) > ranks[:, None], axis=1)
+        flat[indices, cells] = exponents
+
+    def _can_move(self, indices: np.ndarray) -> np.ndarray:
+        """判断指定棋盘是否还有可行移动"""
+        boards = self.boards[indices]
+        has_empty = (boards == 0).any(axis=(1, 2))
+        horizontal = (boards[:, :, 1:] == boards[:, :, :-1]).any(axis=(1, 2))
+        vertical = (boards[:, 1:, :] == boards[:, :-1, :]).any(axis=(1, 2))
+        return has_empty | horizontal | vertical
+
+    def step(self, directions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        对每个棋盘执行一次移动
+
+        Args:
+            directions: 长度为K的方向序列，元素为0-3的整数（左右上下）或方向字符串
+
+        Returns:
+            (每盘得分增量, 是否移动掩码, 游戏结束掩码)
+        """
+        directions = np.asarray(directions)
+        if directions.dtype.kind in 'US':
+            codes = np.full(directions.shape, -1, dtype=np.int64)
+            for code, name in enumerate(DIRECTIONS):
+                codes[directions == name] = code
+            directions = codes
+        if directions.shape != (self.count,):
+            raise ValueError("方向数量必须与棋盘数量一致")
+        if ((directions < 0) | (directions > 3)).any():
+            raise ValueError("未知的移动方向")
+
+        n = self.size
+        score_delta = np.zeros(self.count, dtype=np.int64)
+        moved = np.zeros(self.count, dtype=bool)
+        active = ~self.game_over
+
+        for code in range(4):
+            indices = np.nonzero(active & (directions == code))[0]
+            if not len(indices):
+                continue
+            original = self.boards[indices]
+            lines = np.ascontiguousarray(_to_left(original, code)).reshape(-1, n)
+            result, scores = _slide_left(lines)
+            result = _from_left(result.reshape(-1, n, n), code)
+            changed = (result != original).any(axis=(1, 2))
+            self.boards[indices] = result
+            moved[indices] = changed
+            score_delta[indices] = np.where(changed, scores.reshape(-1, n).sum(axis=1), 0)
+
+        moved_indices = np.nonzero(moved)[0]
+        self.scores += score_delta
+        self.moves += moved
+        self._spawn(moved_indices)
+        self.game_over[moved_indices] = ~self._can_move(moved_indices)
+        return score_delta, moved, self.game_over.copy()
+
+    def get_max_tiles(self) -> np.ndarray:
+        """获取每盘的最大方块数值"""
+        exponents = self.boards.reshape(self.count, -1).max(axis=1).astype(np.int64)
+        return np.where(exponents > 0, np.left_shift(1, exponents), 0)
+
+    def get_grid(self, index: int) -> List[List[int]]:
+        """获取单个棋盘的方块数值网格"""
+        return [[1 << int(e) if e else 0 for e in row] for row in self.boards[index]]
+
+    def get_state(self, index: int) -> Dict[str, Any]:
+        """获取单个棋盘的游戏状态（与Game2048.get_state格式一致）"""
+        max_tile = int(self.get_max_tiles()[index])
+        return {
+            'grid': self.get_grid(index),
+            'score': int(self.scores[index]),
+            'high_score': int(self.scores[index]),
+            'moves': int(self.moves[index]),
+            'size': self.size,
+            'won': max_tile >= 2048,
+            'game_over': bool(self.game_over[index]),
+            'max_tile': max_tile
+        }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+4x4位棋盘引擎
+将棋盘打包为一个64位整数（每格4位存储方块指数），
+移动通过导入时预计算的65536项行转换表完成
+"""
+
+import random
+from typing import Dict, Any, List, Optional
+
+from game.engine import choose_spawn
+
+SIZE = 4
+ROW_MASK = 0xFFFF
+# 指数上限为15（32768），两个32768不再合并
+MAX_EXPONENT = 15
+
+
+def _reverse_row(row: int) -> int:
+    """反转一行的4个格子"""
+    return ((row >> 12) & 0xF) | ((row >> 4) & 0xF0) | ((row << 4) & 0xF00) | ((row << 12) & 0xF000)
+
+
+def _slide_row_left(row: int):
+    """向左滑动合并一行，返回(新行, 得分)"""
+    tiles = [(row >> (4 * i)) & 0xF for i in range(SIZE)]
+    tiles = [t for t in tiles if t]
+    merged = []
+    score = 0
+    i = 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1] and tiles[i] < MAX_EXPONENT:
+            exponent = tiles[i] + 1
+            merged.append(exponent)
+            score += 1 << exponent
+            i += 2
+        else:
+            merged.append(tiles[i])
+            i += 1
+    result = 0
+    for i, t in enumerate(merged):
+        result |= t << (4 * i)
+    return result, score
+
+
+def _build_tables():
+    """构建左右移动的行转换表和得分表"""
+    left = [0] * 65536
+    right = [0] * 65536
+    score = [0] * 65536
+    for row in range(65536):
+        left[row], score[row] = _slide_row_left(row)
+    for row in range(65536):
+        reversed_row = _reverse_row(row)
+        right[row] = _reverse_row(left[reversed_row])
+    return left, right, score
+
+
+# 左右移动共用得分表：反转后的行合并得分与原行相同
+ROW_LEFT, ROW_RIGHT, ROW_SCORE = _build_tables()
+
+
+def transpose(board: int) -> int:
+    """转置4x4位棋盘"""
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def apply_rows(board: int, table: List[int]):
+    """对每一行查表，返回(新棋盘, 得分)"""
+    r0 = board & ROW_MASK
+    r1 = (board >> 16) & ROW_MASK
+    r2 = (board >> 32) & ROW_MASK
+    r3 = (board >> 48) & ROW_MASK
+    result = table[r0] | (table[r1] << 16) | (table[r2] << 32) | (table[r3] << 48)
+    score = ROW_SCORE[r0] + ROW_SCORE[r1] + ROW_SCORE[r2] + ROW_SCORE[r3]
+    return result, score
+
+
+def move_board(board: int, direction: str):
+    """对位棋盘执行一次移动，返回(新棋盘, 得分)"""
+    if direction == 'left':
+        return apply_rows(board, ROW_LEFT)
+    if direction == 'right':
+        return apply_rows(board, ROW_RIGHT)
+    if direction == 'up':
+        result, score = apply_rows(transpose(board), ROW_LEFT)
+        return transpose(result), score
+    if direction == 'down':
+        result, score = apply_rows(transpose(board), ROW_RIGHT)
+        return transpose(result), score
+    raise ValueError(f"未知的移动方向: {direction}")
+
+
+def count_empty(board: int) -> int:
+    """统计空格数量"""
+    return sum(1 for i in range(SIZE * SIZE) if not (board >> (4 * i)) & 0xF)
+
+
+def can_move(board: int) -> bool:
+    """判断是否还有可行移动"""
+    if count_empty(board):
+        return True
+    if apply_rows(board, ROW_LEFT)[0] != board:
+        return True
+    transposed = transpose(board)
+    return apply_rows(transposed, ROW_LEFT)[0] != transposed
+
+
+def pack_grid(grid: List[List[int]]) -> int:
+    """将方块数值网格打包为位棋盘"""
+    board = 0
+    for r in range(SIZE):
+        for c in range(SIZE):
+            value = grid[r][c]
+            if value:
+                board |= (value.bit_length() - 1) << (4 * (r * SIZE + c))
+    return board
+
+
+def unpack_grid(board: int) -> List[List[int]]:
+    """将位棋盘解包为方块数值网格"""
+    grid = []
+    for r in range(SIZE):
+        row = []
+        for c in range(SIZE):
+            exponent = (board >> (4 * (r * SIZE + c))) & 0xF
+            row.append(1 << exponent if exponent else 0)
+        grid.append(row)
+    return grid
+
+
+class BitboardGame2048:
+    """位棋盘实现的Game2048（仅支持4x4）"""
+
+    def __init__(self, size: int = SIZE, seed: Optional[int] = None):
+        if size != SIZE:
+            raise ValueError("位棋盘引擎只支持4x4棋盘")
+        self.size = SIZE
+        self.board = 0
+        self.score = 0
+        self.high_score = 0
+        self.moves = 0
+        self.won = False
+        self.game_over = False
+        self._rng = random.Random(seed)
+        self.add_random_tile()
+        self.add_random_tile()
+
+    def add_random_tile(self) -> bool:
+        """在随机空格中生成新方块"""
+        empties = [i for i in range(SIZE * SIZE) if not (self.board >> (4 * i)) & 0xF]
+        if not empties:
+            return False
+        index, exponent = choose_spawn(self._rng, len(empties))
+        self.board |= exponent << (4 * empties[index])
+        return True
+
+    def move(self, direction: str) -> bool:
+        """执行移动，返回是否发生了移动"""
+        if self.game_over:
+            return False
+        board, score = move_board(self.board, direction)
+        if board == self.board:
+            return False
+        self.board = board
+        self.score += score
+        self.high_score = max(self.high_score, self.score)
+        self.moves += 1
+        self.add_random_tile()
+        if self.get_max_tile() >= 2048:
+            self.won = True
+        self.game_over = not can_move(self.board)
+        return True
+
+    def move_left(self) -> bool:
+        return self.move('left')
+
+    def move_right(self) -> bool:
+        return self.move('right')
+
+    def move_up(self) -> bool:
+        return self.move('up')
+
+    def move_down(self) -> bool:
+        return self.move('down')
+
+    def get_max_tile(self) -> int:
+        """获取最大方块数值"""
+        exponent = max((self.board >> (4 * i)) & 0xF for i in range(SIZE * SIZE))
+        return 1 << exponent if exponent else 0
+
+    def pack_exponents(self) -> bytes:
+        """行优先的方块指数字节串"""
+        board = self.board
+        return bytes((board >> (4 * i)) & 0xF for i in range(SIZE * SIZE))
+
+    def load_exponents(self, cells: bytes):
+        """用行优先的方块指数字节串替换棋盘"""
+        board = 0
+        for i, exponent in enumerate(cells):
+            board |= exponent << (4 * i)
+        self.board = board
+
+    def get_state(self) -> Dict[str, Any]:
+        """获取游戏状态"""
+        return {
+            'grid': unpack_grid(self.board),
+            'score': self.score,
+            'high_score': self.high_score,
+            'moves': self.moves,
+            'size': self.size,
+            'won': self.won,
+            'game_over': self.game_over,
+            'max_tile': self.get_max_tile()
+        }
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大棋盘引擎
+任意大小棋盘的Game2048实现，每行/列的滑动合并经过LRU行转换缓存，
+空格索引、可合并相邻对数量和最大方块随方块变化增量维护
+"""
+
+import random
+from typing import Dict, Any, List, Optional
+
+from game.engine import choose_spawn
+from game.line_cache import LineCache, line_cache
+
+
+class CachedGame2048:
+    """使用行转换缓存的Game2048"""
+    
+    def __init__(self, size: int = 4, seed: Optional[int] = None, cache: Optional[LineCache] = None):
+        self.size = size
+        self.grid = [[0] * size for _ in range(size)]  # 方块指数，0为空格
+        self.score = 0
+        self.high_score = 0
+        self.moves = 0
+        self.won = False
+        self.game_over = False
+        self.cache = cache if cache is not None else line_cache
+        self.empty_count = size * size
+        self.row_empty = [size] * size  # 每行空格数，用于按序号定位空格
+        self.mergeable_pairs = 0  # 数值相同的相邻非空格子对数
+        self.max_exponent = 0
+        self._rng = random.Random(seed)
+        self.add_random_tile()
+        self.add_random_tile()
+    
+    def add_random_tile(self) -> bool:
+        """在随机空格中生成新方块"""
+        if not self.empty_count:
+            return False
+        index, exponent = choose_spawn(self._rng, self.empty_count)
+        r, c = self._find_empty(index)
+        self._set_cell(r, c, exponent)
+        return True
+    
+    def _find_empty(self, index: int):
+        """按行优先顺序定位第index个空格（从0计），O(n)"""
+        r = 0
+        while index >= self.row_empty[r]:
+            index -= self.row_empty[r]
+            r += 1
+        row = self.grid[r]
+        for c in range(self.size):
+            if not row[c]:
+                if not index:
+                    return r, c
+                index -= 1
+        raise RuntimeError("空格索引与棋盘不一致")
+    
+    def _set_cell(self, r: int, c: int, exponent: int):
+        """修改单个格子，同步更新空格索引和可合并对数量"""
+        grid = self.grid
+        row = grid[r]
+        old = row[c]
+        if old == exponent:
+            return
+        n = self.size
+        up = grid[r - 1][c] if r else 0
+        down = grid[r + 1][c] if r + 1 < n else 0
+        left = row[c - 1] if c else 0
+        right = row[c + 1] if c + 1 < n else 0
+        
+        if old:
+            self.mergeable_pairs -= (up == old) + (down == old) + (left == old) + (right == old)
+        else:
+            self.empty_count -= 1
+            self.row_empty[r] -= 1
+        if exponent:
+            self.mergeable_pairs += (up == exponent) + (down == exponent) + (left == exponent) + (right == exponent)
+            if exponent > self.max_exponent:
+                self.max_exponent = exponent
+        else:
+            self.empty_count += 1
+            self.row_empty[r] += 1
+        row[c] = exponent
+    
+    def _slide(self, direction: str):
+        """按方向滑动所有行/列，返回(是否移动, 得分)"""
+        n = self.size
+        grid = self.grid
+        slide = self.cache.slide
+        set_cell = self._set_cell
+        moved = False
+        score = 0
+        for i in range(n):
+            if direction == 'left':
+                line = tuple(grid[i])
+            elif direction == 'right':
+                line = tuple(grid[i][::-1])
+            elif direction == 'up':
+                line = tuple(grid[r][i] for r in range(n))
+            else:
+                line = tuple(grid[r][i] for r in range(n - 1, -1, -1))
+            
+            result, gained, line_moved = slide(line)
+            if not line_moved:
+                continue
+            moved = True
+            score += gained
+            
+            for k in range(n):
+                if result[k] == line[k]:
+                    continue
+                if direction == 'left':
+                    set_cell(i, k, result[k])
+                elif direction == 'right':
+                    set_cell(i, n - 1 - k, result[k])
+                elif direction == 'up':
+                    set_cell(k, i, result[k])
+                else:
+                    set_cell(n - 1 - k, i, result[k])
+        return moved, score
+    
+    def _can_move(self) -> bool:
+        """判断是否还有可行移动"""
+        return self.empty_count > 0 or self.mergeable_pairs > 0
+    
+    def move(self, direction: str) -> bool:
+        """执行移动，返回是否发生了移动"""
+        if direction not in ('left', 'right', 'up', 'down'):
+            raise ValueError(f"未知的移动方向: {direction}")
+        if self.game_over:
+            return False
+        moved, score = self._slide(direction)
+        if not moved:
+            return False
+        self.score += score
+        self.high_score = max(self.high_score, self.score)
+        self.moves += 1
+        self.add_random_tile()
+        if self.get_max_tile() >= 2048:
+            self.won = True
+        self.game_over = not self._can_move()
+        return True
+    
+    def move_left(self) -> bool:
+        return self.move('left')
+    
+    def move_right(self) -> bool:
+        return self.move('right')
+    
+    def move_up(self) -> bool:
+        return self.move('up')
+    
+    def move_down(self) -> bool:
+        return self.move('down')
+    
+    def get_max_tile(self) -> int:
+        """获取最大方块数值"""
+        return 1 << self.max_exponent if self.max_exponent else 0
+    
+    def get_grid(self) -> List[List[int]]:
+        """获取方块数值网格"""
+        return [[1 << e if e else 0 for e in row] for row in self.grid]
+    
+    def pack_exponents(self) -> bytes:
+        """行优先的方块指数字节串"""
+        return bytes(e for row in self.grid for e in row)
+    
+    def load_exponents(self, cells: bytes):
+        """用行优先的方块指数字节串替换棋盘"""
+        n = self.size
+        for i, exponent in enumerate(cells):
+            self._set_cell(i // n, i % n, exponent)
+        self.max_exponent = max(cells, default=0)
+    
+    def get_state(self) -> Dict[str, Any]:
+        """获取游戏状态"""
+        return {
+            'grid': self.get_grid(),
+            'score': self.score,
+            'high_score': self.high_score,
+            'moves': self.moves,
+            'size': self.size,
+            'won': self.won,
+            'game_over': self.game_over,
+            'max_tile': self.get_max_tile()
+        }
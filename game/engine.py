@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏引擎选择
+根据配置为指定棋盘大小创建Game2048实现
+"""
+
+import random
+import struct
+from typing import Optional, Tuple
+
+# 新方块为4的概率（其余为2）
+TILE_FOUR_PROBABILITY = 0.1
+
+# 可选引擎：list为原始列表实现，bitboard为4x4位棋盘实现，
+# cached为带行转换缓存的大棋盘实现，auto自动选择
+ENGINES = ('auto', 'list', 'bitboard', 'cached')
+
+# 冻结格式头部：引擎、边长、标志位（获胜/结束）、分数、最高分、步数、续用随机种子，其后为方块指数
+FROZEN_HEADER = struct.Struct('<BBBIIII')
+FROZEN_ENGINES = ('bitboard', 'cached')
+
+
+def choose_spawn(rng: random.Random, empty_count: int) -> Tuple[int, int]:
+    """
+    按统一规则选择新方块位置和指数
+    
+    所有引擎共用此规则，保证相同种子下生成相同的方块序列
+    
+    Args:
+        rng: 随机数生成器
+        empty_count: 空格数量
+        
+    Returns:
+        (空格序号, 方块指数) 空格序号按行优先顺序计数
+    """
+    index = int(rng.random() * empty_count)
+    exponent = 2 if rng.random() < TILE_FOUR_PROBABILITY else 1
+    return index, exponent
+
+
+def pack_game(game) -> bytes:
+    """将游戏棋盘打包为行优先的方块指数字节串"""
+    if hasattr(game, 'pack_exponents'):
+        return game.pack_exponents()
+    return bytes(value.bit_length() - 1 if value else 0
+                 for row in game.get_state()['grid'] for value in row)
+
+
+def create_game(size: int = 4, engine: str = 'auto', seed: Optional[int] = None):
+    """
+    创建游戏实例
+    
+    Args:
+        size: 棋盘大小
+        engine: 引擎名称，见ENGINES
+        seed: 随机种子（仅新引擎支持）
+        
+    Returns:
+        实现Game2048接口的游戏对象
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"未知的游戏引擎: {engine}")
+    
+    if engine in ('auto', 'bitboard') and size == 4:
+        from game.bitboard import BitboardGame2048
+        return BitboardGame2048(seed=seed)
+    
+    if engine == 'cached' or (engine == 'auto' and size > 4):
+        from game.cached_game import CachedGame2048
+        return CachedGame2048(size, seed=seed)
+    
+    from game.game_logic import Game2048
+    return Game2048(size)
+
+
+def _state_seed(rng: random.Random) -> int:
+    """由随机数生成器的状态确定性地计算32位种子（整数元组的哈希不受哈希随机化影响）"""
+    return hash(rng.getstate()[1]) & 0xFFFFFFFF
+
+
+def freeze_game(game) -> Optional[bytes]:
+    """
+    把游戏打包为紧凑字节串
+    
+    完整的随机数状态有约2.5KB，不保存；改为由状态计算一个种子，解冻后以此继续生成。
+    只读取状态而不从生成器取数，打包不会改变原游戏之后生成的方块
+    
+    Returns:
+        打包结果，引擎不支持时返回None
+    """
+    from game.bitboard import BitboardGame2048
+    from game.cached_game import CachedGame2048
+    if isinstance(game, BitboardGame2048):
+        code = FROZEN_ENGINES.index('bitboard')
+    elif isinstance(game, CachedGame2048):
+        code = FROZEN_ENGINES.index('cached')
+    else:
+        return None
+    flags = int(game.won) | int(game.game_over) << 1
+    header = FROZEN_HEADER.pack(code, game.size, flags, game.score, game.high_score, game.moves,
+                                _state_seed(game._rng))
+    return header + game.pack_exponents()
+
+
+def thaw_game(data: bytes):
+    """从freeze_game的结果还原游戏"""
+    code, size, flags, score, high_score, moves, seed = FROZEN_HEADER.unpack_from(data)
+    if FROZEN_ENGINES[code] == 'bitboard':
+        from game.bitboard import BitboardGame2048
+        game = BitboardGame2048(seed=seed)
+    else:
+        from game.cached_game import CachedGame2048
+        game = CachedGame2048(size, seed=seed)
+    game.load_exponents(data[FROZEN_HEADER.size:])
+    game.score = score
+    game.high_score = high_score
+    game.moves = moves
+    game.won = bool(flags & 1)
+    game.game_over = bool(flags & 2)
+    return game
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+期望最大化搜索
+为当前局面推荐最佳移动方向，支持时间预算、迭代加深和
+按对称规范化棋盘索引的有界置换表
+"""
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from game import bitboard
+from game.line_cache import line_cache
+
+DIRECTIONS = ('left', 'right', 'up', 'down')
+
+# 启发式参数
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+# 概率低于此值的分支直接估值
+PROBABILITY_CUTOFF = 0.0001
+# 每搜索多少个节点检查一次时间
+CHECK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    """搜索超出时间预算或被取消"""
+    pass
+
+
+@lru_cache(maxsize=65536)
+def line_heuristic(line: Tuple[int, ...]) -> float:
+    """单行/列的启发式估值（空格、可合并、单调性、方块总量）"""
+    empty = 0
+    merges = 0
+    prev = 0
+    counter = 0
+    total = 0.0
+    for exponent in line:
+        total += exponent ** SUM_POWER
+        if not exponent:
+            empty += 1
+            continue
+        if prev == exponent:
+            counter += 1
+        elif counter > 0:
+            merges += 1 + counter
+            counter = 0
+        prev = exponent
+    if counter > 0:
+        merges += 1 + counter
+
+    mono_left = 0.0
+    mono_right = 0.0
+    for a, b in zip(line, line[1:]):
+        if a > b:
+            mono_left += a ** MONOTONICITY_POWER - b ** MONOTONICITY_POWER
+        else:
+            mono_right += b ** MONOTONICITY_POWER - a ** MONOTONICITY_POWER
+
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(mono_left, mono_right) - SUM_WEIGHT * total)
+
+
+class BitboardOps:
+    """4x4位棋盘的搜索操作"""
+
+    _heuristic_table = None
+    _table_lock = threading.Lock()
+
+    def __init__(self):
+        if BitboardOps._heuristic_table is None:
+            with BitboardOps._table_lock:
+                if BitboardOps._heuristic_table is None:
+                    BitboardOps._heuristic_table = [
+                        line_heuristic(tuple((row >> (4 * i)) & 0xF for i in range(4)))
+                        for row in range(65536)
+                    ]
+        self.table = BitboardOps._heuristic_table
+
+    @staticmethod
+    def from_game(game) -> int:
+        """从游戏对象取得位棋盘"""
+        board = getattr(game, 'board', None)
+        if isinstance(board, int):
+            return board
+        return bitboard.pack_grid(game.get_state()['grid'])
+
+    @staticmethod
+    def moves(board: int) -> List[Tuple[str, int]]:
+        """所有可行移动及移动后的棋盘"""
+        result = []
+        for direction in DIRECTIONS:
+            moved, _ = bitboard.move_board(board, direction)
+            if moved != board:
+                result.append((direction, moved))
+        return result
+
+    @staticmethod
+    def empties(board: int) -> List[int]:
+        """空格位置列表"""
+        return [i for i in range(16) if not (board >> (4 * i)) & 0xF]
+
+    @staticmethod
+    def place(board: int, cell: int, exponent: int) -> int:
+        """在空格放置方块"""
+        return board | (exponent << (4 * cell))
+
+    @staticmethod
+    def canonical(board: int) -> int:
+        """8种对称变换中数值最小的棋盘"""
+        reverse = bitboard._reverse_row
+        best = board
+        for b in (board, bitboard.transpose(board)):
+            rows = [(b >> (16 * i)) & 0xFFFF for i in range(4)]
+            mirrored = [reverse(r) for r in rows]
+            for variant in (rows, mirrored):
+                flat = variant[0] | (variant[1] << 16) | (variant[2] << 32) | (variant[3] << 48)
+                flipped = variant[3] | (variant[2] << 16) | (variant[1] << 32) | (variant[0] << 48)
+                best = min(best, flat, flipped)
+        return best
+
+    def heuristic(self, board: int) -> float:
+        """整盘启发式估值"""
+        table = self.table
+        transposed = bitboard.transpose(board)
+        return (table[board & 0xFFFF] + table[(board >> 16) & 0xFFFF]
+                + table[(board >> 32) & 0xFFFF] + table[(board >> 48) & 0xFFFF]
+                + table[transposed & 0xFFFF] + table[(transposed >> 16) & 0xFFFF]
+                + table[(transposed >> 32) & 0xFFFF] + table[(transposed >> 48) & 0xFFFF])
+
+
+class GridOps:
+    """任意大小棋盘的搜索操作，棋盘为行优先的方块指数元组"""
+
+    def __init__(self, size: int):
+        self.size = size
+        n = size
+        self.rows = [[r * n + c for c in range(n)] for r in range(n)]
+        self.cols = [[r * n + c for r in range(n)] for c in range(n)]
+        # 每个方向上，每条线从移动终点到起点的格子下标
+        self.lines = {
+            'left': self.rows,
+            'right': [row[::-1] for row in self.rows],
+            'up': self.cols,
+            'down': [col[::-1] for col in self.cols],
+        }
+        base = [(r, c) for r in range(n) for c in range(n)]
+        transforms = [
+            lambda r, c: (r, c), lambda r, c: (r, n - 1 - c),
+            lambda r, c: (n - 1 - r, c), lambda r, c: (n - 1 - r, n - 1 - c),
+            lambda r, c: (c, r), lambda r, c: (c, n - 1 - r),
+            lambda r, c: (n - 1 - c, r), lambda r, c: (n - 1 - c, n - 1 - r),
+        ]
+        self.symmetries = [
+            [t(r, c)[0] * n + t(r, c)[1] for r, c in base] for t in transforms
+        ]
+
+    def from_game(self, game) -> Tuple[int, ...]:
+        """从游戏对象取得方块指数元组"""
+        return tuple(value.bit_length() - 1 if value else 0
+                     for row in game.get_state()['grid'] for value in row)
+
+    def moves(self, board: Tuple[int, ...]) -> List[Tuple[str, Tuple[int, ...]]]:
+        """所有可行移动及移动后的棋盘"""
+        result = []
+        slide = line_cache.slide
+        for direction in DIRECTIONS:
+            cells = None
+            for line in self.lines[direction]:
+                moved_line, _, moved = slide(tuple(board[i] for i in line))
+                if moved:
+                    if cells is None:
+                        cells = list(board)
+                    for i, exponent in zip(line, moved_line):
+                        cells[i] = exponent
+            if cells is not None:
+                result.append((direction, tuple(cells)))
+        return result
+
+    @staticmethod
+    def empties(board: Tuple[int, ...]) -> List[int]:
+        """空格位置列表"""
+        return [i for i, exponent in enumerate(board) if not exponent]
+
+    @staticmethod
+    def place(board: Tuple[int, ...], cell: int, exponent: int) -> Tuple[int, ...]:
+        """在空格放置方块"""
+        return board[:cell] + (exponent,) + board[cell + 1:]
+
+    def canonical(self, board: Tuple[int, ...]) -> Tuple[int, ...]:
+        """8种对称变换中字典序最小的棋盘"""
+        return min(tuple(board[i] for i in perm) for perm in self.symmetries)
+
+    def heuristic(self, board: Tuple[int, ...]) -> float:
+        """整盘启发式估值"""
+        total = 0.0
+        for line in self.rows:
+            total += line_heuristic(tuple(board[i] for i in line))
+        for line in self.cols:
+            total += line_heuristic(tuple(board[i] for i in line))
+        return total
+
+
+def ops_for_size(size: int):
+    """根据棋盘大小选择搜索操作"""
+    return BitboardOps() if size == 4 else GridOps(size)
+
+
+class ExpectimaxSearch:
+    """单次期望最大化搜索"""
+
+    def __init__(self, ops, deadline: float, cancel_event: Optional[threading.Event] = None,
+                 table_size: int = 100000, max_depth: int = 8):
+        self.ops = ops
+        self.deadline = deadline
+        self.cancel_event = cancel_event
+        self.table_size = table_size
+        self.max_depth = max_depth
+        self.table = {}  # 规范化棋盘 -> (深度, 估值)
+        self.nodes = 0
+        self.table_hits = 0
+        self.table_lookups = 0
+        self._timed = False
+
+    def _tick(self):
+        """节点计数并定期检查时间预算"""
+        self.nodes += 1
+        if self._timed and not self.nodes % CHECK_INTERVAL:
+            if time.perf_counter() >= self.deadline or (self.cancel_event and self.cancel_event.is_set()):
+                raise SearchTimeout()
+
+    def _max_node(self, board, depth: int, probability: float) -> float:
+        """玩家选择节点"""
+        self._tick()
+        best = 0.0
+        for _, moved in self.ops.moves(board):
+            best = max(best, self._chance_node(moved, depth - 1, probability))
+        return best
+
+    def _chance_node(self, board, depth: int, probability: float) -> float:
+        """随机生成方块节点"""
+        ops = self.ops
+        if depth <= 0 or probability < PROBABILITY_CUTOFF:
+            return ops.heuristic(board)
+
+        key = ops.canonical(board)
+        self.table_lookups += 1
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            self.table_hits += 1
+            return entry[1]
+
+        empties = ops.empties(board)
+        if not empties:
+            return self._max_node(board, depth, probability)
+        share = probability / len(empties)
+        total = 0.0
+        for cell in empties:
+            total += 0.9 * self._max_node(ops.place(board, cell, 1), depth, share * 0.9)
+            total += 0.1 * self._max_node(ops.place(board, cell, 2), depth, share * 0.1)
+        value = total / len(empties)
+
+        if len(self.table) >= self.table_size:
+            # 按插入顺序淘汰最早的条目
+            del self.table[next(iter(self.table))]
+        self.table[key] = (depth, value)
+        return value
+
+    def run(self, board) -> Dict[str, Any]:
+        """迭代加深直到时间预算用完，返回最后完成深度的结果"""
+        start = time.perf_counter()
+        candidates = self.ops.moves(board)
+        best_direction = None
+        best_scores = {}
+        completed = 0
+
+        for depth in range(1, self.max_depth + 1):
+            # 深度1只做启发式估值，总是完成，保证有结果可用
+            self._timed = depth > 1
+            try:
+                scores = {direction: self._chance_node(moved, depth - 1, 1.0)
+                          for direction, moved in candidates}
+            except SearchTimeout:
+                break
+            completed = depth
+            best_scores = scores
+            if scores:
+                best_direction = max(scores, key=scores.get)
+            if len(candidates) <= 1:
+                break
+
+        elapsed = time.perf_counter() - start
+        return {
+            'direction': best_direction,
+            'depth': completed,
+            'move_scores': best_scores,
+            'nodes': self.nodes,
+            'nodes_per_sec': int(self.nodes / elapsed) if elapsed > 0 else 0,
+            'cache_hit_rate': self.table_hits / self.table_lookups if self.table_lookups else 0.0,
+            'elapsed_ms': round(elapsed * 1000, 2)
+        }
+
+
+def _warm_up():
+    """进程池工作进程启动时预先生成4x4启发式表"""
+    BitboardOps()
+
+
+def _search_in_process(size: int, board, deadline: float, table_size: int) -> Dict[str, Any]:
+    """在工作进程中执行搜索，deadline为墙钟时间（各进程的perf_counter不可比较）"""
+    search = ExpectimaxSearch(ops_for_size(size), time.perf_counter() + (deadline - time.time()), None, table_size)
+    return search.run(board)
+
+
+class HintService:
+    """在线程池或进程池中运行提示搜索，避免占用请求线程；进程池不受GIL限制，多个提示可并行计算"""
+
+    def __init__(self, max_workers: int = 2, table_size: int = 100000, processes: bool = False):
+        self.table_size = table_size
+        self.processes = processes
+        if processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_up)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hint')
+
+    def suggest(self, game, budget_ms: int) -> Optional[Dict[str, Any]]:
+        """
+        为游戏当前局面搜索最佳方向
+
+        Args:
+            game: 实现Game2048接口的游戏对象
+            budget_ms: 时间预算（毫秒）
+
+        Returns:
+            搜索结果字典，线程池繁忙超时返回None
+        """
+        ops = ops_for_size(game.size)
+        board = ops.from_game(game)
+        budget = budget_ms / 1000.0
+        cancel_event = None
+        if self.processes:
+            # 进程间无法共享取消事件，只靠截止时间结束搜索
+            future = self._executor.submit(_search_in_process, game.size, board, time.time() + budget,
+                                           self.table_size)
+        else:
+            cancel_event = threading.Event()
+            search = ExpectimaxSearch(ops, time.perf_counter() + budget, cancel_event, self.table_size)
+            future = self._executor.submit(search.run, board)
+        try:
+            # 留出余量给排队和最后一层的收尾
+            return future.result(timeout=budget + 1.0)
+        except FutureTimeoutError:
+            if cancel_event is not None:
+                cancel_event.set()
+            future.cancel()
+            return None
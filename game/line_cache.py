@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行转换缓存
+大棋盘按行/列滑动合并时，用有界LRU缓存复用相同行的计算结果
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+LineResult = Tuple[Tuple[int, ...], int, bool]
+
+
+def slide_line(line: Tuple[int, ...]) -> LineResult:
+    """
+    向起点方向滑动合并一行方块指数
+    
+    Args:
+        line: 方块指数元组，0表示空格
+        
+    Returns:
+        (新行, 得分, 是否移动)
+    """
+    tiles = [t for t in line if t]
+    merged = []
+    score = 0
+    i = 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+            exponent = tiles[i] + 1
+            merged.append(exponent)
+            score += 1 << exponent
+            i += 2
+        else:
+            merged.append(tiles[i])
+            i += 1
+    merged.extend([0] * (len(line) - len(merged)))
+    result = tuple(merged)
+    return result, score, result != line
+
+
+class LineCache:
+    """有界LRU行转换缓存"""
+    
+    def __init__(self, max_size: int = 65536):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def slide(self, line: Tuple[int, ...]) -> LineResult:
+        """查询缓存，未命中时计算并写入"""
+        with self._lock:
+            result = self._entries.get(line)
+            if result is not None:
+                self._entries.move_to_end(line)
+                self.hits += 1
+                return result
+            self.misses += 1
+        
+        result = slide_line(line)
+        
+        with self._lock:
+            self._entries[line] = result
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+    
+    def clear(self):
+        """清空缓存和计数器"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+# 全局行转换缓存实例
+line_cache = LineCache()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛推演评估
+在进程池中对每个可行方向运行大量随机对局，按平均得分评估移动
+"""
+
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from game import bitboard
+from game.engine import choose_spawn, pack_game
+from game.line_cache import slide_line
+
+DIRECTIONS = ('left', 'right', 'up', 'down')
+
+
+def _grid_move(cells: List[int], size: int, direction: str) -> Tuple[bool, int]:
+    """在行优先指数列表上原地执行移动，返回(是否移动, 得分)"""
+    moved = False
+    score = 0
+    for i in range(size):
+        if direction == 'left':
+            index = [i * size + k for k in range(size)]
+        elif direction == 'right':
+            index = [i * size + size - 1 - k for k in range(size)]
+        elif direction == 'up':
+            index = [k * size + i for k in range(size)]
+        else:
+            index = [(size - 1 - k) * size + i for k in range(size)]
+        result, gained, line_moved = slide_line(tuple(cells[j] for j in index))
+        if line_moved:
+            moved = True
+            score += gained
+            for j, exponent in zip(index, result):
+                cells[j] = exponent
+    return moved, score
+
+
+def _playout_bitboard(board: int, first: str, rng: random.Random, max_moves: int) -> int:
+    """4x4位棋盘上的一次随机推演，返回得分"""
+    board, score = bitboard.move_board(board, first)
+    for _ in range(max_moves):
+        empties = [i for i in range(16) if not (board >> (4 * i)) & 0xF]
+        if empties:
+            index, exponent = choose_spawn(rng, len(empties))
+            board |= exponent << (4 * empties[index])
+        options = []
+        for direction in DIRECTIONS:
+            moved, gained = bitboard.move_board(board, direction)
+            if moved != board:
+                options.append((moved, gained))
+        if not options:
+            break
+        board, gained = options[rng.randrange(len(options))]
+        score += gained
+    return score
+
+
+def _playout_grid(cells: List[int], size: int, first: str, rng: random.Random, max_moves: int) -> int:
+    """任意大小棋盘上的一次随机推演，返回得分"""
+    _, score = _grid_move(cells, size, first)
+    for _ in range(max_moves):
+        empties = [i for i, exponent in enumerate(cells) if not exponent]
+        if empties:
+            index, exponent = choose_spawn(rng, len(empties))
+            cells[empties[index]] = exponent
+        order = list(DIRECTIONS)
+        rng.shuffle(order)
+        for direction in order:
+            moved, gained = _grid_move(cells, size, direction)
+            if moved:
+                score += gained
+                break
+        else:
+            break
+    return score
+
+
+def run_rollouts(packed: bytes, size: int, direction: str, seed: int,
+                 count: int, max_moves: int) -> Tuple[str, int, float, float]:
+    """
+    进程池任务：从打包棋盘出发，以指定方向开局运行count次推演
+
+    Returns:
+        (方向, 推演次数, 得分和, 得分平方和)
+    """
+    rng = random.Random(seed)
+    total = 0.0
+    total_sq = 0.0
+    if size == 4:
+        board = 0
+        for i, exponent in enumerate(packed):
+            board |= exponent << (4 * i)
+        for _ in range(count):
+            score = _playout_bitboard(board, direction, rng, max_moves)
+            total += score
+            total_sq += score * score
+    else:
+        for _ in range(count):
+            score = _playout_grid(list(packed), size, direction, rng, max_moves)
+            total += score
+            total_sq += score * score
+    return direction, count, total, total_sq
+
+
+def legal_directions(packed: bytes, size: int) -> List[str]:
+    """打包棋盘上所有可行的方向"""
+    result = []
+    for direction in DIRECTIONS:
+        if _grid_move(list(packed), size, direction)[0]:
+            result.append(direction)
+    return result
+
+
+class RolloutEvaluator:
+    """进程池蒙特卡洛移动评估器"""
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = 50,
+                 max_moves: int = 200, seed: int = 0):
+        """
+        Args:
+            workers: 进程数，默认为CPU核数
+            batch_size: 每个任务的推演次数
+            max_moves: 单次推演的最大步数
+            seed: 基础随机种子，任务种子由此确定性派生
+        """
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_moves = max_moves
+        self.seed = seed
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _task_seed(self, direction: str, batch: int) -> int:
+        """由基础种子、方向和批次派生任务种子"""
+        return (self.seed * 1000003 + DIRECTIONS.index(direction) * 10007 + batch) & 0xFFFFFFFF
+
+    def evaluate_iter(self, game, batches: int = 8) -> Iterator[Dict[str, Dict[str, float]]]:
+        """
+        提交所有推演任务，每完成一个任务产出一次当前累计统计
+
+        调用方可随时停止迭代，未开始的任务会被取消
+
+        Yields:
+            方向 -> {'count', 'mean', 'stderr'}
+        """
+        packed = pack_game(game)
+        size = game.size
+        directions = legal_directions(packed, size)
+        totals = {d: [0, 0.0, 0.0] for d in directions}
+        if not directions:
+            return
+
+        executor = self._get_executor()
+        # 按批次轮流提交各方向，保证早期结果覆盖所有方向
+        futures = [
+            executor.submit(run_rollouts, packed, size, direction,
+                            self._task_seed(direction, batch), self.batch_size, self.max_moves)
+            for batch in range(batches) for direction in directions
+        ]
+        try:
+            for future in as_completed(futures):
+                direction, count, total, total_sq = future.result()
+                stats = totals[direction]
+                stats[0] += count
+                stats[1] += total
+                stats[2] += total_sq
+                yield {d: _summarize(*s) for d, s in totals.items()}
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def evaluate(self, game, batches: int = 8, min_samples: int = 100,
+                 confidence: float = 2.0) -> Dict[str, Any]:
+        """
+        评估所有方向，某一方向明显占优时提前停止
+
+        Args:
+            game: 实现Game2048接口的游戏对象
+            batches: 每个方向最多提交的任务数
+            min_samples: 提前停止前每个方向至少需要的推演次数
+            confidence: 提前停止所需的标准误倍数
+
+        Returns:
+            最佳方向、各方向统计以及是否提前停止
+        """
+        stats = {}
+        stopped_early = False
+        for stats in self.evaluate_iter(game, batches):
+            if _dominates(stats, min_samples, confidence):
+                stopped_early = True
+                break
+        best = max(stats, key=lambda d: stats[d]['mean']) if stats else None
+        return {'direction': best, 'moves': stats, 'stopped_early': stopped_early}
+
+
+def _summarize(count: int, total: float, total_sq: float) -> Dict[str, float]:
+    """由计数、和、平方和计算均值和标准误"""
+    if not count:
+        return {'count': 0, 'mean': 0.0, 'stderr': float('inf')}
+    mean = total / count
+    variance = max(total_sq / count - mean * mean, 0.0)
+    return {'count': count, 'mean': mean, 'stderr': math.sqrt(variance / count)}
+
+
+def _dominates(stats: Dict[str, Dict[str, float]], min_samples: int, confidence: float) -> bool:
+    """判断领先方向是否在置信区间上明显优于其余方向"""
+    if len(stats) < 2:
+        return bool(stats) and all(s['count'] >= min_samples for s in stats.values())
+    if any(s['count'] < min_samples for s in stats.values()):
+        return False
+    ranked = sorted(stats.values(), key=lambda s: s['mean'], reverse=True)
+    best, runner_up = ranked[0], ranked[1]
+    return best['mean'] - confidence * best['stderr'] > runner_up['mean'] + confidence * runner_up['stderr']
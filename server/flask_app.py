@@ -7,16 +7,58 @@ Flask应用工厂
 
 from flask import Flask, render_template, request, jsonify, session, send_file
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import os
 import secrets
 import json
+from contextlib import contextmanager
+from datetime import datetime
 
 from utils.config import GameConfig
 from utils.device_detector import get_device_info
-from game.game_logic import Game2048
-from server.leaderboard import leaderboard
+from game.engine import create_game
+from game.line_cache import line_cache
+from game.expectimax import HintService
+from server.leaderboard import leaderboard, WINDOWS, window_start
+from server.response_cache import ResponseCache
+from server.leaderboard_push import LeaderboardPublisher
+from server.move_channel import MoveSequencer
+from server.state_codec import StateEncoder
+from server.state_backend import HubClientManager, create_backend
+from server.rooms import RoomRegistry, spectator_room
+from server.spectators import SpectatorFanout
 
-def create_app():
-    """创建Flask应用"""
+# 批量移动接口单次最多执行的方向数
+MAX_BATCH_MOVES = 64
+
+def load_secret_key(path):
+    """读取持久化的会话密钥，不存在时生成并保存，重启后会话cookie仍然有效"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"读取会话密钥失败: {e}")
+        return secrets.token_hex(16)
+    key = secrets.token_hex(16)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(key)
+    except Exception as e:
+        print(f"保存会话密钥失败: {e}")
+    return key
+
+def create_app(async_mode='threading', state_backend=None):
+    """
+    创建Flask应用
+    
+    Args:
+        async_mode: SocketIO的异步模式，由server.runner按运行时传入（threading或gevent）
+        state_backend: 游戏状态后端（local或shared），省略时使用state.backend
+    """
     from utils.config import GameConfig
     config = GameConfig()
     
@@ -28,16 +70,79 @@ def create_app():
                 template_folder=os.path.join(base_dir, 'templates'),
                 static_folder=os.path.join(base_dir, 'static'))
     
-    # 配置
-    app.config['SECRET_KEY'] = secrets.token_hex(16)
+    # 会话游戏和房间游戏的存储：local时在本进程的GameStore中，shared时由StateServer在多个工作进程间共享
+    # 紧凑协议：按会话/房间记录最后发送的状态，容量和过期时间与降级游戏相同
+    state_encoder = StateEncoder(config.get('game_store.max_snapshots', 20000),
+                                 config.get('game_store.snapshot_ttl', 86400))
+    state = create_backend(config, state_backend, on_evict=state_encoder.forget)
+    if state.shared and config.get('leaderboard.storage', 'json') != 'sqlite':
+        # JSON排行榜保存在各进程的内存中，多个进程会各自压缩同一日志文件而互相覆盖
+        raise RuntimeError("共享状态后端要求leaderboard.storage为sqlite")
+    
+    # 配置：持久化游戏时密钥也需持久化，否则重启后会话cookie失效，找不到恢复的游戏；
+    # 共享后端下各工作进程须使用相同的密钥才能识别同一会话，使用与StateServer相同的密钥文件
+    persist_file = config.get('game_store.persist_file', '')
+    if persist_file:
+        app.config['SECRET_KEY'] = load_secret_key(persist_file + '.key')
+    elif state.shared:
+        app.config['SECRET_KEY'] = load_secret_key(config.get('state.key_file', 'game_state.key'))
+    else:
+        app.config['SECRET_KEY'] = secrets.token_hex(16)
     app.config['CONFIG'] = config
+    engine = config.get('game.engine', 'auto')
+    line_cache.max_size = config.get('game.line_cache_size', line_cache.max_size)
+    # server.hint_processes大于0时提示搜索在多个进程中并行，否则使用game.hint_workers个线程
+    hint_processes = config.get('server.hint_processes', 0)
+    hint_service = HintService(hint_processes or config.get('game.hint_workers', 2),
+                               config.get('game.hint_table_size', 100000), processes=hint_processes > 0)
+    response_cache = ResponseCache(config.get('leaderboard.response_cache_size', 256))
     
     # 初始化SocketIO - 优化配置确保稳定运行
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', logger=False, engineio_logger=False)
+    # 共享后端下广播和房间操作经StateServer转发给其他工作进程中的连接
+    socketio_options = {'client_manager': HubClientManager(state)} if state.shared else {}
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode, logger=False, engineio_logger=False,
+                        **socketio_options)
+    publisher = LeaderboardPublisher(socketio, leaderboard, config.get('leaderboard.push_top_n', 10),
+                                     config.get('leaderboard.push_max_rate', 2.0), remote=state.shared)
+    
+    move_sequencer = MoveSequencer()
+    # session_id或room_key(room_id) -> 游戏及其版本；会话游戏的版本在每次变化时取全局递增的新值，
+    # 房间游戏的版本即广播序号。配置了persist_file时变化的游戏定期写入日志，重启后按需恢复
+    state.start()
+    
+    def close_room(room_id, room):
+        """房间被回收后清理紧凑协议记录，仍在房间中的（本进程）成员收到room_closed"""
+        state_encoder.forget(('room', room_id))
+        if room['players'] or room['spectators']:
+            for name in (room_id, compact_room(room_id), spectator_room(room_id)):
+                # 其他工作进程中的成员仍在使用房间，不经StateServer转发
+                socketio.emit('room_closed', {'room_id': room_id}, to=name, ignore_queue=True)
+    
+    # room_id -> 本进程中的成员和房间锁，游戏存放在state中；无人或长期无动作的房间定期回收
+    rooms = RoomRegistry(config.get('rooms.empty_ttl', 300), config.get('rooms.idle_ttl', 86400), on_remove=close_room)
+    rooms.start_sweeper(config.get('rooms.sweep_interval', 60))
+    
+    def room_frame(room_id, entry=None):
+        """房间游戏的完整状态帧，带房间版本作为seq；未给出entry时从state读取"""
+        entry = entry or room_entry(room_id)
+        return dict(entry.game.get_state(), room_id=room_id, seq=entry.version)
     
-    # 存储游戏状态
-    games = {}  # session_id -> Game2048
-    rooms = {}  # room_id -> {players: set(), game: Game2048}
+    # 共享后端下其他工作进程中可能有观战者，有变化即推送
+    spectator_fanout = SpectatorFanout(socketio, rooms, room_frame, config.get('rooms.spectator_max_rate', 5.0),
+                                       remote=state.shared)
+    
+    def get_game(session_id):
+        """读取会话游戏（GameEntry），没有时返回None；只读，修改使用edit_game"""
+        return state.get(session_id) if session_id else None
+    
+    @contextmanager
+    def edit_game(session_id):
+        """在state的按键锁内读写会话游戏，会话没有游戏时得到None"""
+        if not session_id:
+            yield None
+            return
+        with state.edit(session_id) as entry:
+            yield entry if entry.game is not None else None
     
     @app.route('/')
     def index():
@@ -58,19 +163,21 @@ def create_app():
             session_id = secrets.token_hex(8)
             session['session_id'] = session_id
         
-        if session_id not in games:
-            games[session_id] = Game2048(4)
+        if get_game(session_id) is None:
+            with state.edit(session_id) as entry:
+                if entry.game is None:
+                    entry.update(create_game(4, engine))
         
         return render_template(
             template,
             device_info=device_info,
             config=config.config
         )
-
+    
     @app.route('/desktop')
     def desktop():
         return render_template('desktop.html', config=config.config)
-
+    
     @app.route('/software')
     def software():
         return render_template('software_embedded.html', config=config.config)
@@ -79,6 +186,38 @@ def create_app():
     def local_access():
         """本地访问专用路由 - 确保打包后可直接访问"""
         return render_template('desktop.html', config=config.config)
+    def get_leaderboard_filters():
+        """解析排行榜查询参数：size（棋盘大小）和window（all/daily/weekly）"""
+        size = request.args.get('size', type=int)
+        window = request.args.get('window', 'all')
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window: {window}")
+        return size, window
+    
+    def cached_leaderboard_response(query, produce, window='all'):
+        """
+        按排行榜版本缓存序列化后的JSON，带ETag并对If-None-Match返回304
+        
+        Args:
+            query: 区分查询的可哈希元组
+            produce: 缓存未命中时生成响应数据的函数
+            window: 查询的时间窗口
+        """
+        # 数据版本在查询前读取；窗口起始时间随日期变化，一并计入缓存键
+        key = (leaderboard.version, window_start(window, datetime.now())) + query
+        cached = response_cache.get(key)
+        if cached is None:
+            cached = response_cache.put(key, jsonify(produce()).get_data())
+        body, etag = cached
+        response = app.response_class(body, content_type='application/json; charset=utf-8')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        response.headers['Access-Control-Expose-Headers'] = 'ETag'
+        return response.make_conditional(request)
+    
     # 获取排行榜数据函数
     def get_leaderboard_data():
         """获取排行榜数据"""
@@ -86,27 +225,29 @@ def create_app():
             return leaderboard.get_top_scores()
         except Exception as e:
             return []
-
+    
     @app.route('/api/leaderboard')
     def get_leaderboard():
         """获取排行榜"""
         try:
-            data = get_leaderboard_data()
-            response = jsonify(data)
-            response.headers['Content-Type'] = 'application/json; charset=utf-8'
-            return response
+            return cached_leaderboard_response(('leaderboard',), get_leaderboard_data)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
-
+    
     @app.route('/api/game/state')
     def get_game_state():
         """获取游戏状态"""
         try:
             session_id = session.get('session_id')
-            if not session_id or session_id not in games:
+            entry = get_game(session_id)
+            if entry is None:
                 return jsonify({'error': 'Game not found'}), 404
             
-            response = jsonify(games[session_id].get_state())
+            if request.args.get('compact'):
+                payload = dict(state_payload(session_id, entry, {'compact': True}), version=entry.version)
+            else:
+                payload = dict(entry.game.get_state(), version=entry.version)
+            response = jsonify(payload)
             response.headers['Access-Control-Allow-Origin'] = '*'
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
             response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
@@ -114,32 +255,114 @@ def create_app():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    def step_game(game, direction):
+        """按方向执行一步，返回是否移动"""
+        if direction == 'left':
+            return game.move_left()
+        elif direction == 'right':
+            return game.move_right()
+        elif direction == 'up':
+            return game.move_up()
+        elif direction == 'down':
+            return game.move_down()
+        return False
+    
+    def state_payload(session_id, entry, options):
+        """
+        会话游戏的状态字段：默认为完整状态{'state': ...}；
+        options中compact为真时返回紧凑的{'snapshot': ...}或相对options['base']版本的{'delta': ...}
+        """
+        if options.get('compact'):
+            return state_encoder.encode(session_id, entry.game, entry.version, options.get('base'))
+        return {'state': entry.game.get_state()}
+    
+    def apply_move(session_id, entry, direction, options=None):
+        """执行移动（在edit_game中调用），返回REST和Socket.IO共用的结果"""
+        moved = step_game(entry.game, direction)
+        if moved:
+            entry.update()
+        
+        result = {
+            'moved': moved,
+            'version': entry.version
+        }
+        result.update(state_payload(session_id, entry, options or {}))
+        return result
+    
     @app.route('/api/game/move', methods=['POST'])
     def make_move():
         """执行移动"""
         session_id = session.get('session_id')
-        if not session_id or session_id not in games:
-            return jsonify({'error': 'Game not found'}), 404
-        
         data = request.get_json()
-        direction = data.get('direction')
+        with edit_game(session_id) as entry:
+            if entry is None:
+                return jsonify({'error': 'Game not found'}), 404
+            response = jsonify(apply_move(session_id, entry, data.get('direction'), data))
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        return response
+    
+    @app.route('/api/game/moves', methods=['POST'])
+    def make_moves():
+        """
+        批量执行移动
         
-        game = games[session_id]
-        moved = False
+        请求体为{'directions': [...], 'version': 客户端已知的状态版本}，可带compact/base使用紧凑状态，
+        版本不一致时不执行并返回409和当前状态；游戏结束后剩余方向不再执行
+        """
+        session_id = session.get('session_id')
+        data = request.get_json() or {}
+        directions = data.get('directions')
+        if not isinstance(directions, list) or len(directions) > MAX_BATCH_MOVES:
+            return jsonify({'error': f'directions must be a list of at most {MAX_BATCH_MOVES} moves'}), 400
         
-        if direction == 'left':
-            moved = game.move_left()
-        elif direction == 'right':
-            moved = game.move_right()
-        elif direction == 'up':
-            moved = game.move_up()
-        elif direction == 'down':
-            moved = game.move_down()
+        with edit_game(session_id) as entry:
+            if entry is None:
+                return jsonify({'error': 'Game not found'}), 404
+            
+            version = data.get('version')
+            if version is not None and version != entry.version:
+                return jsonify(dict({
+                    'error': 'Version conflict',
+                    'version': entry.version
+                }, **state_payload(session_id, entry, data))), 409
         
-        response = jsonify({
-            'moved': moved,
-            'state': game.get_state()
-        })
+            game = entry.game
+            results = []
+            for direction in directions:
+                before = game.score
+                moved = not game.game_over and step_game(game, direction)
+                results.append({'direction': direction, 'moved': moved, 'score_delta': game.score - before})
+            if any(result['moved'] for result in results):
+                entry.update()
+        
+            response = jsonify(dict({
+                'moved': any(result['moved'] for result in results),
+                'results': results,
+                'version': entry.version
+            }, **state_payload(session_id, entry, data)))
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+        return response
+    
+    @app.route('/api/game/hint')
+    def get_hint():
+        """获取提示（期望最大化搜索推荐的移动方向）"""
+        session_id = session.get('session_id')
+        entry = get_game(session_id)
+        if entry is None:
+            return jsonify({'error': 'Game not found'}), 404
+        
+        budget_ms = request.args.get('budget_ms', type=int) or config.get('game.hint_budget_ms', 200)
+        budget_ms = max(10, min(budget_ms, config.get('game.hint_max_budget_ms', 2000)))
+        
+        result = hint_service.suggest(entry.game, budget_ms)
+        if result is None:
+            return jsonify({'error': 'Hint service busy'}), 503
+        
+        response = jsonify(result)
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
@@ -161,9 +384,10 @@ def create_app():
         if (device_info['is_mobile'] or device_info['is_tablet']) and size > 8:
             size = 8
         
-        games[session_id] = Game2048(size)
+        with state.edit(session_id) as entry:
+            version = entry.update(create_game(size, engine))
         
-        response = jsonify(games[session_id].get_state())
+        response = jsonify(dict(entry.game.get_state(), version=version))
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
@@ -171,19 +395,20 @@ def create_app():
     
     @app.route('/api/game/scores')
     def get_scores():
-        """获取公开排行榜"""
+        """获取公开排行榜（支持size、window、limit查询参数）"""
         try:
-            scores = leaderboard.get_top_scores()
-            response = jsonify(scores)
-            response.headers['Content-Type'] = 'application/json; charset=utf-8'
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            return response
+            size, window = get_leaderboard_filters()
+        except ValueError as e:
+            return jsonify({'error': str(e), 'scores': []}), 400
+        try:
+            limit = min(request.args.get('limit', 10, type=int), 100)
+            return cached_leaderboard_response(
+                ('scores', limit, size, window),
+                lambda: leaderboard.get_top_scores(limit, size=size, window=window), window)
         except Exception as e:
             app.logger.error(f"获取排行榜失败: {e}")
             return jsonify({'error': str(e), 'scores': []}), 500
-
+    
     @app.route('/api/game/scores', methods=['POST'])
     def add_score():
         """添加分数到排行榜（为每个玩家分配唯一ID并连续记录）"""
@@ -214,15 +439,55 @@ def create_app():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
-    @app.route('/api/game/leaderboard/stats')
-    def get_leaderboard_stats():
-        """获取排行榜统计信息"""
-        response = jsonify(leaderboard.get_stats())
+    @app.route('/api/game/scores/rank')
+    def get_score_rank():
+        """查询名次和百分位：score参数按分数查询，否则按player（默认当前玩家）查询，around返回前后名次"""
+        try:
+            size, window = get_leaderboard_filters()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        score = request.args.get('score', type=int)
+        if score is not None:
+            result = leaderboard.get_score_percentile(score, size=size, window=window)
+        else:
+            player_name = request.args.get('player')
+            if not player_name:
+                player_id = session.get('player_id')
+                if not player_id:
+                    return jsonify({'error': 'No player specified'}), 404
+                player_name = f"玩家_{player_id[:8]}"
+            around = max(0, min(request.args.get('around', 0, type=int), 50))
+            result = leaderboard.get_player_rank(player_name, size=size, window=window, around=around)
+            if result is None:
+                return jsonify({'error': 'Player not ranked'}), 404
+        response = jsonify(result)
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
         response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
         return response
     
+    @app.route('/api/game/leaderboard/stats')
+    def get_leaderboard_stats():
+        """获取排行榜统计信息（支持size、window查询参数）"""
+        try:
+            size, window = get_leaderboard_filters()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return cached_leaderboard_response(
+            ('stats', size, window), lambda: leaderboard.get_stats(size=size, window=window), window)
+    
+    @app.route('/api/game/engine/stats')
+    def get_engine_stats():
+        """获取游戏引擎缓存统计"""
+        return jsonify({
+            'line_cache': line_cache.get_stats(),
+            'response_cache': response_cache.get_stats(),
+            'leaderboard_push': publisher.get_stats(),
+            'game_store': state.get_stats(),
+            'rooms': rooms.get_stats(),
+            'spectators': spectator_fanout.get_stats()
+        })
+    
     @socketio.on('connect')
     def handle_connect():
         """处理连接"""
@@ -232,75 +497,191 @@ def create_app():
     def handle_disconnect():
         """处理断开连接"""
         print(f'Client disconnected: {request.sid}')
+        publisher.unsubscribe(request.sid)
+        move_sequencer.forget(request.sid)
+        rooms.remove_sid(request.sid)
+        # 单人游戏属于会话而非连接：刷新页面时旧连接晚于新页面断开，此处不删除游戏
+    
+    @socketio.on('move')
+    def handle_move(data=None):
+        """
+        单人游戏移动（REST /api/game/move 的Socket.IO版本）
         
-        # 清理游戏状态
+        data为{'seq': 序号, 'direction': 方向}，可带compact/base使用紧凑状态，结果通过确认回调返回；
+        序号不大于该连接已执行的最大序号时不执行，返回applied=False和当前状态
+        """
         session_id = session.get('session_id')
-        if session_id and session_id in games:
-            del games[session_id]
+        data = data or {}
+        seq = data.get('seq')
+        if seq is not None and not isinstance(seq, int):
+            return {'error': 'Invalid seq'}
+        
+        with move_sequencer.lock(request.sid), edit_game(session_id) as entry:
+            if entry is None:
+                return {'error': 'Game not found'}
+            if not move_sequencer.accept(request.sid, seq):
+                return dict({
+                    'seq': seq,
+                    'applied': False,
+                    'last_seq': move_sequencer.last(request.sid),
+                    'moved': False,
+                    'version': entry.version
+                }, **state_payload(session_id, entry, data))
+            result = apply_move(session_id, entry, data.get('direction'), data)
+        result['seq'] = seq
+        result['applied'] = True
+        return result
+    
+    @socketio.on('subscribe_leaderboard')
+    def handle_subscribe_leaderboard(data=None):
+        """订阅排行榜频道：先收到leaderboard_snapshot，之后排行榜变化时收到leaderboard_diff"""
+        data = data or {}
+        window = data.get('window', 'all')
+        try:
+            size = int(data['size']) if data.get('size') is not None else None
+        except (TypeError, ValueError):
+            size = None
+        if window not in WINDOWS:
+            emit('leaderboard_error', {'error': f"Unknown window: {window}"})
+            return
+        snapshot = publisher.subscribe(request.sid, size, window)
+        join_room(snapshot['channel'])
+        emit('leaderboard_snapshot', snapshot)
+    
+    @socketio.on('unsubscribe_leaderboard')
+    def handle_unsubscribe_leaderboard(data=None):
+        """取消订阅排行榜频道，不指定channel时取消全部"""
+        for name in publisher.unsubscribe(request.sid, (data or {}).get('channel')):
+            leave_room(name)
     
     @socketio.on('join_room')
     def handle_join_room(data):
-        """加入房间"""
-        room_id = data.get('room_id', 'default')
+        """
+        加入房间
         
-        if room_id not in rooms:
-            rooms[room_id] = {
-                'players': set(),
-                'game': Game2048(4)
-            }
-        
-        rooms[room_id]['players'].add(request.sid)
-        join_room(room_id)
+        role为spectator时以观战者身份加入：不能执行动作，立即收到一帧当前状态，
+        之后按rooms.spectator_max_rate合并接收game_state
+        """
+        room_id = data.get('room_id', 'default')
+        spectator = data.get('role') == 'spectator'
         
-        emit('room_joined', {
-            'room_id': room_id,
-            'players_count': len(rooms[room_id]['players'])
-        })
+        with rooms.locked(room_id, create=True) as room:
+            entry = room_entry(room_id)
+            if spectator:
+                rooms.add_spectator(room_id, room, request.sid)
+                join_room(spectator_room(room_id))
+            else:
+                rooms.add_player(room_id, room, request.sid, bool(data.get('compact')))
+                if data.get('compact'):
+                    join_room(compact_room(room_id))
+                else:
+                    join_room(room_id)
+            
+            emit('room_joined', {
+                'room_id': room_id,
+                'role': 'spectator' if spectator else 'player',
+                'players_count': len(room['players']),
+                'spectators_count': len(room['spectators']),
+                'seq': entry.version
+            })
+            if spectator:
+                emit('game_state', room_frame(room_id, entry))
+            elif data.get('compact'):
+                emit('game_delta', room_snapshot(room_id, entry))
+    
+    def room_key(room_id):
+        """房间游戏在state中的键，会话ID为十六进制串，不会与之冲突"""
+        return f"room:{room_id}"
+    
+    def room_entry(room_id):
+        """房间游戏及其版本（即广播序号），不存在（新房间或已被淘汰）时创建"""
+        entry = state.get(room_key(room_id))
+        if entry is None:
+            with state.edit(room_key(room_id)) as entry:
+                if entry.game is None:
+                    entry.update(create_game(4, engine), 0)
+        return entry
+    
+    def compact_room(room_id):
+        """房间内使用紧凑协议的连接所在的Socket.IO房间"""
+        return f"{room_id}#compact"
+    
+    def room_snapshot(room_id, entry=None):
+        """房间游戏的紧凑快照；未给出entry时从state读取"""
+        entry = entry or room_entry(room_id)
+        return dict(state_encoder.encode(('room', room_id), entry.game, entry.version), room_id=room_id)
+    
+    @socketio.on('sync_state')
+    def handle_sync_state(data):
+        """紧凑协议客户端增量基准不符时请求完整快照"""
+        room_id = (data or {}).get('room_id', 'default')
+        with rooms.locked(room_id) as room:
+            if room is not None:
+                emit('game_delta', room_snapshot(room_id))
     
     @socketio.on('game_action')
     def handle_game_action(data):
-        """处理游戏动作"""
+        """
+        处理游戏动作
+        
+        同一房间的动作在房间锁内串行执行，广播的game_state带seq（即房间版本），
+        玩家按seq顺序立即收到每个动作的结果，观战者收到合并后的帧；不同房间互不阻塞
+        """
         room_id = data.get('room_id', 'default')
         action = data.get('action')
         
-        if room_id not in rooms:
-            return
-        
-        game = rooms[room_id]['game']
-        moved = False
-        
-        if action == 'move_left':
-            moved = game.move_left()
-        elif action == 'move_right':
-            moved = game.move_right()
-        elif action == 'move_up':
-            moved = game.move_up()
-        elif action == 'move_down':
-            moved = game.move_down()
-        elif action == 'new_game':
-            size = data.get('size', 4)
-            game = Game2048(size)
-            rooms[room_id]['game'] = game
-            moved = True
-        
-        if moved:
-            # 广播游戏状态给房间内的所有玩家
-            emit('game_state', game.get_state(), room=room_id)
+        with rooms.locked(room_id) as room:
+            # 观战者不能操作
+            if room is None or (request.sid in room['spectators'] and request.sid not in room['players']):
+                return
+            
+            # 共享后端下state的按键锁使各工作进程中同一房间的动作也串行执行
+            with state.edit(room_key(room_id)) as entry:
+                if entry.game is None:
+                    entry.update(create_game(4, engine), 0)
+                game = entry.game
+                moved = False
+            
+                if action == 'move_left':
+                    moved = game.move_left()
+                elif action == 'move_right':
+                    moved = game.move_right()
+                elif action == 'move_up':
+                    moved = game.move_up()
+                elif action == 'move_down':
+                    moved = game.move_down()
+                elif action == 'new_game':
+                    size = data.get('size', 4)
+                    game = create_game(size, engine)
+                    moved = True
+            
+                if moved:
+                    base = entry.version
+                    entry.update(game, base + 1)
+                    # 广播游戏状态给房间内的所有玩家，在锁内发送保证顺序与序号一致；
+                    # 共享后端下其他工作进程中可能有各类成员，两种协议都发送
+                    if state.shared or len(room['compact_players']) < len(room['players']):
+                        emit('game_state', room_frame(room_id, entry), room=room_id)
+                    if state.shared or room['compact_players']:
+                        delta = state_encoder.encode(('room', room_id), game, entry.version, base)
+                        emit('game_delta', dict(delta, room_id=room_id), room=compact_room(room_id))
+                    if state.shared or room['spectators']:
+                        spectator_fanout.mark(room_id)
     
     @app.route('/updates')
     def updates():
         return send_file('../updates.html')
-
+    
     @app.route('/welcome')
     def welcome():
         return send_file('../welcome.html')
-
+    
     @app.route('/updates.html')
     def updates_html():
         return send_file('../updates.html')
-
+    
     @app.route('/welcome.html')
     def welcome_html():
         return send_file('../welcome.html')
-
+    
     return app
\ No newline at end of file
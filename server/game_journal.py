@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏会话日志
+把冻结的游戏追加写入日志文件，每条记录为
+    头部(键长度, 数据长度, CRC32) + 键(UTF-8) + 数据
+数据长度为0表示删除。同一键以最后一条记录为准，
+文件超过阈值且大部分记录已被覆盖时重写为每键一条
+"""
+
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Optional
+
+RECORD_HEADER = struct.Struct('<HII')
+
+
+def _record(key: str, data: Optional[bytes]) -> bytes:
+    """编码一条记录，data为None时为删除记录"""
+    raw_key = key.encode('utf-8')
+    data = data or b''
+    return RECORD_HEADER.pack(len(raw_key), len(data), zlib.crc32(raw_key + data)) + raw_key + data
+
+
+class GameJournal:
+    """只追加的游戏快照日志，写入量与变化的游戏数成正比"""
+    
+    def __init__(self, path: str, compact_bytes: int = 4 * 1024 * 1024):
+        """
+        Args:
+            path: 日志文件路径
+            compact_bytes: 文件超过该大小且有效记录不足一半时重写
+        """
+        self.path = path
+        self.compact_bytes = compact_bytes
+        self._file = None
+        self._size = 0
+        self._live = {}  # 键 -> 最后一条记录的长度，用于判断何时重写
+        self._lock = threading.Lock()
+        self.stats = {
+            'writes': 0,
+            'records': 0,
+            'bytes_written': 0,
+            'compactions': 0,
+            'failed_writes': 0
+        }
+    
+    def load(self) -> Dict[str, bytes]:
+        """读取日志，返回每个键最后的数据；截掉写了一半或校验失败的尾部"""
+        with self._lock:
+            games, valid = self._read()
+            self._size = valid
+            self._live = {key: len(_record(key, data)) for key, data in games.items()}
+            return games
+    
+    def _read(self):
+        """解析日志文件，返回(键 -> 数据, 有效字节数)（调用方持有锁）"""
+        games = {}
+        if not os.path.exists(self.path):
+            return games, 0
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            print(f"读取游戏日志失败: {e}")
+            return games, 0
+        
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            key_len, data_len, crc = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            end = start + key_len + data_len
+            if end > len(data) or zlib.crc32(data[start:end]) != crc:
+                break
+            key = data[start:start + key_len].decode('utf-8')
+            if data_len:
+                games[key] = data[start + key_len:end]
+            else:
+                games.pop(key, None)
+            offset = end
+        
+        if offset < len(data):
+            try:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(offset)
+            except Exception as e:
+                print(f"截断游戏日志失败: {e}")
+        return games, offset
+    
+    def write(self, records: Dict[str, Optional[bytes]]) -> bool:
+        """追加一批记录并同步到磁盘，值为None的键写入删除记录"""
+        if not records:
+            return True
+        chunk = bytearray()
+        with self._lock:
+            for key, data in records.items():
+                record = _record(key, data)
+                chunk += record
+                if data is None:
+                    self._live.pop(key, None)
+                else:
+                    self._live[key] = len(record)
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'ab')
+                self._file.write(chunk)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                print(f"写入游戏日志失败: {e}")
+                self.stats['failed_writes'] += 1
+                return False
+            self._size += len(chunk)
+            self.stats['writes'] += 1
+            self.stats['records'] += len(records)
+            self.stats['bytes_written'] += len(chunk)
+            
+            if self._size >= self.compact_bytes and self._size > 2 * sum(self._live.values()):
+                self._compact()
+        return True
+    
+    def _compact(self):
+        """把日志重写为每键一条记录（调用方持有锁）"""
+        self._close_file()
+        games, _ = self._read()
+        temp_file = self.path + ".tmp"
+        try:
+            with open(temp_file, 'wb') as f:
+                for key, data in games.items():
+                    f.write(_record(key, data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.path)
+        except Exception as e:
+            print(f"压缩游戏日志失败: {e}")
+            return
+        self._size = os.path.getsize(self.path)
+        self.stats['compactions'] += 1
+    
+    def _close_file(self):
+        """关闭日志文件（调用方持有锁）"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception as e:
+                print(f"关闭游戏日志失败: {e}")
+            self._file = None
+    
+    def close(self):
+        """关闭日志"""
+        with self._lock:
+            self._close_file()
+    
+    def get_stats(self):
+        """获取日志统计"""
+        with self._lock:
+            return dict(self.stats, file_bytes=self._size, games=len(self._live))
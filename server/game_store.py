@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话游戏存储
+活跃游戏保存为对象；空闲超时或超出容量时降级为紧凑字节串，
+访问时再还原；降级后的游戏继续空闲或超出容量才被淘汰。
+配置日志后，变化过的游戏由后台线程定期追加到日志，
+重启时在后台读回为降级记录，首次访问时才还原为游戏对象
+"""
+
+import atexit
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from game.engine import freeze_game, thaw_game
+from server.game_journal import GameJournal
+
+# 启动后日志尚未读完时，未命中的访问最多等待的秒数
+LOAD_WAIT_SECONDS = 5.0
+
+# 按键修改锁的分片数
+LOCK_STRIPES = 64
+
+
+def _game_size(game) -> int:
+    """估算游戏对象占用的字节数（不含共享的行转换缓存）"""
+    total = sys.getsizeof(game) + sys.getsizeof(game.__dict__)
+    for name, value in game.__dict__.items():
+        if name == 'cache':
+            continue
+        total += sys.getsizeof(value)
+        if isinstance(value, list):
+            total += sum(sys.getsizeof(item) for item in value)
+    return total
+
+
+class GameStore:
+    """线程安全的有界会话游戏存储，接口与dict相近"""
+    
+    def __init__(self, max_games: int = 1000, idle_ttl: float = 600.0,
+                 max_snapshots: int = 20000, snapshot_ttl: float = 86400.0,
+                 sweep_interval: float = 30.0, on_evict: Optional[Callable[[Hashable], None]] = None,
+                 journal: Optional[GameJournal] = None, persist_interval: float = 5.0):
+        """
+        Args:
+            max_games: 最多保留的活跃游戏对象数，超出时最久未访问的降级
+            idle_ttl: 活跃游戏空闲多少秒后降级
+            max_snapshots: 最多保留的降级游戏数，超出时最久未访问的淘汰
+            snapshot_ttl: 降级游戏空闲多少秒后淘汰
+            sweep_interval: 两次超时清理之间的最短间隔（秒）
+            on_evict: 游戏被淘汰或删除时以键调用，用于清理关联数据
+            journal: 持久化日志，为None时不持久化（持久化时键须为字符串）
+            persist_interval: 两次写日志之间的间隔（秒）
+        """
+        self.max_games = max_games
+        self.idle_ttl = idle_ttl
+        self.max_snapshots = max_snapshots
+        self.snapshot_ttl = snapshot_ttl
+        self.sweep_interval = sweep_interval
+        self.on_evict = on_evict
+        self.journal = journal
+        self.persist_interval = persist_interval
+        self._games = OrderedDict()  # 键 -> (游戏对象, 最后访问时间)，按访问顺序
+        self._snapshots = OrderedDict()  # 键 -> (字节串, 最后访问时间)，按访问顺序
+        self._snapshot_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+        # 按键修改锁：原地修改游戏时持有，降级、淘汰和写日志跳过被持有的键，不会打包修改到一半的游戏
+        self._key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._dirty = set()  # 上次写日志后变化或删除的键
+        self._loaded = threading.Event()
+        self._stop_event = threading.Event()
+        self._persister = None
+        if journal is None:
+            self._loaded.set()
+        self.stats = {
+            'demotions': 0,
+            'restores': 0,
+            'evictions': 0,
+            'expired': 0,
+            'loaded': 0,
+            'persisted': 0,
+            'corrupt': 0
+        }
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._games) + len(self._snapshots)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        if not self._loaded.is_set():
+            self._wait_loaded(key)
+        with self._lock:
+            return key in self._games or key in self._snapshots
+    
+    def __getitem__(self, key: Hashable):
+        game = self.get(key)
+        if game is None:
+            raise KeyError(key)
+        return game
+    
+    def __setitem__(self, key: Hashable, game):
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            self._drop_snapshot(key)
+            self._games[key] = (game, now)
+            self._games.move_to_end(key)
+            self._mark(key)
+            evicted = self._enforce(now)
+        self._notify(evicted)
+    
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            found = self._games.pop(key, None) is not None
+            found = self._drop_snapshot(key) or found
+            if found:
+                self._mark(key)
+        if not found:
+            raise KeyError(key)
+        self._notify([key])
+    
+    def get(self, key: Hashable, default=None):
+        """取出游戏并刷新访问时间，降级的游戏在此还原"""
+        if not self._loaded.is_set():
+            self._wait_loaded(key)
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            entry = self._games.get(key)
+            if entry is not None:
+                self._games[key] = (entry[0], now)
+                self._games.move_to_end(key)
+                game = entry[0]
+            else:
+                snapshot = self._snapshots.get(key)
+                if snapshot is None:
+                    return default
+                self._drop_snapshot(key)
+                try:
+                    game = thaw_game(snapshot[0])
+                except Exception as e:
+                    print(f"还原游戏失败: {e}")
+                    self.stats['corrupt'] += 1
+                    self._mark(key)
+                    return default
+                self._games[key] = (game, now)
+                self.stats['restores'] += 1
+            evicted = self._enforce(now)
+        self._notify(evicted)
+        return game
+    
+    def key_lock(self, key: Hashable) -> threading.Lock:
+        """键的修改锁，原地修改游戏期间须持有（不可重入，持有时不要再取同一键的锁）"""
+        return self._key_locks[hash(key) % LOCK_STRIPES]
+    
+    def _wait_loaded(self, key: Hashable):
+        """日志读完前，内存中没有的键等待读取完成"""
+        with self._lock:
+            if key in self._games or key in self._snapshots:
+                return
+        self._loaded.wait(LOAD_WAIT_SECONDS)
+    
+    def mark_dirty(self, key: Hashable):
+        """登记原地修改过的游戏，下次写日志时保存"""
+        with self._lock:
+            self._mark(key)
+    
+    def _mark(self, key: Hashable):
+        """登记需要写日志的键（调用方持有锁）"""
+        if self.journal is not None:
+            self._dirty.add(key)
+    
+    def _drop_snapshot(self, key: Hashable) -> bool:
+        """删除降级记录（调用方持有锁）"""
+        snapshot = self._snapshots.pop(key, None)
+        if snapshot is None:
+            return False
+        self._snapshot_bytes -= len(snapshot[0])
+        return True
+    
+    def _retire(self, key: Hashable, reason: str, evicted: list) -> bool:
+        """
+        把活跃游戏降级为字节串，引擎不支持打包时直接淘汰（调用方持有锁）
+        
+        Returns:
+            是否已处理；游戏正在修改时不处理，返回False
+        """
+        key_lock = self.key_lock(key)
+        if not key_lock.acquire(blocking=False):
+            return False
+        try:
+            game, last_access = self._games.pop(key)
+            data = freeze_game(game)
+            if data is None:
+                evicted.append(key)
+                self.stats[reason] += 1
+                return True
+            self._snapshots[key] = (data, last_access)
+            self._snapshot_bytes += len(data)
+            self.stats['demotions'] += 1
+            return True
+        finally:
+            key_lock.release()
+    
+    def _enforce(self, now: float) -> list:
+        """执行容量限制和（按间隔的）超时清理，返回被淘汰的键（调用方持有锁）"""
+        evicted = []
+        sweep = now - self._last_sweep >= self.sweep_interval
+        if sweep:
+            self._last_sweep = now
+            # 访问顺序即时间顺序，从最旧的开始检查
+            for key, (_, last_access) in list(self._games.items()):
+                if now - last_access < self.idle_ttl:
+                    break
+                self._retire(key, 'expired', evicted)
+            for key, (_, last_access) in list(self._snapshots.items()):
+                if now - last_access < self.snapshot_ttl:
+                    break
+                self._drop_snapshot(key)
+                evicted.append(key)
+                self.stats['expired'] += 1
+        
+        busy = 0
+        while len(self._games) > self.max_games and busy < len(self._games):
+            key = next(iter(self._games))
+            if not self._retire(key, 'evictions', evicted):
+                # 正在修改的游戏视为刚被访问，下次再处理
+                self._games.move_to_end(key)
+                busy += 1
+        while len(self._snapshots) > self.max_snapshots:
+            key = next(iter(self._snapshots))
+            self._drop_snapshot(key)
+            evicted.append(key)
+            self.stats['evictions'] += 1
+        for key in evicted:
+            self._mark(key)
+        return evicted
+    
+    def _notify(self, keys):
+        """在锁外通知被淘汰的键"""
+        if self.on_evict:
+            for key in keys:
+                self.on_evict(key)
+    
+    def sweep(self) -> int:
+        """立即执行一次超时清理，返回被淘汰的数量"""
+        with self._lock:
+            self._last_sweep = float('-inf')
+            evicted = self._enforce(time.monotonic())
+        self._notify(evicted)
+        return len(evicted)
+    
+    def start_persister(self):
+        """启动后台线程：先读回日志，之后定期写入变化的游戏；退出时自动做最后一次写入"""
+        if self.journal is None or self._persister is not None:
+            return
+        self._stop_event.clear()
+        self._persister = threading.Thread(target=self._persist_loop, name='game-store-persist', daemon=True)
+        self._persister.start()
+        atexit.register(self.close)
+    
+    def _persist_loop(self):
+        """读回日志后按间隔写日志"""
+        self._load()
+        while not self._stop_event.wait(self.persist_interval):
+            self.flush()
+    
+    def _load(self):
+        """把日志中的游戏放入降级记录，内存中已有或启动后已变化的键以内存为准"""
+        try:
+            saved = self.journal.load()
+        except Exception as e:
+            print(f"读取游戏日志失败: {e}")
+            saved = {}
+        now = time.monotonic()
+        with self._lock:
+            for key, data in saved.items():
+                if key in self._games or key in self._snapshots or key in self._dirty:
+                    continue
+                self._snapshots[key] = (data, now)
+                self._snapshot_bytes += len(data)
+                self.stats['loaded'] += 1
+            evicted = self._enforce(now)
+        self._loaded.set()
+        self._notify(evicted)
+    
+    def flush(self) -> int:
+        """把变化的游戏写入日志，返回写入的记录数；开销只与变化的游戏数有关"""
+        if self.journal is None:
+            return 0
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            records = {}
+            for key in dirty:
+                entry = self._games.get(key)
+                if entry is not None:
+                    key_lock = self.key_lock(key)
+                    if not key_lock.acquire(blocking=False):
+                        # 正在修改，留到下次写入
+                        self._dirty.add(key)
+                        continue
+                    try:
+                        data = freeze_game(entry[0])
+                    finally:
+                        key_lock.release()
+                    # 无法打包的引擎不持久化
+                    if data is None:
+                        continue
+                else:
+                    snapshot = self._snapshots.get(key)
+                    data = snapshot[0] if snapshot is not None else None
+                records[key] = data
+        if not self.journal.write(records):
+            with self._lock:
+                self._dirty.update(dirty)
+            return 0
+        self.stats['persisted'] += len(records)
+        return len(records)
+    
+    def close(self):
+        """停止后台线程并写入剩余的变化"""
+        if self._persister is not None:
+            self._stop_event.set()
+            self._persister.join()
+            self._persister = None
+        if self._loaded.is_set():
+            self.flush()
+        if self.journal is not None:
+            self.journal.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计（活跃游戏的内存为估算值）"""
+        with self._lock:
+            game_bytes = sum(_game_size(game) for game, _ in self._games.values())
+            return dict(
+                self.stats,
+                games=len(self._games),
+                snapshots=len(self._snapshots),
+                max_games=self.max_games,
+                max_snapshots=self.max_snapshots,
+                game_bytes=game_bytes,
+                snapshot_bytes=self._snapshot_bytes,
+                total_bytes=game_bytes + self._snapshot_bytes,
+                dirty=len(self._dirty),
+                journal=self.journal.get_stats() if self.journal is not None else None
+            )
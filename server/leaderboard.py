@@ -5,114 +5,642 @@
 管理全局排行榜数据
 """
 
+import atexit
+import heapq
+import itertools
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Any
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from server.ranking import OrderStatisticIndex
+from utils.config import GameConfig
+
+# 持久化模式：snapshot每次整体重写文件，journal追加日志并定期压缩为快照
+PERSISTENCE_MODES = ('snapshot', 'journal')
+# 日志fsync策略：always每次写入，interval按时间间隔，never交给操作系统
+FSYNC_POLICIES = ('always', 'interval', 'never')
+# 排行榜时间窗口：all为总榜，daily/weekly为当天/当周（周一起）
+WINDOWS = ('all', 'daily', 'weekly')
+
+
+def window_start(window: str, when: datetime) -> Optional[datetime]:
+    """获取时间所在窗口的起始时间，总榜返回None"""
+    if window == 'all':
+        return None
+    start = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'weekly':
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def merge_boards(parts: List[List[Tuple[Tuple[int, int], Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """合并各分区按排序键有序的(键, 记录)列表，同一记录只保留一次，结果按排名顺序排列"""
+    scores = []
+    last = None
+    for key, entry in heapq.merge(*parts, key=lambda item: item[0]):
+        if key != last:
+            scores.append(entry)
+            last = key
+    return scores
+
+
+class RankedBoard:
+    """单个排行榜分区：顺序统计索引中的记录、玩家索引和增量维护的统计"""
+    
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries  # None表示保留所有玩家
+        self._entries = OrderStatisticIndex()  # 排序键 (-score, seq) -> 记录
+        self._index = {}  # player_name -> 排序键
+        self.total_score = 0
+        self.size_counts = {}  # 棋盘大小 -> 记录数
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def scores(self) -> List[Dict[str, Any]]:
+        """按分数从高到低排列的全部记录，O(n)"""
+        return list(self._entries.values())
+    
+    def items(self) -> List[Tuple[Tuple[int, int], Dict[str, Any]]]:
+        """按排名顺序的全部(排序键, 记录)，O(n)"""
+        return list(self._entries.items())
+    
+    def _insert(self, key: Tuple[int, int], entry: Dict[str, Any]):
+        """按排序键插入记录"""
+        self._entries.insert(key, entry)
+        self._index[entry['player_name']] = key
+        self.total_score += entry['score']
+        size = entry['size']
+        self.size_counts[size] = self.size_counts.get(size, 0) + 1
+    
+    def _remove(self, key: Tuple[int, int]) -> Dict[str, Any]:
+        """按排序键删除记录"""
+        entry = self._entries.remove(key)
+        if self._index.get(entry['player_name']) == key:
+            del self._index[entry['player_name']]
+        self.total_score -= entry['score']
+        size = entry['size']
+        self.size_counts[size] -= 1
+        if not self.size_counts[size]:
+            del self.size_counts[size]
+        return entry
+    
+    def apply(self, key: Tuple[int, int], entry: Dict[str, Any]) -> bool:
+        """写入记录（同一玩家只保留最高分），返回是否有改动"""
+        existing_key = self._index.get(entry['player_name'])
+        # 已有记录且新分数不更高时无需改动
+        if existing_key is not None and -key[0] <= -existing_key[0]:
+            return False
+        
+        if existing_key is not None:
+            self._remove(existing_key)
+        self._insert(key, entry)
+        
+        # 设置了上限时只保留前max_entries名
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._remove(self._entries.key_at(len(self._entries) - 1))
+        return True
+    
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """前limit名记录"""
+        return self._entries.slice(0, limit)
+    
+    def rank(self, score: int) -> int:
+        """排名为分数严格更高的记录数加一"""
+        return self._entries.index((-score, -1)) + 1
+    
+    def percentile(self, score: int) -> float:
+        """分数严格低于score的记录占比（百分数）"""
+        total = len(self._entries)
+        if not total:
+            return 0.0
+        lower = total - self._entries.index((-score, float('inf')))
+        return round(100.0 * lower / total, 2)
+    
+    def player_rank(self, player_name: str, around: int = 0) -> Optional[Dict[str, Any]]:
+        """玩家的名次、百分位以及前后around名的记录"""
+        key = self._index.get(player_name)
+        if key is None:
+            return None
+        position = self._entries.index(key)
+        score = -key[0]
+        return {
+            'player_name': player_name,
+            'score': score,
+            'rank': self.rank(score),
+            'position': position + 1,
+            'total_players': len(self._entries),
+            'percentile': self.percentile(score),
+            'around': self._entries.slice(position - around, position + around + 1)
+        }
+    
+    def best_key(self) -> Optional[Tuple[int, int]]:
+        """最高分记录的排序键"""
+        return self._entries.key_at(0) if len(self._entries) else None
+    
+    def stats(self, tie_key=None) -> Dict[str, Any]:
+        """
+        O(1)读取统计信息（棋盘大小种类数为常数）
+        
+        Args:
+            tie_key: 最常见棋盘大小并列时的排序函数，取值最小者
+        """
+        if not len(self._entries):
+            return {
+                'total_players': 0,
+                'highest_score': 0,
+                'average_score': 0,
+                'most_common_size': 4
+            }
+        
+        total_players = len(self._entries)
+        top_count = max(self.size_counts.values())
+        tied = [size for size, count in self.size_counts.items() if count == top_count]
+        most_common_size = min(tied, key=tie_key) if tie_key and len(tied) > 1 else tied[0]
+        return {
+            'total_players': total_players,
+            'highest_score': self._entries[0]['score'],
+            'average_score': self.total_score // total_players,
+            'most_common_size': most_common_size
+        }
+
 
 class LeaderboardManager:
     """排行榜管理器"""
     
-    def __init__(self, data_file: str = "leaderboard.json"):
+    def __init__(self, data_file: str = "leaderboard.json", max_entries: Optional[int] = None, autosave: bool = True,
+                 persistence: str = "snapshot", fsync: str = "interval", fsync_interval: float = 1.0,
+                 compact_bytes: int = 1024 * 1024, flush_interval: float = 0.0, flush_max_dirty: int = 100):
+        """
+        Args:
+            data_file: 快照文件路径，日志为其后加.journal
+            max_entries: 每个分区最多保留的记录数，None为不限
+            autosave: 写入后是否持久化
+            persistence: snapshot（每次写入重写快照）或journal（追加日志，超过compact_bytes时压缩为快照）
+            fsync: 日志的fsync策略，见FSYNC_POLICIES；interval时最多每fsync_interval秒一次，写入的合并由此完成
+            fsync_interval: interval策略的fsync间隔（秒）
+            compact_bytes: 日志压缩阈值（字节）
+            flush_interval: 仅snapshot模式：大于0时写入只做标记，由后台线程按此间隔合并为一次快照写入；
+                journal模式下不使用
+            flush_max_dirty: 仅snapshot模式：未落盘的写入达到此数时提前刷盘
+        """
+        if persistence not in PERSISTENCE_MODES:
+            raise ValueError(f"未知的持久化模式: {persistence}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"未知的fsync策略: {fsync}")
         self.data_file = data_file
-        self.scores = []
+        self.journal_file = data_file + ".journal"
+        self.max_entries = max_entries
+        self.autosave = autosave
+        self.persistence = persistence
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self._journal = None
+        self._journal_size = 0
+        self._last_fsync = 0.0
+        self._fsync_timer = None  # interval策略下补做fsync的定时器，写入停顿后最后的记录也会落盘
+        self._compacting = False
+        # 后台刷盘：flush_interval大于0时，快照模式的写入合并后由后台线程落盘（日志模式不使用）
+        self.flush_interval = flush_interval
+        self.flush_max_dirty = flush_max_dirty
+        self._dirty = 0
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._flusher = None
+        # 快照写入互斥：取数据和写文件在同一临界区内，较早取得的数据不会覆盖较新的快照
+        self._snapshot_lock = threading.Lock()
+        self.flush_stats = {
+            'flushes': 0,
+            'coalesced_writes': 0,
+            'failed_flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+        self._boards = {}  # (窗口, 棋盘大小或None) -> RankedBoard
+        self._window_starts = {}  # 窗口 -> 当前周期起始时间
+        self._seq = itertools.count()
+        self.version = 0  # 任一分区内容变化时递增，供响应缓存判断数据是否更新
+        self._listeners = []  # 数据变化时调用的回调
+        self._lock = threading.RLock()
         self.load_scores()
     
     def load_scores(self):
-        """加载排行榜数据"""
+        """加载排行榜数据（快照加日志回放）"""
+        scores = []
         if os.path.exists(self.data_file):
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.scores = json.load(f)
+                    scores = json.load(f)
             except Exception:
-                self.scores = []
-        else:
-            self.scores = []
+                scores = []
+        self._rebuild(scores)
+        
+        # 无论当前模式，都回放残留日志，切换模式不会丢数据
+        with self._lock:
+            self._replay_journal(self.journal_file + ".old")
+            self._journal_size = self._replay_journal(self.journal_file)
+    
+    def _replay_journal(self, path: str) -> int:
+        """回放日志文件，截掉写了一半的尾行，返回有效字节数"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            print(f"读取排行榜日志失败: {e}")
+            return 0
+        
+        valid = data.rfind(b'\n') + 1
+        for line in data[:valid].splitlines():
+            try:
+                self._apply_entry(json.loads(line.decode('utf-8')))
+            except (ValueError, KeyError, TypeError):
+                continue
+        
+        if valid < len(data):
+            try:
+                with open(path, 'r+b') as f:
+                    f.truncate(valid)
+            except Exception as e:
+                print(f"截断排行榜日志失败: {e}")
+        return valid
+    
+    @property
+    def scores(self) -> List[Dict[str, Any]]:
+        """总榜记录（按分数从高到低）"""
+        return self._board('all', None).scores
+    
+    def _board(self, window: str, size: Optional[int]) -> RankedBoard:
+        """获取分区，不存在时创建"""
+        board = self._boards.get((window, size))
+        if board is None:
+            board = RankedBoard(self.max_entries)
+            self._boards[(window, size)] = board
+        return board
+    
+    def _roll_windows(self, now: datetime):
+        """进入新周期的窗口直接丢弃旧分区，无需扫描历史"""
+        for window in WINDOWS[1:]:
+            start = window_start(window, now)
+            if self._window_starts.get(window) != start:
+                self._window_starts[window] = start
+                for key in [k for k in self._boards if k[0] == window]:
+                    del self._boards[key]
+    
+    def _rebuild(self, scores: List[Dict[str, Any]]):
+        """由记录列表重建所有分区"""
+        with self._lock:
+            self._seq = itertools.count()
+            self._boards = {}
+            self._window_starts = {}
+            self._roll_windows(datetime.now())
+            keyed = sorted(((-entry['score'], next(self._seq)), entry) for entry in scores)
+            for key, entry in keyed:
+                self._apply_keyed(key, entry, self._entry_time(entry))
+            self.version += 1
+    
+    @staticmethod
+    def _entry_time(entry: Dict[str, Any]) -> Optional[datetime]:
+        """解析记录时间，无法解析时返回None（只计入总榜）"""
+        try:
+            return datetime.fromisoformat(entry['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            return None
     
     def save_scores(self):
         """保存排行榜数据"""
+        with self._snapshot_lock:
+            with self._lock:
+                parts = self._snapshot_parts()
+            self._write_snapshot(merge_boards(parts))
+    
+    def _snapshot_parts(self) -> List[List[Tuple[Tuple[int, int], Dict[str, Any]]]]:
+        """
+        复制各分区的(排序键, 记录)，在锁外用merge_boards合并为快照（调用方持有锁）
+        
+        快照须包含所有分区中的记录，而不只是总榜：玩家在某个棋盘大小或当天/当周的最高分
+        可能低于其总榜记录，只保存总榜时重启后这些分区无法重建
+        """
+        return [board.items() for board in self._boards.values()]
+    
+    def _write_snapshot(self, scores: List[Dict[str, Any]]) -> bool:
+        """先写临时文件再原子替换，进程中途退出不会留下残缺文件（调用方持有_snapshot_lock）"""
+        temp_file = self.data_file + ".tmp"
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.scores, f, ensure_ascii=False, indent=2)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(scores, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.data_file)
+            return True
         except Exception as e:
             print(f"保存排行榜失败: {e}")
+            return False
+    
+    def start_flusher(self):
+        """启动后台刷盘线程（仅快照模式），退出时自动做最后一次刷盘"""
+        if self._flusher is not None or self.flush_interval <= 0 or self.persistence != 'snapshot':
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name='leaderboard-flush', daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+    
+    def _flush_loop(self):
+        """按时间间隔或脏写入数量阈值刷盘"""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+    
+    def _mark_dirty(self):
+        """记录一次未落盘的写入（调用方持有锁）"""
+        self._dirty += 1
+        if self._dirty >= self.flush_max_dirty:
+            self._flush_event.set()
+    
+    def flush(self) -> bool:
+        """把所有未落盘的写入合并为一次快照写入"""
+        with self._snapshot_lock:
+            with self._lock:
+                dirty = self._dirty
+                if not dirty:
+                    return True
+                self._dirty = 0
+                parts = self._snapshot_parts()
+            
+            start = time.perf_counter()
+            ok = self._write_snapshot(merge_boards(parts))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            stats = self.flush_stats
+            if not ok:
+                stats['failed_flushes'] += 1
+                with self._lock:
+                    self._dirty += dirty
+                return False
+            stats['flushes'] += 1
+            stats['coalesced_writes'] += dirty - 1
+            stats['last_flush_ms'] = elapsed_ms
+            stats['max_flush_ms'] = max(stats['max_flush_ms'], elapsed_ms)
+            stats['total_flush_ms'] += elapsed_ms
+            return True
+    
+    def get_flush_stats(self) -> Dict[str, Any]:
+        """获取后台刷盘统计"""
+        stats = dict(self.flush_stats)
+        stats['pending_writes'] = self._dirty
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
+    
+    def _append_journal(self, entry: Dict[str, Any]):
+        """追加一条紧凑日志，超过阈值时触发后台压缩（调用方持有锁）"""
+        data = (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        try:
+            if self._journal is None:
+                self._journal = open(self.journal_file, 'ab')
+            self._journal.write(data)
+            self._journal.flush()
+            self._journal_size += len(data)
+            
+            now = time.monotonic()
+            if self.fsync == 'always' or (self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._journal.fileno())
+                self._last_fsync = now
+            elif self.fsync == 'interval' and self._fsync_timer is None:
+                # 间隔未到，到期时由定时器补做，之后没有新写入也不会一直不落盘
+                self._fsync_timer = threading.Timer(self.fsync_interval - (now - self._last_fsync), self._timed_fsync)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+        except Exception as e:
+            print(f"写入排行榜日志失败: {e}")
+            return
+        
+        if self._journal_size >= self.compact_bytes:
+            self.compact(background=True)
+    
+    def _timed_fsync(self):
+        """定时器到期：同步上次fsync之后追加的日志"""
+        with self._lock:
+            self._fsync_timer = None
+            if self._journal is None:
+                return
+            try:
+                os.fsync(self._journal.fileno())
+                self._last_fsync = time.monotonic()
+            except Exception as e:
+                print(f"同步排行榜日志失败: {e}")
+    
+    def compact(self, background: bool = False):
+        """将当前状态写成快照并清空日志"""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+            parts = self._snapshot_parts()
+            # 轮换日志：新写入进入新日志，旧日志在快照落盘后删除
+            self._close_journal()
+            old_journal = self.journal_file + ".old"
+            if os.path.exists(self.journal_file):
+                if os.path.exists(old_journal):
+                    # 上次压缩未完成，先并入快照
+                    with open(old_journal, 'ab') as dst, open(self.journal_file, 'rb') as src:
+                        dst.write(src.read())
+                    os.remove(self.journal_file)
+                else:
+                    os.replace(self.journal_file, old_journal)
+            self._journal_size = 0
+        
+        def work():
+            try:
+                with self._snapshot_lock:
+                    self._write_snapshot(merge_boards(parts))
+                if os.path.exists(old_journal):
+                    os.remove(old_journal)
+            except Exception as e:
+                print(f"压缩排行榜日志失败: {e}")
+            finally:
+                self._compacting = False
+        
+        if background:
+            threading.Thread(target=work, name='leaderboard-compact', daemon=True).start()
+        else:
+            work()
+    
+    def _close_journal(self):
+        """同步并关闭日志文件（调用方持有锁）"""
+        if self._fsync_timer is not None:
+            self._fsync_timer.cancel()
+            self._fsync_timer = None
+        if self._journal is not None:
+            try:
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+                self._journal.close()
+            except Exception as e:
+                print(f"关闭排行榜日志失败: {e}")
+            self._journal = None
+    
+    def close(self):
+        """关闭排行榜，停止后台刷盘并落盘所有数据"""
+        if self._flusher is not None:
+            self._stop_event.set()
+            self._flush_event.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        with self._lock:
+            self._close_journal()
+    
+    def add_listener(self, callback):
+        """注册数据变化回调（在持有锁时以新版本号调用，回调应尽快返回）"""
+        self._listeners.append(callback)
     
     def add_score(self, score: int, max_tile: int, moves: int, size: int, player_name: str = "匿名玩家"):
         """添加新分数到排行榜（兼容旧方法）"""
         self.add_or_update_score(player_name, score, max_tile, moves, size)
     
-    def add_or_update_score(self, player_name: str, score: int, max_tile: int, moves: int, size: int):
-        """更新或添加玩家分数（同一个玩家只保留最高分）"""
-        # 查找是否已有该玩家的记录
-        existing_entry = None
-        for entry in self.scores:
-            if entry['player_name'] == player_name:
-                existing_entry = entry
-                break
+    def add_or_update_score(self, player_name: str, score: int, max_tile: int, moves: int, size: int) -> bool:
+        """
+        更新或添加玩家分数（每个分区中同一个玩家只保留最高分）
         
+        Returns:
+            是否有分区改动；只刷新了分大小榜或日/周榜时也会持久化
+        """
+        now = datetime.now()
         new_entry = {
             'score': score,
             'max_tile': max_tile,
             'moves': moves,
             'size': size,
             'player_name': player_name,
-            'timestamp': datetime.now().isoformat(),
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M')
+            'timestamp': now.isoformat(),
+            'date': now.strftime('%Y-%m-%d %H:%M')
         }
         
-        if existing_entry:
-            # 如果新分数更高，则更新
-            if score > existing_entry['score']:
-                self.scores.remove(existing_entry)
-                self.scores.append(new_entry)
-        else:
-            # 添加新玩家
-            self.scores.append(new_entry)
-        
-        # 按分数排序，保留前100名
-        self.scores.sort(key=lambda x: x['score'], reverse=True)
-        self.scores = self.scores[:100]
+        with self._lock:
+            self._roll_windows(now)
+            touched = self._apply_entry(new_entry, now)
+            if not touched or not self.autosave:
+                return touched
+            if self.persistence == 'journal':
+                # 在锁内追加，保证日志顺序与内存更新顺序一致
+                self._append_journal(new_entry)
+                return touched
+            if self._flusher is not None:
+                # 交给后台线程合并落盘
+                self._mark_dirty()
+                return touched
         
         self.save_scores()
+        return touched
+    
+    def _apply_entry(self, new_entry: Dict[str, Any], when: Optional[datetime] = None) -> bool:
+        """将记录应用到所有相关分区，返回是否有分区改动（调用方持有锁）"""
+        if when is None:
+            when = self._entry_time(new_entry)
+        # 新序号排在同分记录之后，与原稳定排序一致
+        return self._apply_keyed((-new_entry['score'], next(self._seq)), new_entry, when)
     
-    def get_top_scores(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """获取排行榜前N名"""
-        return self.scores[:limit]
+    def _apply_keyed(self, key: Tuple[int, int], entry: Dict[str, Any], when: Optional[datetime]) -> bool:
+        """按排序键写入总榜、分大小榜以及时间仍在当前周期内的窗口榜，返回是否有分区改动"""
+        size = entry['size']
+        touched = self._board('all', None).apply(key, entry)
+        touched = self._board('all', size).apply(key, entry) or touched
+        if when is not None:
+            for window in WINDOWS[1:]:
+                start = self._window_starts.get(window)
+                if start is not None and when >= start:
+                    touched = self._board(window, None).apply(key, entry) or touched
+                    touched = self._board(window, size).apply(key, entry) or touched
+        if touched:
+            self.version += 1
+            for callback in self._listeners:
+                callback(self.version)
+        return touched
     
-    def get_rank_by_score(self, score: int) -> int:
+    def _read_board(self, window: str, size: Optional[int]) -> Optional[RankedBoard]:
+        """查询用：先按当前时间滚动窗口，再取分区"""
+        if window not in WINDOWS:
+            raise ValueError(f"未知的排行榜窗口: {window}")
+        with self._lock:
+            if window != 'all':
+                self._roll_windows(datetime.now())
+            return self._boards.get((window, size))
+    
+    def get_top_scores(self, limit: int = 10, size: Optional[int] = None, window: str = 'all') -> List[Dict[str, Any]]:
+        """获取排行榜前N名，可按棋盘大小和时间窗口筛选"""
+        board = self._read_board(window, size)
+        with self._lock:
+            return board.top(limit) if board else []
+    
+    def get_rank_by_score(self, score: int, size: Optional[int] = None, window: str = 'all') -> int:
         """根据分数获取排名"""
-        for i, entry in enumerate(self.scores):
-            if entry['score'] <= score:
-                return i + 1
-        return len(self.scores) + 1
+        board = self._read_board(window, size)
+        with self._lock:
+            return board.rank(score) if board else 1
     
-    def get_stats(self) -> Dict[str, Any]:
-        """获取排行榜统计信息"""
-        if not self.scores:
+    def get_score_percentile(self, score: int, size: Optional[int] = None, window: str = 'all') -> Dict[str, Any]:
+        """分数对应的名次和百分位（低于该分数的玩家占比）"""
+        board = self._read_board(window, size)
+        with self._lock:
             return {
-                'total_players': 0,
-                'highest_score': 0,
-                'average_score': 0,
-                'most_common_size': 4
+                'score': score,
+                'rank': board.rank(score) if board else 1,
+                'total_players': len(board) if board else 0,
+                'percentile': board.percentile(score) if board else 0.0
             }
+    
+    def get_player_rank(self, player_name: str, size: Optional[int] = None, window: str = 'all',
+                        around: int = 0) -> Optional[Dict[str, Any]]:
+        """玩家的名次、百分位以及前后around名的记录，玩家不在榜上时返回None"""
+        board = self._read_board(window, size)
+        with self._lock:
+            return board.player_rank(player_name, around) if board else None
+    
+    def get_stats(self, size: Optional[int] = None, window: str = 'all') -> Dict[str, Any]:
+        """获取排行榜统计信息"""
+        board = self._read_board(window, size)
+        if board is None:
+            return RankedBoard(self.max_entries).stats()
         
-        total_players = len(self.scores)
-        highest_score = max(s['score'] for s in self.scores)
-        average_score = sum(s['score'] for s in self.scores) // total_players
-        
-        # 获取最常见的棋盘大小
-        size_counts = {}
-        for score in self.scores:
-            size = score['size']
-            size_counts[size] = size_counts.get(size, 0) + 1
-        most_common_size = max(size_counts.items(), key=lambda x: x[1])[0]
+        def tie_key(board_size):
+            # 并列时取排名最靠前的记录所属大小，与按排行顺序计数一致；分区不存在时排在最后
+            size_board = self._boards.get((window, board_size))
+            key = size_board.best_key() if size_board is not None else None
+            return key if key is not None else (float('inf'), 0)
         
-        return {
-            'total_players': total_players,
-            'highest_score': highest_score,
-            'average_score': average_score,
-            'most_common_size': most_common_size
-        }
+        with self._lock:
+            return board.stats(tie_key)
+
+
+def _create_default_leaderboard():
+    """按game_config.json的leaderboard配置创建排行榜"""
+    config = GameConfig()
+    data_file = config.get('leaderboard.data_file', 'leaderboard.json')
+    if config.get('leaderboard.storage', 'json') == 'sqlite':
+        from server.sqlite_leaderboard import SQLiteLeaderboardManager
+        return SQLiteLeaderboardManager(config.get('leaderboard.database', 'leaderboard.db'), import_file=data_file)
+    
+    manager = LeaderboardManager(
+        data_file=data_file,
+        persistence=config.get('leaderboard.persistence', 'journal'),
+        fsync=config.get('leaderboard.fsync', 'interval'),
+        fsync_interval=config.get('leaderboard.fsync_interval', 1.0),
+        compact_bytes=config.get('leaderboard.compact_bytes', 1024 * 1024),
+        flush_interval=config.get('leaderboard.flush_interval', 0.0),
+        flush_max_dirty=config.get('leaderboard.flush_max_dirty', 100)
+    )
+    manager.start_flusher()
+    return manager
 
 # 全局排行榜实例
-leaderboard = LeaderboardManager()
\ No newline at end of file
+leaderboard = _create_default_leaderboard()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排行榜推送
+客户端通过Socket.IO订阅排行榜频道，排行榜变化时服务器推送前N名的差异，
+突发写入按最大推送频率合并，取代客户端定时轮询。
+多个工作进程共用SQLite排行榜时，每个进程各自计算差异并只推送给本进程的订阅者，
+其他进程的写入通过定期比较数据库中的版本号发现
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 没有写入时也定期刷新一次，覆盖日/周窗口跨周期的变化
+IDLE_REFRESH_SECONDS = 60.0
+
+# remote模式下检查其他进程写入的间隔（秒）
+REMOTE_POLL_SECONDS = 0.5
+
+
+def channel_name(size: Optional[int], window: str) -> str:
+    """排行榜频道名，同时用作Socket.IO房间名"""
+    return f"leaderboard:{window}:{size if size is not None else 'all'}"
+
+
+def diff_top(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    比较前后两次的前N名
+    
+    Returns:
+        {'entered': 新进入的记录, 'moved': 名次或记录变化的记录, 'left': 离开的玩家名}，
+        entered和moved中每项为{'rank', 'entry'}；没有变化时返回None
+    """
+    previous = {entry['player_name']: (rank, entry) for rank, entry in enumerate(old, 1)}
+    entered = []
+    moved = []
+    current = set()
+    for rank, entry in enumerate(new, 1):
+        name = entry['player_name']
+        current.add(name)
+        before = previous.get(name)
+        if before is None:
+            entered.append({'rank': rank, 'entry': entry})
+        elif before[0] != rank or before[1] != entry:
+            moved.append({'rank': rank, 'entry': entry})
+    left = [name for name in previous if name not in current]
+    if not (entered or moved or left):
+        return None
+    return {'entered': entered, 'moved': moved, 'left': left}
+
+
+class LeaderboardPublisher:
+    """排行榜订阅管理和合并推送"""
+    
+    def __init__(self, socketio, board, top_n: int = 10, max_rate: float = 2.0, remote: bool = False):
+        """
+        Args:
+            socketio: SocketIO实例
+            board: 排行榜管理器（需支持add_listener和get_top_scores）
+            top_n: 每个频道推送的名次数
+            max_rate: 每秒最多推送次数，期间的写入合并为一次推送
+            remote: 其他工作进程也写入同一排行榜，定期比较board.version发现它们的写入
+        """
+        self.socketio = socketio
+        self.board = board
+        self.top_n = top_n
+        self.remote = remote
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._published_version = None
+        self._channels = {}  # 频道 -> {'size', 'window', 'sids', 'scores'}
+        self._sid_channels = {}  # sid -> 已订阅频道集合
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._task = None
+        self.stats = {
+            'notifications': 0,
+            'publishes': 0,
+            'diffs_sent': 0,
+            'snapshots_sent': 0
+        }
+        board.add_listener(self._on_change)
+    
+    def _on_change(self, version: int):
+        """排行榜变化回调，只做标记，由后台任务合并推送"""
+        self.stats['notifications'] += 1
+        self._changed.set()
+    
+    def _ensure_task(self):
+        """首次订阅时启动后台推送任务（调用方持有锁）"""
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+    
+    def subscribe(self, sid: str, size: Optional[int] = None, window: str = 'all') -> Dict[str, Any]:
+        """
+        登记订阅并返回频道快照，之后的差异以该快照为基准
+        
+        Returns:
+            {'channel', 'version', 'scores'}
+        """
+        name = channel_name(size, window)
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is None:
+                channel = {
+                    'size': size,
+                    'window': window,
+                    'sids': set(),
+                    'scores': self.board.get_top_scores(self.top_n, size=size, window=window)
+                }
+                self._channels[name] = channel
+            channel['sids'].add(sid)
+            self._sid_channels.setdefault(sid, set()).add(name)
+            self.stats['snapshots_sent'] += 1
+            self._ensure_task()
+            return {'channel': name, 'version': self.board.version, 'scores': channel['scores']}
+    
+    def unsubscribe(self, sid: str, name: Optional[str] = None) -> List[str]:
+        """取消订阅指定频道或该连接的全部频道，返回被取消的频道"""
+        with self._lock:
+            names = self._sid_channels.get(sid, set())
+            removed = [name] if name in names else ([] if name else list(names))
+            for channel_key in removed:
+                names.discard(channel_key)
+                channel = self._channels[channel_key]
+                channel['sids'].discard(sid)
+                if not channel['sids']:
+                    del self._channels[channel_key]
+            if not names:
+                self._sid_channels.pop(sid, None)
+            return removed
+    
+    def publish(self) -> int:
+        """重新计算所有有订阅者的频道并推送差异，返回推送的频道数"""
+        sent = 0
+        with self._lock:
+            version = self.board.version
+            for name, channel in self._channels.items():
+                scores = self.board.get_top_scores(self.top_n, size=channel['size'], window=channel['window'])
+                diff = diff_top(channel['scores'], scores)
+                if diff is None:
+                    continue
+                channel['scores'] = scores
+                diff['channel'] = name
+                diff['version'] = version
+                # 差异以本进程订阅时的快照为基准，只发给本进程的订阅者（共享后端下不经StateServer转发）
+                self.socketio.emit('leaderboard_diff', diff, to=name, ignore_queue=True)
+                sent += 1
+            self._published_version = version
+            self.stats['publishes'] += 1
+            self.stats['diffs_sent'] += sent
+        return sent
+    
+    def _run(self):
+        """后台任务：等待变化，推送后至少间隔min_interval再推送下一次"""
+        last_publish = time.monotonic()
+        while True:
+            changed = self._changed.wait(REMOTE_POLL_SECONDS if self.remote else IDLE_REFRESH_SECONDS)
+            self._changed.clear()
+            if not changed and self.remote and time.monotonic() - last_publish < IDLE_REFRESH_SECONDS:
+                try:
+                    if self.board.version == self._published_version:
+                        continue
+                except Exception as e:
+                    print(f"读取排行榜版本失败: {e}")
+                    continue
+            last_publish = time.monotonic()
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"推送排行榜失败: {e}")
+            self.socketio.sleep(self.min_interval)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取推送统计"""
+        with self._lock:
+            return dict(self.stats, channels=len(self._channels), subscribers=len(self._sid_channels))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单人游戏移动通道
+Socket.IO的move事件按连接记录序号，重复或过期的按键不会重复执行
+"""
+
+import threading
+from typing import Optional
+
+
+class MoveSequencer:
+    """按连接记录已执行的最大移动序号，并串行化同一连接的移动"""
+    
+    def __init__(self):
+        self._last = {}  # sid -> 已执行的最大序号
+        self._locks = {}  # sid -> 串行化该连接移动的锁
+        self._lock = threading.Lock()
+    
+    def lock(self, sid: str) -> threading.Lock:
+        """获取连接的移动锁"""
+        with self._lock:
+            lock = self._locks.get(sid)
+            if lock is None:
+                lock = self._locks[sid] = threading.Lock()
+            return lock
+    
+    def accept(self, sid: str, seq: Optional[int]) -> bool:
+        """
+        序号大于已执行的最大序号时接受并记录（调用方持有该连接的锁）
+        
+        没有序号的移动总是接受，兼容不带序号的客户端
+        """
+        if seq is None:
+            return True
+        if seq <= self._last.get(sid, 0):
+            return False
+        self._last[sid] = seq
+        return True
+    
+    def last(self, sid: str) -> int:
+        """连接已执行的最大序号"""
+        return self._last.get(sid, 0)
+    
+    def forget(self, sid: str):
+        """连接断开时清理"""
+        with self._lock:
+            self._last.pop(sid, None)
+            self._locks.pop(sid, None)
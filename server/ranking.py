@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+顺序统计索引
+分块有序列表加树状数组，支持对数时间的按键排名和按名次取值
+"""
+
+import bisect
+from typing import Any, Iterator, List, Tuple
+
+# 每块的目标长度，超过两倍时拆分
+LOAD = 512
+
+
+class OrderStatisticIndex:
+    """按键升序保存(键, 值)，支持插入、删除、按键求名次和按名次取值"""
+    
+    def __init__(self):
+        self._keys = []  # 分块的有序键
+        self._values = []  # 与_keys一一对应的值
+        self._maxes = []  # 每块最大键
+        self._tree = [0]  # 各块长度的树状数组（下标从1开始）
+        self._len = 0
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def _rebuild_tree(self):
+        """块结构变化后重建树状数组，O(块数)"""
+        tree = [0] + [len(block) for block in self._keys]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+    
+    def _tree_add(self, block: int, delta: int):
+        i = block + 1
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+    
+    def _prefix(self, block: int) -> int:
+        """前block块的元素总数"""
+        total = 0
+        i = block
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+    
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """名次position（从0计）所在的(块, 块内偏移)"""
+        block = 0
+        tree = self._tree
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = block + step
+            if nxt < len(tree) and tree[nxt] <= position:
+                block = nxt
+                position -= tree[nxt]
+            step >>= 1
+        return block, position
+    
+    def insert(self, key: Any, value: Any):
+        """插入键值，键必须唯一"""
+        if not self._maxes:
+            self._keys.append([key])
+            self._values.append([value])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            self._len = 1
+            return
+        
+        block = bisect.bisect_left(self._maxes, key)
+        if block == len(self._maxes):
+            block -= 1
+            self._maxes[block] = key
+        keys = self._keys[block]
+        offset = bisect.bisect_left(keys, key)
+        keys.insert(offset, key)
+        self._values[block].insert(offset, value)
+        self._len += 1
+        
+        if len(keys) > 2 * LOAD:
+            # 拆分过大的块
+            values = self._values[block]
+            self._keys[block:block + 1] = [keys[:LOAD], keys[LOAD:]]
+            self._values[block:block + 1] = [values[:LOAD], values[LOAD:]]
+            self._maxes[block:block + 1] = [keys[LOAD - 1], keys[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(block, 1)
+    
+    def remove(self, key: Any) -> Any:
+        """删除键，返回对应的值；键不存在时抛出KeyError"""
+        block = bisect.bisect_left(self._maxes, key)
+        if block == len(self._maxes):
+            raise KeyError(key)
+        keys = self._keys[block]
+        offset = bisect.bisect_left(keys, key)
+        if offset == len(keys) or keys[offset] != key:
+            raise KeyError(key)
+        del keys[offset]
+        value = self._values[block].pop(offset)
+        self._len -= 1
+        
+        if not keys:
+            del self._keys[block]
+            del self._values[block]
+            del self._maxes[block]
+            self._rebuild_tree()
+        else:
+            self._maxes[block] = keys[-1]
+            self._tree_add(block, -1)
+        return value
+    
+    def index(self, key: Any) -> int:
+        """小于key的元素个数"""
+        block = bisect.bisect_left(self._maxes, key)
+        if block == len(self._maxes):
+            return self._len
+        return self._prefix(block) + bisect.bisect_left(self._keys[block], key)
+    
+    def key_at(self, position: int) -> Any:
+        """第position个键（从0计）"""
+        block, offset = self._locate(position)
+        return self._keys[block][offset]
+    
+    def __getitem__(self, position: int) -> Any:
+        """第position个值（从0计）"""
+        if position < 0:
+            position += self._len
+        if not 0 <= position < self._len:
+            raise IndexError(position)
+        block, offset = self._locate(position)
+        return self._values[block][offset]
+    
+    def slice(self, start: int, stop: int) -> List[Any]:
+        """名次区间[start, stop)的值"""
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        block, offset = self._locate(start)
+        result = []
+        while len(result) < stop - start:
+            values = self._values[block]
+            take = min(len(values) - offset, stop - start - len(result))
+            result.extend(values[offset:offset + take])
+            block += 1
+            offset = 0
+        return result
+    
+    def values(self) -> Iterator[Any]:
+        """按键升序遍历所有值"""
+        for values in self._values:
+            yield from values
+    
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        """按键升序遍历所有(键, 值)"""
+        for keys, values in zip(self._keys, self._values):
+            yield from zip(keys, values)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+版本化响应缓存
+按(数据版本, 查询)缓存预先序列化的响应体和ETag，
+数据未变化时轮询请求无需重新查询和序列化
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+CachedResponse = Tuple[bytes, str]
+
+
+def make_etag(body: bytes) -> str:
+    """由响应体计算强ETag（不含引号）"""
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+class ResponseCache:
+    """有界LRU响应缓存，键中包含数据版本，旧版本条目自然被淘汰"""
+    
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """查询缓存，返回(响应体, ETag)或None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, key: Hashable, body: bytes) -> CachedResponse:
+        """写入响应体，返回(响应体, ETag)"""
+        result = (body, make_etag(body))
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+    
+    def clear(self):
+        """清空缓存和计数器"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多人房间
+每个房间有自己的锁，同一房间的动作串行执行并按序号广播，
+不同房间之间互不等待；全局锁只在创建、回收房间和维护连接索引时使用。
+连接到房间的反向索引使断开时的清理只涉及该连接加入过的房间，
+后台线程定期回收无人或长期无动作的房间。
+观战者不能操作游戏，单独加入观战Socket.IO房间，由server.spectators合并推送。
+房间表只记录本进程中的连接；房间游戏及其版本（广播序号）保存在游戏状态后端中
+"""
+
+import atexit
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+def spectator_room(room_id: str) -> str:
+    """房间观战者所在的Socket.IO房间"""
+    return f"{room_id}#spectators"
+
+
+class RoomRegistry:
+    """房间表：room_id -> {'players', 'compact_players', 'spectators', 'lock', 'last_activity', 'closed'}"""
+    
+    def __init__(self, empty_ttl: float = 300.0, idle_ttl: float = 86400.0,
+                 on_remove: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Args:
+            empty_ttl: 无人房间保留的秒数
+            idle_ttl: 有人但没有动作的房间保留的秒数
+            on_remove: 房间被回收后以(room_id, 房间)调用，用于清理关联数据和通知成员
+        """
+        self.empty_ttl = empty_ttl
+        self.idle_ttl = idle_ttl
+        self.on_remove = on_remove
+        self._rooms = {}
+        self._sid_rooms = {}  # sid -> 已加入的房间集合
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sweeper = None
+        self.stats = {
+            'created': 0,
+            'removed_empty': 0,
+            'removed_idle': 0,
+            'sweeps': 0
+        }
+    
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._rooms
+    
+    def __len__(self) -> int:
+        return len(self._rooms)
+    
+    def get(self, room_id: str) -> Optional[Dict[str, Any]]:
+        """获取房间，不存在时返回None"""
+        return self._rooms.get(room_id)
+    
+    def get_or_create(self, room_id: str) -> Dict[str, Any]:
+        """获取房间，不存在时创建"""
+        room = self._rooms.get(room_id)
+        if room is not None:
+            return room
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                room = self._rooms[room_id] = {
+                    'players': set(),
+                    'compact_players': set(),  # 选择紧凑协议的连接，接收game_delta而非game_state
+                    'spectators': set(),  # 观战连接，按限定频率接收合并后的game_state
+                    'lock': threading.Lock(),  # 串行化该房间的动作和快照
+                    'last_activity': time.monotonic(),
+                    'closed': False  # 已被回收，持有旧引用的调用方需重新获取
+                }
+                self.stats['created'] += 1
+            return room
+    
+    @contextmanager
+    def locked(self, room_id: str, create: bool = False) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        获取房间并在持有房间锁期间使用，同时刷新活动时间
+        
+        房间不存在且create为假时得到None；拿到锁时房间恰好被回收则重新获取
+        """
+        while True:
+            room = self.get_or_create(room_id) if create else self._rooms.get(room_id)
+            if room is None:
+                yield None
+                return
+            with room['lock']:
+                if room['closed']:
+                    continue
+                room['last_activity'] = time.monotonic()
+                yield room
+                return
+    
+    def add_player(self, room_id: str, room: Dict[str, Any], sid: str, compact: bool = False):
+        """登记连接加入房间（调用方持有房间锁）"""
+        room['players'].add(sid)
+        if compact:
+            room['compact_players'].add(sid)
+        with self._lock:
+            self._sid_rooms.setdefault(sid, set()).add(room_id)
+    
+    def add_spectator(self, room_id: str, room: Dict[str, Any], sid: str):
+        """登记连接以观战者身份加入房间（调用方持有房间锁）"""
+        room['spectators'].add(sid)
+        with self._lock:
+            self._sid_rooms.setdefault(sid, set()).add(room_id)
+    
+    def remove_sid(self, sid: str) -> List[str]:
+        """连接断开时从其加入过的房间中移除，返回这些房间"""
+        with self._lock:
+            room_ids = self._sid_rooms.pop(sid, set())
+        for room_id in room_ids:
+            with self.locked(room_id) as room:
+                if room is not None:
+                    room['players'].discard(sid)
+                    room['compact_players'].discard(sid)
+                    room['spectators'].discard(sid)
+        return list(room_ids)
+    
+    def sweep(self) -> int:
+        """回收无人（玩家和观战者都没有）超过empty_ttl或无动作超过idle_ttl的房间，返回回收数量"""
+        now = time.monotonic()
+        candidates = [(room_id, room) for room_id, room in list(self._rooms.items())
+                      if now - room['last_activity'] >= min(self.empty_ttl, self.idle_ttl)]
+        removed = []
+        for room_id, room in candidates:
+            with room['lock']:
+                idle = now - room['last_activity']
+                members = room['players'] | room['spectators']
+                if members and idle >= self.idle_ttl:
+                    self.stats['removed_idle'] += 1
+                elif not members and idle >= self.empty_ttl:
+                    self.stats['removed_empty'] += 1
+                else:
+                    continue
+                room['closed'] = True
+                with self._lock:
+                    self._rooms.pop(room_id, None)
+                    for sid in members:
+                        joined = self._sid_rooms.get(sid)
+                        if joined is not None:
+                            joined.discard(room_id)
+                            if not joined:
+                                del self._sid_rooms[sid]
+            removed.append((room_id, room))
+        self.stats['sweeps'] += 1
+        if self.on_remove:
+            for room_id, room in removed:
+                self.on_remove(room_id, room)
+        return len(removed)
+    
+    def start_sweeper(self, interval: float = 60.0):
+        """启动后台回收线程"""
+        if self._sweeper is not None or interval <= 0:
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,), name='room-sweeper', daemon=True)
+        self._sweeper.start()
+        atexit.register(self.stop_sweeper)
+    
+    def _sweep_loop(self, interval: float):
+        """按间隔回收房间"""
+        while not self._stop_event.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"回收房间失败: {e}")
+    
+    def stop_sweeper(self):
+        """停止后台回收线程"""
+        if self._sweeper is not None:
+            self._stop_event.set()
+            self._sweeper.join()
+            self._sweeper = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """房间、玩家数量和内存占用（估算值，不含房间游戏）"""
+        with self._lock:
+            rooms = list(self._rooms.values())
+            memory = sys.getsizeof(self._rooms) + sys.getsizeof(self._sid_rooms)
+            memory += sum(sys.getsizeof(joined) for joined in self._sid_rooms.values())
+            connections = len(self._sid_rooms)
+        players = 0
+        spectators = 0
+        empty = 0
+        for room in rooms:
+            players += len(room['players'])
+            spectators += len(room['spectators'])
+            empty += not (room['players'] or room['spectators'])
+            memory += sys.getsizeof(room) + sum(sys.getsizeof(room[key])
+                                                for key in ('players', 'compact_players', 'spectators'))
+        return dict(
+            self.stats,
+            rooms=len(rooms),
+            empty_rooms=empty,
+            players=players,
+            spectators=spectators,
+            connections=connections,
+            memory_bytes=memory
+        )
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务器运行时
+按game_config.json的server.runtime选择：
+    dev        Flask开发服务器（与app.run(threaded=True)相同，HTTP/1.0，每个请求一个连接）
+    threading  多线程WSGI服务器，HTTP/1.1长连接，停止时排空进行中的请求
+    gevent     协作式WSGI服务器，适合大量并发Socket.IO连接（需安装gevent，最好同时安装gevent-websocket）
+CPU密集的提示搜索可通过server.hint_processes放到多个进程中；移动本身只需几微秒，仍在请求线程内执行。
+server.workers大于1时本进程运行共享状态服务器（server.state_backend.StateServer），
+并启动相应数量的工作进程，分别监听port、port+1……，各自以shared后端服务同一批会话和房间；
+排行榜须使用SQLite存储（leaderboard.storage为sqlite），各进程读写同一数据库；
+Socket.IO的长轮询要求同一连接的请求落在同一进程，前端代理须按客户端粘滞（如nginx的ip_hash）
+
+命令行: python -m server.runner [--runtime 运行时] [--host 地址] [--port 端口] [--workers 进程数]
+"""
+
+import socket
+import threading
+import time
+from typing import Optional
+
+RUNTIMES = ('dev', 'threading', 'gevent')
+
+
+def available_runtime(runtime: str) -> str:
+    """返回可用的运行时，所需的库未安装时退回threading"""
+    if runtime not in RUNTIMES:
+        print(f"未知的运行时: {runtime}，使用threading")
+        return 'threading'
+    if runtime == 'gevent':
+        try:
+            import gevent  # noqa: F401
+        except ImportError:
+            print("未安装gevent，使用threading")
+            return 'threading'
+    return runtime
+
+
+def async_mode_for(runtime: str) -> str:
+    """运行时对应的SocketIO异步模式"""
+    return 'gevent' if runtime == 'gevent' else 'threading'
+
+
+class _TrackedBody:
+    """包装响应体，关闭时计入请求完成"""
+    
+    def __init__(self, body, done):
+        self._body = body
+        self._done = done
+    
+    def __iter__(self):
+        return iter(self._body)
+    
+    def close(self):
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._done()
+
+
+class ServerRunner:
+    """在选定的运行时中运行WSGI应用，支持绑定随机端口和排空后停止"""
+    
+    def __init__(self, app, host: str = '0.0.0.0', port: int = 5000, runtime: str = 'threading',
+                 drain_timeout: float = 10.0):
+        """
+        Args:
+            app: Flask应用
+            host: 监听地址
+            port: 监听端口，0表示由系统分配
+            runtime: 运行时，见RUNTIMES
+            drain_timeout: 停止时等待进行中请求完成的最长秒数
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.runtime = runtime
+        self.drain_timeout = drain_timeout
+        self.server = None
+        self._serving = threading.Event()
+        self._draining = False
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'rejected': 0
+        }
+    
+    def _wsgi(self, environ, start_response):
+        """统计进行中的普通请求；排空期间拒绝新请求。Socket.IO连接为长连接，不计入"""
+        if environ.get('PATH_INFO', '').startswith('/socket.io'):
+            return self.app(environ, start_response)
+        if self._draining:
+            self.stats['rejected'] += 1
+            start_response('503 Service Unavailable', [('Content-Type', 'text/plain'),
+                                                       ('Content-Length', '0'), ('Connection', 'close')])
+            return [b'']
+        with self._lock:
+            self._inflight += 1
+            self.stats['requests'] += 1
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._request_done()
+            raise
+        return _TrackedBody(body, self._request_done)
+    
+    def _request_done(self):
+        with self._lock:
+            self._inflight -= 1
+    
+    def bind(self):
+        """创建服务器并绑定端口（端口被占用时抛出OSError），port为0时更新为实际端口"""
+        if self.server is not None:
+            return
+        if self.runtime == 'gevent':
+            from gevent import pywsgi
+            try:
+                from geventwebsocket.handler import WebSocketHandler as handler_class
+            except ImportError:
+                handler_class = pywsgi.WSGIHandler
+            server = pywsgi.WSGIServer((self.host, self.port), self._wsgi, handler_class=handler_class, log=None)
+            server.init_socket()
+            port = server.server_port
+        else:
+            from werkzeug.serving import WSGIRequestHandler, make_server
+            
+            class KeepAliveRequestHandler(WSGIRequestHandler):
+                """HTTP/1.1请求处理器，同一连接可连续发送多个请求"""
+                protocol_version = 'HTTP/1.1'
+                
+                def log_request(self, *args, **kwargs):
+                    pass
+            
+            handler = KeepAliveRequestHandler if self.runtime == 'threading' else WSGIRequestHandler
+            # 自行创建监听套接字再交给werkzeug：端口被占用时werkzeug会直接退出进程，这里改为抛出OSError
+            family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+            listener = socket.create_server((self.host, self.port), family=family, backlog=128)
+            try:
+                server = make_server(self.host, self.port, self._wsgi, threaded=True, request_handler=handler,
+                                     fd=listener.fileno())
+            finally:
+                listener.close()
+            port = server.server_address[1]
+            server.daemon_threads = True
+        self.server = server
+        self.port = port
+    
+    def serve_forever(self):
+        """在当前线程运行服务器直到stop"""
+        self.bind()
+        self._serving.set()
+        try:
+            self.server.serve_forever()
+        finally:
+            self._serving.clear()
+    
+    def start(self) -> threading.Thread:
+        """绑定端口后在后台线程运行服务器；绑定失败时在调用线程抛出OSError"""
+        self.bind()
+        thread = threading.Thread(target=self.serve_forever, name='server-runner', daemon=True)
+        thread.start()
+        return thread
+    
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待服务器开始处理连接（绑定后到来的连接在此之前已进入监听队列），返回是否就绪"""
+        return self._serving.wait(timeout)
+    
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        停止接受新连接，通知Socket.IO客户端，并等待进行中的请求完成
+        
+        Returns:
+            是否在超时前排空
+        """
+        if self.server is None:
+            return True
+        timeout = self.drain_timeout if timeout is None else timeout
+        self._draining = True
+        socketio = self.app.extensions.get('socketio')
+        if socketio is not None:
+            try:
+                socketio.emit('server_shutdown', {})
+            except Exception as e:
+                print(f"通知客户端失败: {e}")
+        
+        deadline = time.monotonic() + timeout
+        if self.runtime == 'gevent':
+            # gevent关闭监听后自行等待活动连接，超时后强制关闭
+            self.server.stop(timeout=timeout)
+        elif self._serving.is_set():
+            self.server.shutdown()
+        while self._inflight > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        drained = self._inflight == 0
+        if self.runtime != 'gevent':
+            self.server.server_close()
+        self.server = None
+        self._draining = False
+        return drained
+
+
+def _wait_for_signal():
+    """阻塞到收到SIGINT或SIGTERM"""
+    import signal
+    
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *args: stop_event.set())
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    while not stop_event.wait(1.0):
+        pass
+
+
+def run(runtime: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None,
+        workers: Optional[int] = None, state_backend: Optional[str] = None):
+    """按配置创建应用并运行，收到SIGINT/SIGTERM时排空后退出"""
+    from utils.config import GameConfig
+    
+    config = GameConfig()
+    workers = config.get('server.workers', 1) if workers is None else workers
+    if workers > 1:
+        run_workers(config, workers, runtime, host, port)
+        return
+    runtime = available_runtime(runtime or config.get('server.runtime', 'threading'))
+    if runtime == 'gevent':
+        # 必须在导入Flask应用之前打补丁
+        from gevent import monkey
+        monkey.patch_all()
+    
+    from server.flask_app import create_app
+    
+    app = create_app(async_mode_for(runtime), state_backend)
+    runner = ServerRunner(app, host or config.get('server.host', '0.0.0.0'),
+                          config.get('server.port', 5000) if port is None else port,
+                          runtime, config.get('server.drain_timeout', 10.0))
+    runner.start()
+    print(f"服务器运行中 ({runtime}): http://{runner.host}:{runner.port}", flush=True)
+    _wait_for_signal()
+    drained = runner.stop()
+    print("服务器已停止" if drained else "服务器已停止（部分请求未完成）", flush=True)
+
+
+def run_workers(config, workers: int, runtime: Optional[str] = None, host: Optional[str] = None,
+                port: Optional[int] = None):
+    """运行共享状态服务器和workers个工作进程，收到SIGINT/SIGTERM时先让工作进程排空退出，再保存状态"""
+    import subprocess
+    import sys
+    from server.state_backend import create_server
+    
+    if config.get('leaderboard.storage', 'json') != 'sqlite':
+        # JSON排行榜在每个进程的内存中各有一份，各进程追加并压缩同一日志会丢失其他进程的记录
+        raise SystemExit("多个工作进程须共用SQLite排行榜，请将leaderboard.storage设为sqlite")
+    state_server = create_server(config)
+    state_server.start()
+    runtime = runtime or config.get('server.runtime', 'threading')
+    host = host or config.get('server.host', '0.0.0.0')
+    port = config.get('server.port', 5000) if port is None else port
+    processes = [subprocess.Popen([sys.executable, '-m', 'server.runner', '--runtime', runtime, '--host', host,
+                                   '--port', str(port + i), '--workers', '1', '--state-backend', 'shared'])
+                 for i in range(workers)]
+    print(f"状态服务器: {state_server.address}，工作进程: {workers}（端口{port}-{port + workers - 1}）", flush=True)
+    _wait_for_signal()
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=config.get('server.drain_timeout', 10.0) + 5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    state_server.close()
+
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='运行游戏服务器')
+    parser.add_argument('--runtime', choices=RUNTIMES)
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int, help='工作进程数，大于1时同时运行共享状态服务器')
+    parser.add_argument('--state-backend', choices=('local', 'shared'), help='游戏状态后端')
+    args = parser.parse_args()
+    run(args.runtime, args.host, args.port, args.workers, args.state_backend)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+观战推送
+玩家的动作立即广播给玩家；观战者只收到合并后的帧：房间变化时做标记，
+后台任务按最大频率为每个有变化的房间生成一帧最新状态，
+整帧只序列化一次并以一次房间广播发给全部观战者，未发出的旧帧直接被最新帧取代。
+多个工作进程共享状态时，广播经发布/订阅通道到达其他进程中的观战者
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+from server.rooms import spectator_room
+
+
+class SpectatorFanout:
+    """观战者的合并推送"""
+    
+    def __init__(self, socketio, rooms, frame: Callable[[str], Dict[str, Any]],
+                 max_rate: float = 5.0, remote: bool = False):
+        """
+        Args:
+            socketio: SocketIO实例
+            rooms: 房间表（RoomRegistry）
+            frame: 以room_id生成一帧状态，调用时持有房间锁
+            max_rate: 每个房间每秒最多推送的帧数
+            remote: 其他工作进程中可能有观战者，本进程没有观战者时也推送
+        """
+        self.socketio = socketio
+        self.rooms = rooms
+        self.frame = frame
+        self.remote = remote
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._pending = set()  # 有未推送变化的房间
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._task = None
+        self.stats = {
+            'marks': 0,
+            'coalesced': 0,
+            'frames': 0
+        }
+    
+    def mark(self, room_id: str):
+        """房间状态变化，只做标记，由后台任务合并推送"""
+        with self._lock:
+            self.stats['marks'] += 1
+            if room_id in self._pending:
+                self.stats['coalesced'] += 1
+            else:
+                self._pending.add(room_id)
+            if self._task is None:
+                self._task = self.socketio.start_background_task(self._run)
+        self._changed.set()
+    
+    def flush(self) -> int:
+        """为每个有变化的房间推送一帧最新状态，返回推送的帧数"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        sent = 0
+        for room_id in pending:
+            with self.rooms.locked(room_id) as room:
+                if room is None or not (room['spectators'] or self.remote):
+                    continue
+                # 在房间锁内发送，帧之间的顺序与序号一致
+                self.socketio.emit('game_state', self.frame(room_id), to=spectator_room(room_id))
+                sent += 1
+        self.stats['frames'] += sent
+        return sent
+    
+    def _run(self):
+        """后台任务：等待变化，推送后至少间隔min_interval再推送下一帧"""
+        while True:
+            self._changed.wait()
+            self._changed.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"推送观战状态失败: {e}")
+            self.socketio.sleep(self.min_interval)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取推送统计"""
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
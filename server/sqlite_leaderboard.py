@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite排行榜存储
+使用WAL模式的本地数据库保存全部玩家分数，每个分区（总榜、分大小榜、日/周榜）各自保存每个玩家的最高分，
+写入走单一写连接，读取使用每线程独立连接。
+名次和百分位不逐行计数：每个分区按分数分段（粗、细两级）维护人数，
+"高于某分数的人数"只需累加分段人数并数出所在细分段内的记录，与总人数无关
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS board_scores (
+    board TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    max_tile INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (board, player_name)
+);
+CREATE INDEX IF NOT EXISTS idx_board_scores_rank ON board_scores (board, score DESC, seq);
+CREATE TABLE IF NOT EXISTS score_buckets (
+    board TEXT NOT NULL,
+    shift INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    PRIMARY KEY (board, shift, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS board_sizes (
+    board TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    total_score INTEGER NOT NULL,
+    PRIMARY KEY (board, size)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+COLUMNS = "score, max_tile, moves, size, player_name, timestamp, date"
+
+# 分数分段的位移：细分段宽64分，粗分段宽4096分
+FINE_SHIFT = 6
+COARSE_SHIFT = 12
+
+# 高于给定分数的记录数：粗分段、同一粗分段内的细分段、同一细分段内的记录三部分相加
+COUNT_ABOVE = f"""
+SELECT
+    (SELECT COALESCE(SUM(players), 0) FROM score_buckets
+     WHERE board = :board AND shift = {COARSE_SHIFT} AND bucket > :score >> {COARSE_SHIFT})
+    + (SELECT COALESCE(SUM(players), 0) FROM score_buckets
+       WHERE board = :board AND shift = {FINE_SHIFT} AND bucket > :score >> {FINE_SHIFT}
+       AND bucket < ((:score >> {COARSE_SHIFT}) + 1) << {COARSE_SHIFT - FINE_SHIFT})
+    + (SELECT COUNT(*) FROM board_scores
+       WHERE board = :board AND score > :score AND score < ((:score >> {FINE_SHIFT}) + 1) << {FINE_SHIFT})
+"""
+
+
+def board_name(window: str, size: Optional[int], when: datetime) -> str:
+    """
+    分区名：总榜为all，日/周榜带周期起始日期，分大小榜再加棋盘大小，
+    如 all、all:4、daily:2026-10-17、weekly:2026-10-12:8
+    """
+    # 延迟导入，避免与默认排行榜实例的创建形成循环导入
+    from server.leaderboard import WINDOWS, window_start
+    if window not in WINDOWS:
+        raise ValueError(f"未知的排行榜窗口: {window}")
+    start = window_start(window, when)
+    name = window if start is None else f"{window}:{start.date().isoformat()}"
+    return name if size is None else f"{name}:{size}"
+
+
+class SQLiteLeaderboardManager:
+    """SQLite排行榜管理器，接口和各分区的结果与LeaderboardManager一致"""
+    
+    def __init__(self, db_file: str = "leaderboard.db", import_file: Optional[str] = "leaderboard.json"):
+        """
+        Args:
+            db_file: 数据库文件路径
+            import_file: 首次打开时一次性导入的旧版JSON排行榜
+        """
+        self.db_file = db_file
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._listeners = []  # 数据变化时调用的回调
+        self._periods = {}  # 窗口 -> 最近写入的周期分区名，进入新周期时删除旧周期的分区
+        self._writer = self._connect()
+        with self._write_lock:
+            self._writer.executescript(SCHEMA)
+            # 版本号存放在数据库中，多个进程共用同一数据库时看到相同的版本；旧数据库从最大序号起算
+            self._writer.execute(
+                "INSERT OR IGNORE INTO meta (key, value) "
+                "SELECT 'version', COALESCE(MAX(seq), -1) + 1 FROM board_scores")
+            if self._writer.execute("SELECT 1 FROM meta WHERE key = 'counts'").fetchone() is None:
+                self._rebuild_counts()
+            self._migrate_legacy()
+        if import_file:
+            self.import_json(import_file)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """创建WAL模式连接"""
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+    
+    def _reader(self) -> sqlite3.Connection:
+        """获取当前线程的只读连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+    
+    def _rebuild_counts(self):
+        """按现有记录重建分段人数和各棋盘大小的统计（调用方持有写锁）"""
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            self._writer.execute("DELETE FROM score_buckets")
+            self._writer.execute("DELETE FROM board_sizes")
+            for shift in (FINE_SHIFT, COARSE_SHIFT):
+                self._writer.execute(
+                    "INSERT INTO score_buckets (board, shift, bucket, players) "
+                    "SELECT board, ?, score >> ?, COUNT(*) FROM board_scores GROUP BY board, score >> ?",
+                    (shift, shift, shift))
+            self._writer.execute(
+                "INSERT INTO board_sizes (board, size, players, total_score) "
+                "SELECT board, size, COUNT(*), SUM(score) FROM board_scores GROUP BY board, size")
+            self._writer.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('counts', '1')")
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+    
+    @property
+    def version(self) -> int:
+        """数据版本，任一进程写入改动后递增，供响应缓存和推送判断数据是否更新"""
+        return int(self._reader().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+    
+    def _notify(self):
+        """写入事务提交后以新版本号调用回调（调用方持有写锁）"""
+        version = int(self._writer.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+        for callback in self._listeners:
+            callback(version)
+    
+    def _migrate_legacy(self):
+        """旧版数据库每个玩家只有一行（scores表），按记录顺序写入各分区后删除（调用方持有写锁）"""
+        legacy = self._writer.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'scores'").fetchone()
+        if legacy is None:
+            return
+        rows = self._writer.execute(f"SELECT {COLUMNS} FROM scores ORDER BY seq").fetchall()
+        self._writer.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                self._upsert(dict(row))
+            self._writer.execute("DROP TABLE scores")
+            self._writer.execute("COMMIT")
+        except Exception:
+            self._writer.execute("ROLLBACK")
+            raise
+        self._notify()
+    
+    def import_json(self, json_file: str) -> int:
+        """
+        一次性导入旧版JSON排行榜，重复调用不会重复导入
+        
+        Returns:
+            改动了至少一个分区的记录数
+        """
+        with self._write_lock:
+            done = self._writer.execute(
+                "SELECT value FROM meta WHERE key = 'imported_json'").fetchone()
+            if done or not os.path.exists(json_file):
+                return 0
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except Exception as e:
+                print(f"导入排行榜失败: {e}")
+                return 0
+            
+            count = 0
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                for entry in entries:
+                    if self._upsert(entry):
+                        count += 1
+                self._writer.execute(
+                    "INSERT INTO meta (key, value) VALUES ('imported_json', ?)",
+                    (os.path.abspath(json_file),))
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+            if count:
+                self._notify()
+            return count
+    
+    def load_scores(self):
+        """数据库即时持久化，无需加载"""
+        pass
+    
+    def save_scores(self):
+        """数据库即时持久化，无需保存"""
+        pass
+    
+    def close(self):
+        """关闭写连接"""
+        with self._write_lock:
+            self._writer.close()
+    
+    def add_listener(self, callback):
+        """注册数据变化回调（本进程的写入提交后、仍持有写锁时以新版本号调用，回调应尽快返回）"""
+        self._listeners.append(callback)
+    
+    def add_score(self, score: int, max_tile: int, moves: int, size: int, player_name: str = "匿名玩家"):
+        """添加新分数到排行榜（兼容旧方法）"""
+        self.add_or_update_score(player_name, score, max_tile, moves, size)
+    
+    def _boards_for(self, entry: Dict[str, Any], now: datetime) -> List[str]:
+        """记录所属的分区：总榜和分大小榜，时间在当前周期内时还有日/周榜（与LeaderboardManager相同）"""
+        from server.leaderboard import window_start
+        size = entry.get('size', 4)
+        boards = [board_name('all', None, now), board_name('all', size, now)]
+        try:
+            when = datetime.fromisoformat(entry['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            when = None  # 无法解析时间的记录只计入总榜
+        for window in ('daily', 'weekly'):
+            current = board_name(window, None, now)
+            if self._periods.get(window) != current:
+                self._roll_window(window, current)
+            if when is not None and when >= window_start(window, now):
+                boards += [current, board_name(window, size, now)]
+        return boards
+    
+    def _roll_window(self, window: str, current: str):
+        """删除窗口旧周期的分区及其统计（调用方持有写锁）"""
+        for table in ('board_scores', 'score_buckets', 'board_sizes'):
+            self._writer.execute(
+                f"DELETE FROM {table} WHERE board LIKE ? AND board != ? AND board NOT LIKE ?",
+                (f"{window}:%", current, f"{current}:%"))
+        self._periods[window] = current
+    
+    def _count(self, board: str, score: int, size: int, delta: int):
+        """分区中增减一条记录后更新分段人数和棋盘大小统计（调用方持有写锁）"""
+        for shift in (FINE_SHIFT, COARSE_SHIFT):
+            self._writer.execute(
+                "INSERT INTO score_buckets (board, shift, bucket, players) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (board, shift, bucket) DO UPDATE SET players = players + excluded.players",
+                (board, shift, score >> shift, delta))
+        self._writer.execute(
+            "INSERT INTO board_sizes (board, size, players, total_score) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (board, size) DO UPDATE SET "
+            "players = players + excluded.players, total_score = total_score + excluded.total_score",
+            (board, size, delta, delta * score))
+    
+    def _upsert(self, entry: Dict[str, Any]) -> bool:
+        """把记录写入所属的各个分区，每个分区仅在新分数更高时覆盖，返回是否有分区改动（调用方持有写锁）"""
+        score = entry['score']
+        size = entry.get('size', 4)
+        # 序号取当前版本号：写事务内读取，多个进程写入时也唯一且递增
+        seq = int(self._writer.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+        row = (entry['player_name'], score, entry.get('max_tile', 0), entry.get('moves', 0),
+               size, entry.get('timestamp', ''), entry.get('date', ''), seq)
+        changed = False
+        for board in self._boards_for(entry, datetime.now()):
+            old = self._writer.execute(
+                "SELECT score, size FROM board_scores WHERE board = ? AND player_name = ?",
+                (board, entry['player_name'])).fetchone()
+            if old is not None and score <= old[0]:
+                continue
+            self._writer.execute(
+                "INSERT OR REPLACE INTO board_scores "
+                "(board, player_name, score, max_tile, moves, size, timestamp, date, seq) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (board,) + row)
+            if old is not None:
+                self._count(board, old[0], old[1], -1)
+            self._count(board, score, size, 1)
+            changed = True
+        if changed:
+            self._writer.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(seq + 1),))
+        return changed
+    
+    def add_or_update_score(self, player_name: str, score: int, max_tile: int, moves: int, size: int) -> bool:
+        """更新或添加玩家分数（每个分区中同一个玩家只保留最高分），返回是否有分区改动"""
+        now = datetime.now()
+        entry = {
+            'score': score,
+            'max_tile': max_tile,
+            'moves': moves,
+            'size': size,
+            'player_name': player_name,
+            'timestamp': now.isoformat(),
+            'date': now.strftime('%Y-%m-%d %H:%M')
+        }
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                changed = self._upsert(entry)
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+            if changed:
+                self._notify()
+            return changed
+    
+    def get_top_scores(self, limit: int = 10, size: Optional[int] = None, window: str = 'all') -> List[Dict[str, Any]]:
+        """获取排行榜前N名，可按棋盘大小和时间窗口筛选"""
+        rows = self._reader().execute(
+            f"SELECT {COLUMNS} FROM board_scores WHERE board = ? ORDER BY score DESC, seq LIMIT ?",
+            (board_name(window, size, datetime.now()), limit)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def _count_above(self, conn: sqlite3.Connection, board: str, score: int) -> int:
+        """分区中分数严格高于score的记录数"""
+        return conn.execute(COUNT_ABOVE, {'board': board, 'score': score}).fetchone()[0]
+    
+    def _total(self, conn: sqlite3.Connection, board: str) -> int:
+        """分区的记录数"""
+        return conn.execute(
+            "SELECT COALESCE(SUM(players), 0) FROM board_sizes WHERE board = ?", (board,)).fetchone()[0]
+    
+    def get_rank_by_score(self, score: int, size: Optional[int] = None, window: str = 'all') -> int:
+        """根据分数获取排名"""
+        return self._count_above(self._reader(), board_name(window, size, datetime.now()), score) + 1
+    
+    def get_score_percentile(self, score: int, size: Optional[int] = None, window: str = 'all') -> Dict[str, Any]:
+        """分数对应的名次和百分位（低于该分数的玩家占比）"""
+        board = board_name(window, size, datetime.now())
+        conn = self._reader()
+        nested = conn.in_transaction
+        if not nested:
+            # 几次查询在同一读事务中，期间的写入不会造成不一致
+            conn.execute("BEGIN")
+        try:
+            total = self._total(conn, board)
+            higher = self._count_above(conn, board, score)
+            lower = total - self._count_above(conn, board, score - 1)
+        finally:
+            if not nested:
+                conn.execute("COMMIT")
+        return {
+            'score': score,
+            'rank': higher + 1,
+            'total_players': total,
+            'percentile': round(100.0 * lower / total, 2) if total else 0.0
+        }
+    
+    def get_player_rank(self, player_name: str, size: Optional[int] = None, window: str = 'all',
+                        around: int = 0) -> Optional[Dict[str, Any]]:
+        """玩家的名次、百分位以及前后around名的记录，玩家不在榜上时返回None"""
+        board = board_name(window, size, datetime.now())
+        conn = self._reader()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(
+                "SELECT score, seq FROM board_scores WHERE board = ? AND player_name = ?",
+                (board, player_name)).fetchone()
+            if row is None:
+                return None
+            score, seq = row
+            # 排名顺序为分数降序、同分按序号升序；同分且序号更小的记录排在前面
+            before = self._count_above(conn, board, score) + conn.execute(
+                "SELECT COUNT(*) FROM board_scores WHERE board = ? AND score = ? AND seq < ?",
+                (board, score, seq)).fetchone()[0]
+            stats = self.get_score_percentile(score, size, window)
+            # 按排序键取前后相邻的记录，不用OFFSET逐行跳过
+            previous = self._neighbours(conn, board, score, seq, around, ahead=True)
+            following = self._neighbours(conn, board, score, seq, around, ahead=False)
+            current = conn.execute(
+                f"SELECT {COLUMNS} FROM board_scores WHERE board = ? AND player_name = ?",
+                (board, player_name)).fetchone()
+        finally:
+            conn.execute("COMMIT")
+        return {
+            'player_name': player_name,
+            'score': score,
+            'rank': stats['rank'],
+            'position': before + 1,
+            'total_players': stats['total_players'],
+            'percentile': stats['percentile'],
+            'around': previous[::-1] + [dict(current)] + following
+        }
+    
+    @staticmethod
+    def _neighbours(conn: sqlite3.Connection, board: str, score: int, seq: int, limit: int,
+                    ahead: bool) -> List[Dict[str, Any]]:
+        """
+        排在(score, seq)之前或之后最近的limit条记录
+        
+        Args:
+            ahead: True时取排在前面的记录（由近到远），否则取排在后面的记录
+        """
+        if limit <= 0:
+            return []
+        if ahead:
+            queries = ("score = ? AND seq < ? ORDER BY seq DESC", "score > ? ORDER BY score ASC, seq DESC")
+        else:
+            queries = ("score = ? AND seq > ? ORDER BY seq", "score < ? ORDER BY score DESC, seq")
+        rows = conn.execute(
+            f"SELECT {COLUMNS} FROM board_scores WHERE board = ? AND {queries[0]} LIMIT ?",
+            (board, score, seq, limit)).fetchall()
+        if len(rows) < limit:
+            rows += conn.execute(
+                f"SELECT {COLUMNS} FROM board_scores WHERE board = ? AND {queries[1]} LIMIT ?",
+                (board, score, limit - len(rows))).fetchall()
+        return [dict(row) for row in rows]
+    
+    def get_stats(self, size: Optional[int] = None, window: str = 'all') -> Dict[str, Any]:
+        """获取排行榜统计信息"""
+        now = datetime.now()
+        board = board_name(window, size, now)
+        conn = self._reader()
+        counts = conn.execute(
+            "SELECT size, players, total_score FROM board_sizes WHERE board = ? AND players > 0", (board,)).fetchall()
+        total_players = sum(players for _, players, _ in counts)
+        if not total_players:
+            return {
+                'total_players': 0,
+                'highest_score': 0,
+                'average_score': 0,
+                'most_common_size': 4
+            }
+        
+        highest_score = conn.execute(
+            "SELECT MAX(score) FROM board_scores WHERE board = ?", (board,)).fetchone()[0]
+        total_score = sum(score for _, _, score in counts)
+        top_count = max(players for _, players, _ in counts)
+        tied = [board_size for board_size, players, _ in counts if players == top_count]
+        
+        def tie_key(board_size):
+            # 与LeaderboardManager相同：并列时取对应分大小榜中排名最靠前的记录所属大小
+            best = conn.execute(
+                "SELECT score, seq FROM board_scores WHERE board = ? ORDER BY score DESC, seq LIMIT 1",
+                (board_name(window, board_size, now),)).fetchone()
+            return (-best[0], best[1]) if best else (float('inf'), 0)
+        
+        return {
+            'total_players': total_players,
+            'highest_score': highest_score,
+            'average_score': total_score // total_players,
+            'most_common_size': min(tied, key=tie_key) if len(tied) > 1 else tied[0]
+        }
+
+
+
+if __name__ == '__main__':
+    import sys
+    
+    # 用法: python -m server.sqlite_leaderboard [leaderboard.json] [leaderboard.db]
+    source = sys.argv[1] if len(sys.argv) > 1 else 'leaderboard.json'
+    target = sys.argv[2] if len(sys.argv) > 2 else 'leaderboard.db'
+    manager = SQLiteLeaderboardManager(target, import_file=None)
+    print(f"已导入 {manager.import_json(source)} 条记录到 {target}")
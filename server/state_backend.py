@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏状态后端
+create_app通过后端读写会话游戏和房间游戏，按game_config.json的state.backend选择：
+    local   进程内后端，游戏以对象保存在GameStore中（单进程部署）
+    shared  本地套接字后端：StateServer以打包后的字节串保存游戏、分配版本并提供按键加锁，
+            多个工作进程通过SharedBackend读写同一批会话和房间；
+            StateServer同时充当Socket.IO的发布/订阅通道（HubClientManager），房间广播可以到达其他进程中的成员
+
+读取得到GameEntry（游戏及其版本）；修改须在edit中进行，退出时写回，同一键的edit互斥（shared时跨进程）
+
+命令行: python -m server.state_backend   单独运行StateServer（按state.address监听）
+"""
+
+import pickle
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from socketio import PubSubManager
+
+from game.engine import freeze_game, thaw_game
+from server.game_journal import GameJournal
+from server.game_store import GameStore
+
+BACKENDS = ('local', 'shared')
+
+
+def dump_game(game) -> bytes:
+    """打包游戏用于跨进程传输；不支持冻结的引擎退回pickle（pickle以0x80开头，与冻结格式的引擎编号不冲突）"""
+    data = freeze_game(game)
+    return data if data is not None else pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+
+
+def load_game(data: bytes):
+    """还原dump_game的结果"""
+    return pickle.loads(data) if data[:1] == b'\x80' else thaw_game(data)
+
+
+def parse_address(address: str):
+    """'主机:端口'解析为TCP地址，否则视为Unix套接字路径"""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+class GameEntry:
+    """后端中的一个游戏及其版本"""
+    
+    __slots__ = ('key', 'game', 'version', 'changed')
+    
+    def __init__(self, key: Hashable, game, version: Optional[int]):
+        self.key = key
+        self.game = game  # 不存在时为None
+        self.version = version
+        self.changed = False
+    
+    def update(self, game=None, version: Optional[int] = None) -> int:
+        """
+        登记变化（只能在edit中调用），退出edit时写回
+        
+        Args:
+            game: 替换为新游戏，原地修改时省略
+            version: 新版本，省略时为该键的下一个序号（从1开始）
+        """
+        if game is not None:
+            self.game = game
+        self.version = (self.version or 0) + 1 if version is None else version
+        self.changed = True
+        return self.version
+
+
+class LocalBackend:
+    """进程内后端：游戏对象保存在GameStore中，读取不复制"""
+    
+    shared = False
+    
+    def __init__(self, store: GameStore):
+        self.store = store
+        # 键 -> 版本，游戏被淘汰时删除；版本是每个键自己的序号，
+        # 紧凑协议以它为增量基准，小整数使每次移动的增量只有几十字节
+        self._versions = {}
+    
+    def forget(self, key: Hashable):
+        """游戏被淘汰后删除版本（GameStore的on_evict中调用）"""
+        self._versions.pop(key, None)
+    
+    def get(self, key: Hashable) -> Optional[GameEntry]:
+        """读取游戏，不存在时返回None；从日志恢复的游戏在此分配版本"""
+        game = self.store.get(key)
+        if game is None:
+            return None
+        version = self._versions.get(key)
+        if version is None:
+            version = self._versions.setdefault(key, 1)
+        return GameEntry(key, game, version)
+    
+    @contextmanager
+    def edit(self, key: Hashable) -> Iterator[GameEntry]:
+        """在按键锁内读写游戏，游戏不存在时entry.game为None"""
+        # 与GameStore共用按键锁，降级和写日志不会打包修改到一半的游戏
+        with self.store.key_lock(key):
+            entry = self.get(key) or GameEntry(key, None, None)
+            game = entry.game
+            yield entry
+            if entry.changed:
+                if entry.game is not game:
+                    self.store[key] = entry.game
+                else:
+                    self.store.mark_dirty(key)
+                self._versions[key] = entry.version
+    
+    def start(self):
+        """读回日志并开始定期持久化"""
+        self.store.start_persister()
+    
+    def close(self):
+        self.store.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.store.get_stats(), backend='local')
+
+
+class SharedBackend:
+    """StateServer的客户端：每次读取都得到游戏的副本，edit持有服务端的按键锁直到写回"""
+    
+    shared = True
+    
+    def __init__(self, address: str, authkey: bytes):
+        """
+        Args:
+            address: StateServer地址，见parse_address
+            authkey: 连接认证密钥，与StateServer相同
+        """
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self._idle = []  # 空闲连接，edit期间连接被独占
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'bytes_sent': 0,
+            'bytes_received': 0
+        }
+    
+    @contextmanager
+    def _connection(self):
+        """取出一条空闲连接，没有时新建；出错的连接直接关闭（服务端随之释放其持有的锁）"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+        try:
+            yield conn
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self._idle.append(conn)
+    
+    def _call(self, conn, *request):
+        """发送请求并等待回复，服务端出错时抛出RuntimeError"""
+        conn.send(request)
+        ok, reply = conn.recv()
+        self.stats['requests'] += 1
+        if not ok:
+            raise RuntimeError(f"状态服务器错误: {reply}")
+        return reply
+    
+    def _entry(self, key: Hashable, reply) -> GameEntry:
+        if reply is None:
+            return GameEntry(key, None, None)
+        data, version = reply
+        self.stats['bytes_received'] += len(data)
+        return GameEntry(key, load_game(data), version)
+    
+    def get(self, key: Hashable) -> Optional[GameEntry]:
+        """读取游戏的副本，不存在时返回None"""
+        with self._connection() as conn:
+            entry = self._entry(key, self._call(conn, 'get', key))
+        return entry if entry.game is not None else None
+    
+    @contextmanager
+    def edit(self, key: Hashable) -> Iterator[GameEntry]:
+        """取得服务端的按键锁并读出游戏，退出时写回变化并释放锁；出错时不写回"""
+        with self._connection() as conn:
+            entry = self._entry(key, self._call(conn, 'acquire', key))
+            try:
+                yield entry
+            except BaseException:
+                self._call(conn, 'release', key)
+                raise
+            if entry.changed:
+                data = dump_game(entry.game)
+                self.stats['bytes_sent'] += len(data)
+                self._call(conn, 'commit', key, data, entry.version)
+            else:
+                self._call(conn, 'release', key)
+    
+    def publish(self, channel: str, message):
+        """发布消息给订阅该频道的所有连接（含本进程）"""
+        with self._connection() as conn:
+            self._call(conn, 'publish', channel, message)
+    
+    def subscribe(self, channel: str) -> Iterator[Any]:
+        """订阅频道，逐条产出消息；订阅占用一条专用连接"""
+        conn = Client(self.address, authkey=self.authkey)
+        try:
+            self._call(conn, 'subscribe', channel)
+            while True:
+                yield conn.recv()
+        finally:
+            conn.close()
+    
+    def start(self):
+        pass
+    
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._connection() as conn:
+            server = self._call(conn, 'stats')
+        return dict(server, backend='shared', client=dict(self.stats))
+
+
+class HubClientManager(PubSubManager):
+    """通过StateServer在工作进程之间转发Socket.IO的广播和房间操作"""
+    
+    name = 'game-state'
+    
+    def __init__(self, backend: SharedBackend, channel: str = 'socketio', write_only: bool = False):
+        super().__init__(channel=channel, write_only=write_only)
+        self.backend = backend
+    
+    def _publish(self, data):
+        self.backend.publish(self.channel, data)
+    
+    def _listen(self):
+        yield from self.backend.subscribe(self.channel)
+
+
+class StateServer:
+    """
+    共享状态服务器：键 -> (打包的游戏, 版本)，按最近访问顺序保留，
+    超出容量或长期不访问时淘汰；配置日志时定期写入变化的键，启动时读回
+    """
+    
+    def __init__(self, address: str, authkey: bytes, max_games: int = 20000, game_ttl: float = 86400.0,
+                 journal: Optional[GameJournal] = None, persist_interval: float = 5.0):
+        """
+        Args:
+            address: 监听地址，见parse_address
+            authkey: 连接认证密钥
+            max_games: 最多保存的游戏数
+            game_ttl: 游戏多少秒不访问后淘汰
+            journal: 持久化日志
+            persist_interval: 两次写日志之间的间隔（秒）
+        """
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.max_games = max_games
+        self.game_ttl = game_ttl
+        self.journal = journal
+        self.persist_interval = persist_interval
+        self._games = OrderedDict()  # 键 -> (字节串, 版本, 最后访问时间)，按访问顺序
+        self._key_locks = {}  # 键 -> [锁, 持有和等待的连接数]
+        self._subscribers = {}  # 频道 -> {连接: 发送锁}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._listener = None
+        self._threads = []
+        self.stats = {
+            'connections': 0,
+            'requests': 0,
+            'commits': 0,
+            'published': 0,
+            'evictions': 0,
+            'loaded': 0,
+            'persisted': 0
+        }
+    
+    def _load(self):
+        """从日志读回游戏，版本从1重新开始"""
+        if self.journal is None:
+            return
+        now = time.monotonic()
+        for key, data in self.journal.load().items():
+            self._games[key] = (data, 1, now)
+            self.stats['loaded'] += 1
+    
+    def start(self):
+        """读回日志、开始监听，并在后台线程接受连接和定期持久化"""
+        self._load()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.address = self._listener.address  # 端口为0时得到实际端口
+        self._stop_event.clear()
+        for target, name in ((self._accept_loop, 'state-accept'), (self._maintain_loop, 'state-persist')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _accept_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    print(f"接受状态连接失败: {e}")
+                    continue
+                return
+            self.stats['connections'] += 1
+            threading.Thread(target=self._serve, args=(conn,), name='state-conn', daemon=True).start()
+    
+    def _serve(self, conn):
+        """处理一条连接的请求；连接断开时释放其持有的锁"""
+        held = set()
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                op, args = request[0], request[1:]
+                self.stats['requests'] += 1
+                try:
+                    if op == 'subscribe':
+                        with self._lock:
+                            self._subscribers.setdefault(args[0], {})[conn] = threading.Lock()
+                        conn.send((True, None))
+                        # 之后该连接只用于推送
+                        return
+                    reply = self._handle(op, args, held)
+                except Exception as e:
+                    conn.send((False, str(e)))
+                    continue
+                conn.send((True, reply))
+        except (EOFError, OSError):
+            pass
+        finally:
+            for key in held:
+                self._release(key)
+    
+    def _handle(self, op: str, args, held: set):
+        """执行一个请求，held为该连接持有锁的键"""
+        if op == 'get':
+            return self._read(args[0])
+        if op == 'acquire':
+            key = args[0]
+            if key in held:
+                raise ValueError(f"重复加锁: {key}")
+            self._acquire(key)
+            held.add(key)
+            return self._read(key)
+        if op == 'commit':
+            key, data, version = args
+            if key not in held:
+                raise ValueError(f"未持有锁: {key}")
+            with self._lock:
+                self._games[key] = (data, version, time.monotonic())
+                self._games.move_to_end(key)
+                self._dirty.add(key)
+                self.stats['commits'] += 1
+                self._enforce()
+            held.discard(key)
+            self._release(key)
+            return None
+        if op == 'release':
+            if args[0] in held:
+                held.discard(args[0])
+                self._release(args[0])
+            return None
+        if op == 'publish':
+            self._publish(*args)
+            return None
+        if op == 'stats':
+            return self.get_stats()
+        raise ValueError(f"未知请求: {op}")
+    
+    def _read(self, key: Hashable):
+        """读取(字节串, 版本)并刷新访问时间，不存在时返回None"""
+        with self._lock:
+            entry = self._games.get(key)
+            if entry is None:
+                return None
+            self._games[key] = (entry[0], entry[1], time.monotonic())
+            self._games.move_to_end(key)
+            return entry[0], entry[1]
+    
+    def _acquire(self, key: Hashable):
+        """取得按键锁；没有连接持有或等待时锁即被删除"""
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        entry[0].acquire()
+    
+    def _release(self, key: Hashable):
+        with self._lock:
+            entry = self._key_locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._key_locks[key]
+        entry[0].release()
+    
+    def _publish(self, channel: str, message):
+        """推送给频道的所有订阅连接，发送失败的连接移除"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, {}).items())
+        for conn, send_lock in subscribers:
+            try:
+                with send_lock:
+                    conn.send(message)
+            except Exception:
+                with self._lock:
+                    self._subscribers.get(channel, {}).pop(conn, None)
+                conn.close()
+        self.stats['published'] += 1
+    
+    def _enforce(self, now: Optional[float] = None):
+        """淘汰超出容量的游戏，给出now时同时淘汰超时的游戏（调用方持有锁）"""
+        while len(self._games) > self.max_games:
+            key, _ = self._games.popitem(last=False)
+            self._dirty.add(key)
+            self.stats['evictions'] += 1
+        if now is None:
+            return
+        for key, (_, _, last_access) in list(self._games.items()):
+            if now - last_access < self.game_ttl:
+                break
+            del self._games[key]
+            self._dirty.add(key)
+            self.stats['evictions'] += 1
+    
+    def _maintain_loop(self):
+        while not self._stop_event.wait(self.persist_interval):
+            with self._lock:
+                self._enforce(time.monotonic())
+            self.flush()
+    
+    def flush(self) -> int:
+        """把变化和淘汰的键写入日志，返回写入的记录数"""
+        if self.journal is None:
+            return 0
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            records = {key: self._games[key][0] if key in self._games else None for key in dirty}
+        if not self.journal.write(records):
+            with self._lock:
+                self._dirty.update(dirty)
+            return 0
+        self.stats['persisted'] += len(records)
+        return len(records)
+    
+    def close(self):
+        """停止监听并写入剩余的变化"""
+        self._stop_event.set()
+        if self._listener is not None:
+            # 关闭监听套接字不会唤醒阻塞在accept中的线程，连一次使其认证失败后退出
+            try:
+                family = socket.AF_INET if isinstance(self.address, tuple) else socket.AF_UNIX
+                with socket.socket(family) as waker:
+                    waker.connect(self.address)
+            except OSError:
+                pass
+            self._listener.close()
+            self._listener = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.stats,
+                games=len(self._games),
+                max_games=self.max_games,
+                game_bytes=sum(len(entry[0]) for entry in self._games.values()),
+                locks=len(self._key_locks),
+                subscribers=sum(len(conns) for conns in self._subscribers.values()),
+                dirty=len(self._dirty),
+                journal=self.journal.get_stats() if self.journal is not None else None
+            )
+
+
+def state_authkey(config) -> bytes:
+    """StateServer与工作进程共用的认证密钥，保存在state.key_file中"""
+    from server.flask_app import load_secret_key
+    return load_secret_key(config.get('state.key_file', 'game_state.key')).encode('utf-8')
+
+
+def create_journal(config) -> Optional[GameJournal]:
+    """按game_store.persist_file创建持久化日志，未配置时返回None"""
+    persist_file = config.get('game_store.persist_file', '')
+    if not persist_file:
+        return None
+    return GameJournal(persist_file, config.get('game_store.compact_bytes', 4 * 1024 * 1024))
+
+
+def create_backend(config, backend: Optional[str] = None,
+                   on_evict: Optional[Callable[[Hashable], None]] = None):
+    """
+    按配置创建状态后端
+    
+    Args:
+        config: GameConfig
+        backend: 后端名称，见BACKENDS，省略时使用state.backend
+        on_evict: 进程内后端的游戏被淘汰时以键调用
+    """
+    backend = backend or config.get('state.backend', 'local')
+    if backend == 'shared':
+        return SharedBackend(config.get('state.address', '127.0.0.1:5099'), state_authkey(config))
+    if backend != 'local':
+        print(f"未知的状态后端: {backend}，使用local")
+    
+    def evicted(key):
+        local.forget(key)
+        if on_evict:
+            on_evict(key)
+    
+    store = GameStore(config.get('game_store.max_games', 1000),
+                      config.get('game_store.idle_ttl', 600),
+                      config.get('game_store.max_snapshots', 20000),
+                      config.get('game_store.snapshot_ttl', 86400),
+                      config.get('game_store.sweep_interval', 30),
+                      on_evict=evicted,
+                      journal=create_journal(config),
+                      persist_interval=config.get('game_store.persist_interval', 5))
+    local = LocalBackend(store)
+    return local
+
+
+def create_server(config, address: Optional[str] = None) -> StateServer:
+    """按配置创建StateServer，容量和持久化沿用game_store中降级游戏的设置"""
+    return StateServer(address or config.get('state.address', '127.0.0.1:5099'),
+                       state_authkey(config),
+                       config.get('game_store.max_snapshots', 20000),
+                       config.get('game_store.snapshot_ttl', 86400),
+                       create_journal(config),
+                       config.get('game_store.persist_interval', 5))
+
+
+
+if __name__ == '__main__':
+    import argparse
+    import signal
+    from utils.config import GameConfig
+    
+    parser = argparse.ArgumentParser(description='运行共享状态服务器')
+    parser.add_argument('--address', help='监听地址，默认为state.address')
+    args = parser.parse_args()
+    state_server = create_server(GameConfig(), args.address)
+    state_server.start()
+    print(f"状态服务器运行中: {state_server.address}", flush=True)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    while not stop_event.wait(1.0):
+        pass
+    state_server.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑游戏状态编码
+完整快照把方块指数打包为base64字节串；移动后只发送增量：
+变化格子的位图加上这些格子的新指数（同样base64），以及变化了的计数字段。
+增量以接收方声明持有的版本为基准（不再回传基准），版本与接收方记录不符时退回完整快照；
+版本是每个游戏自己的小序号
+
+字段（短键名以减小体积）:
+    v 版本, n 棋盘边长, c 快照方块指数,
+    d 增量（位图+新指数）, s 分数, h 最高分, m 步数, w 是否获胜, o 是否结束
+增量中的h等于原最高分与新分数的较大者时省略，由接收方计算
+"""
+
+import base64
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from game.engine import pack_game
+
+Counters = Tuple[int, int, int, bool, bool]
+COUNTER_KEYS = ('s', 'h', 'm', 'w', 'o')
+
+
+def _counters(game) -> Counters:
+    """分数、最高分、步数、是否获胜、是否结束"""
+    return game.score, game.high_score, game.moves, game.won, game.game_over
+
+
+def encode_snapshot(cells: bytes, size: int, counters: Counters, version: Optional[int]) -> Dict[str, Any]:
+    """完整快照"""
+    snapshot = {'v': version, 'n': size, 'c': base64.b64encode(cells).decode('ascii')}
+    snapshot.update(zip(COUNTER_KEYS, counters))
+    return snapshot
+
+
+def encode_delta(before: bytes, after: bytes, old_counters: Counters, counters: Counters,
+                 version: Optional[int]) -> Dict[str, Any]:
+    """增量：位图第i位表示第i格变化，其后依次为变化格子的新指数；计数字段只带变化的"""
+    bitmap = bytearray((len(after) + 7) // 8)
+    values = bytearray()
+    for index, (old, new) in enumerate(zip(before, after)):
+        if old != new:
+            bitmap[index >> 3] |= 1 << (index & 7)
+            values.append(new)
+    delta = {'v': version, 'd': base64.b64encode(bytes(bitmap) + bytes(values)).decode('ascii')}
+    for key, old, new in zip(COUNTER_KEYS, old_counters, counters):
+        if old != new:
+            delta[key] = new
+    if delta.get('h') == max(old_counters[1], counters[0]):
+        del delta['h']
+    return delta
+
+
+def decode_snapshot(snapshot: Dict[str, Any]) -> bytearray:
+    """从快照还原方块指数"""
+    return bytearray(base64.b64decode(snapshot['c']))
+
+
+def apply_delta(cells: bytearray, delta: Dict[str, Any]) -> bytearray:
+    """把增量应用到方块指数上"""
+    data = base64.b64decode(delta['d'])
+    offset = (len(cells) + 7) // 8
+    for index in range(len(cells)):
+        if data[index >> 3] >> (index & 7) & 1:
+            cells[index] = data[offset]
+            offset += 1
+    return cells
+
+
+class StateEncoder:
+    """
+    记录每个接收方最后发送的状态，按接收方声明的基准版本选择快照或增量；
+    记录数和空闲时间有上限（共享后端下收不到淘汰通知），被丢弃的接收方下次收到完整快照
+    """
+    
+    def __init__(self, max_entries: int = 20000, ttl: float = 86400.0):
+        """
+        Args:
+            max_entries: 最多保留的接收方记录数，超出时丢弃最久未发送的
+            ttl: 接收方记录多少秒未发送后丢弃
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sent = OrderedDict()  # 键 -> (版本, 方块指数, 计数字段, 发送时间)，按发送顺序
+        self._lock = threading.Lock()
+    
+    def encode(self, key: Hashable, game, version: Optional[int], base: Optional[int] = None) -> Dict[str, Any]:
+        """
+        编码游戏当前状态
+        
+        Args:
+            key: 接收方标识（会话或房间）
+            game: 游戏对象
+            version: 当前状态版本
+            base: 接收方已持有的状态版本
+        
+        Returns:
+            {'delta': ...}或{'snapshot': ...}
+        """
+        cells = pack_game(game)
+        counters = _counters(game)
+        now = time.monotonic()
+        with self._lock:
+            sent = self._sent.pop(key, None)
+            self._sent[key] = (version, cells, counters, now)
+            while len(self._sent) > self.max_entries:
+                self._sent.popitem(last=False)
+            # 发送顺序即时间顺序，从最旧的开始丢弃过期记录
+            while self._sent and now - next(iter(self._sent.values()))[3] >= self.ttl:
+                self._sent.popitem(last=False)
+        if sent is not None and base is not None and sent[0] == base and len(sent[1]) == len(cells):
+            return {'delta': encode_delta(sent[1], cells, sent[2], counters, version)}
+        return {'snapshot': encode_snapshot(cells, game.size, counters, version)}
+    
+    def forget(self, key: Hashable):
+        """丢弃接收方记录"""
+        with self._lock:
+            self._sent.pop(key, None)
@@ -19,6 +19,42 @@ document.addEventListener('DOMContentLoaded', function() {
     const finalScoreElement = document.getElementById('final-score');
     const leaderboardList = document.getElementById('leaderboard-list');
     
+    // 排行榜推送：订阅成功后停止轮询，连接断开时恢复轮询
+    let leaderboardScores = [];
+    let leaderboardPushed = false;
+    // 移动通道：连接可用时移动走Socket.IO，按序号丢弃过期的回复
+    let socket = null;
+    let moveSeq = 0;
+    let lastMoveSeq = 0;
+    // REST批量移动：请求进行中的按键先排队，返回后一次提交
+    let pendingMoves = [];
+    let movesInFlight = false;
+    let stateVersion = null;
+    // 紧凑状态：Socket.IO移动只接收变化格子的增量
+    let stateCells = null;
+    let cellsVersion = null;
+    let stateCounters = {};
+    if (typeof io !== 'undefined') {
+        socket = io();
+        socket.on('connect', () => {
+            // 重连后（可能是服务器重启）版本序号重新开始，下一次移动取完整快照
+            cellsVersion = null;
+            socket.emit('subscribe_leaderboard', {});
+        });
+        socket.on('leaderboard_snapshot', snapshot => {
+            leaderboardPushed = true;
+            leaderboardScores = snapshot.scores;
+            renderLeaderboard(leaderboardScores);
+        });
+        socket.on('leaderboard_diff', diff => {
+            leaderboardScores = applyLeaderboardDiff(leaderboardScores, diff);
+            renderLeaderboard(leaderboardScores);
+        });
+        socket.on('disconnect', () => {
+            leaderboardPushed = false;
+        });
+    }
+    
     // 虚拟方向键
     const upBtn = document.getElementById('up-btn');
     const downBtn = document.getElementById('down-btn');
@@ -52,6 +88,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             if (!data.error) {
                 gameState = data;
+                stateVersion = data.version;
                 renderGrid();
                 updateScore();
                 loadLeaderboard();
@@ -77,6 +114,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const data = await response.json();
             gameState = data;
+            stateVersion = data.version;
             renderGrid();
             updateScore();
             hideMessages();
@@ -132,29 +170,138 @@ document.addEventListener('DOMContentLoaded', function() {
     async function makeMove(direction) {
         if (!gameState || gameState.game_over) return;
         
+        if (socket && socket.connected) {
+            const seq = ++moveSeq;
+            const base = cellsVersion;
+            socket.emit('move', { seq, direction, compact: true, base }, data => {
+                if (data.error || !data.applied || data.seq < lastMoveSeq) return;
+                lastMoveSeq = data.seq;
+                if (!applyCompactState(data, base)) {
+                    resyncCompactState();
+                    return;
+                }
+                handleMoveResult(data).catch(error => console.error('移动失败:', error));
+            });
+            return;
+        }
+        
+        pendingMoves.push(direction);
+        await flushMoves();
+    }
+    
+    // 提交排队的移动，版本冲突时以服务器状态为准并丢弃队列
+    async function flushMoves() {
+        if (movesInFlight || pendingMoves.length === 0) return;
+        const directions = pendingMoves.splice(0, pendingMoves.length);
+        movesInFlight = true;
+        
         try {
-            const response = await fetch('/api/game/move', {
+            const response = await fetch('/api/game/moves', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ direction })
+                body: JSON.stringify({ directions, version: stateVersion })
             });
-            
             const data = await response.json();
             
-            if (data.moved) {
+            if (data.error === 'Version conflict') {
+                pendingMoves = [];
+                stateVersion = data.version;
                 gameState = data.state;
                 renderGrid();
                 updateScore();
-                
-                if (gameState.won) {
-                    showGameWon();
-                } else if (gameState.game_over) {
-                    showGameOver();
-                    await recordScore();
-                }
+            } else if (!data.error) {
+                await handleMoveResult(data);
             }
         } catch (error) {
             console.error('移动失败:', error);
+        } finally {
+            movesInFlight = false;
+        }
+        await flushMoves();
+    }
+    
+    // 解码紧凑状态（快照或增量）为完整状态；增量相对请求时声明的base，本地状态已不是base时返回false
+    function applyCompactState(data, base) {
+        const packed = data.snapshot || data.delta;
+        if (data.snapshot) {
+            stateCells = Uint8Array.from(atob(packed.c), ch => ch.charCodeAt(0));
+            stateCounters = { size: packed.n };
+        } else {
+            if (!stateCells || base === null || base !== cellsVersion) return false;
+            const bytes = Uint8Array.from(atob(packed.d), ch => ch.charCodeAt(0));
+            let offset = (stateCells.length + 7) >> 3;
+            for (let i = 0; i < stateCells.length; i++) {
+                if ((bytes[i >> 3] >> (i & 7)) & 1) {
+                    stateCells[i] = bytes[offset++];
+                }
+            }
+        }
+        cellsVersion = packed.v;
+        ['s', 'h', 'm', 'w', 'o'].forEach(key => {
+            if (key in packed) stateCounters[key] = packed[key];
+        });
+        if (data.delta && !('h' in packed)) {
+            stateCounters.h = Math.max(stateCounters.h, stateCounters.s);
+        }
+        
+        const size = stateCounters.size;
+        const grid = [];
+        let maxTile = 0;
+        for (let i = 0; i < size; i++) {
+            const row = [];
+            for (let j = 0; j < size; j++) {
+                const exponent = stateCells[i * size + j];
+                const value = exponent ? 2 ** exponent : 0;
+                maxTile = Math.max(maxTile, value);
+                row.push(value);
+            }
+            grid.push(row);
+        }
+        data.state = {
+            grid: grid,
+            size: size,
+            score: stateCounters.s,
+            high_score: stateCounters.h,
+            moves: stateCounters.m,
+            won: stateCounters.w,
+            game_over: stateCounters.o,
+            max_tile: maxTile
+        };
+        return true;
+    }
+    
+    // 增量无法应用时重新获取紧凑快照
+    function resyncCompactState() {
+        cellsVersion = null;
+        fetch('/api/game/state?compact=1')
+            .then(response => response.json())
+            .then(data => {
+                if (!data.error && applyCompactState(data)) {
+                    stateVersion = data.version;
+                    gameState = data.state;
+                    renderGrid();
+                    updateScore();
+                }
+            })
+            .catch(console.error);
+    }
+    
+    // 处理移动结果（REST和Socket.IO的结果格式相同）
+    async function handleMoveResult(data) {
+        if (data.version !== undefined) {
+            stateVersion = data.version;
+        }
+        if (data.moved) {
+            gameState = data.state;
+            renderGrid();
+            updateScore();
+            
+            if (gameState.won) {
+                showGameWon();
+            } else if (gameState.game_over) {
+                showGameOver();
+                await recordScore();
+            }
         }
     }
     
@@ -183,7 +330,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
             });
             
-            await loadLeaderboard();
+            // 已订阅推送时排行榜变化会以差异推送过来，无需再请求
+            if (!leaderboardPushed) {
+                await loadLeaderboard();
+            }
         } catch (error) {
             console.error('记录分数失败:', error);
         }
@@ -241,27 +391,48 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error('排行榜数据格式错误');
             }
             
-            leaderboardList.innerHTML = '';
-            const validScores = scores.filter(score => score && score.score > 0);
-            validScores.slice(0, 5).forEach((score, index) => {
-                const item = document.createElement('div');
-                item.className = 'leaderboard-item';
-                item.innerHTML = `
-                    <span>${index + 1}. ${score.player_name || '匿名玩家'}</span>
-                    <span>${score.score}分</span>
-                `;
-                leaderboardList.appendChild(item);
-            });
-            
-            if (validScores.length === 0) {
-                leaderboardList.innerHTML = '<div class="leaderboard-item">暂无数据</div>';
-            }
+            renderLeaderboard(scores);
         } catch (error) {
             console.error('加载排行榜失败:', error);
             leaderboardList.innerHTML = '<div class="leaderboard-item">加载失败</div>';
         }
     }
     
+    // 渲染排行榜
+    function renderLeaderboard(scores) {
+        leaderboardList.innerHTML = '';
+        const validScores = scores.filter(score => score && score.score > 0);
+        validScores.slice(0, 5).forEach((score, index) => {
+            const item = document.createElement('div');
+            item.className = 'leaderboard-item';
+            item.innerHTML = `
+                <span>${index + 1}. ${score.player_name || '匿名玩家'}</span>
+                <span>${score.score}分</span>
+            `;
+            leaderboardList.appendChild(item);
+        });
+        
+        if (validScores.length === 0) {
+            leaderboardList.innerHTML = '<div class="leaderboard-item">暂无数据</div>';
+        }
+    }
+    
+    // 按推送的差异更新本地排行榜（未变化的记录名次不变）
+    function applyLeaderboardDiff(scores, diff) {
+        const changed = diff.entered.concat(diff.moved);
+        const removed = new Set(diff.left.concat(changed.map(item => item.entry.player_name)));
+        const result = [];
+        scores.forEach((entry, index) => {
+            if (!removed.has(entry.player_name)) {
+                result[index] = entry;
+            }
+        });
+        changed.forEach(item => {
+            result[item.rank - 1] = item.entry;
+        });
+        return result.filter(Boolean);
+    }
+    
     // 显示游戏结束
     function showGameOver() {
         finalScoreElement.textContent = gameState.score;
@@ -286,8 +457,12 @@ document.addEventListener('DOMContentLoaded', function() {
     window.newGame = newGame;
     window.continueGame = hideMessages;
     
-    // 设置定时器，每2秒更新一次排行榜（更快更新）
-    setInterval(loadLeaderboard, 1000);
+    // 设置定时器，每秒更新一次排行榜（已订阅推送时跳过）
+    setInterval(() => {
+        if (!leaderboardPushed) {
+            loadLeaderboard();
+        }
+    }, 1000);
     
     // 页面可见性变化时更新
     document.addEventListener('visibilitychange', function() {
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""测试公共设置：从项目根目录导入game、server和utils包；在临时目录中创建应用"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmarks  # noqa: E402
+
+
+@pytest.fixture
+def isolated_app():
+    """返回在临时目录中创建应用的create_app，见benchmarks.isolated_app"""
+    with benchmarks.isolated_app() as create_app:
+        yield create_app
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""批量模拟器：每盘给定种子时，与相同种子和移动序列的CachedGame2048逐步一致"""
+
+import random
+
+import pytest
+
+from game.batch import BatchGame2048, DIRECTIONS
+from game.cached_game import CachedGame2048
+
+
+@pytest.mark.parametrize('size', [4, 5, 8])
+def test_matches_cached_engine(size):
+    count = 16
+    seeds = [size * 1000 + i for i in range(count)]
+    batch = BatchGame2048(count, size, seeds=seeds)
+    games = [CachedGame2048(size, seed=s) for s in seeds]
+    rng = random.Random(size)
+    for step in range(2000):
+        for i, game in enumerate(games):
+            assert batch.get_state(i) == game.get_state(), f"第{step}步第{i}盘不一致"
+        if all(game.game_over for game in games):
+            break
+        codes = [rng.randrange(4) for _ in games]
+        score_delta, moved, game_over = batch.step(codes)
+        for i, (game, code) in enumerate(zip(games, codes)):
+            before = game.score
+            assert bool(moved[i]) == game.move(DIRECTIONS[code])
+            assert int(score_delta[i]) == game.score - before
+            assert bool(game_over[i]) == game.game_over
+    # 4x4棋盘在随机移动下都能走到结束，覆盖了游戏结束后被跳过的棋盘
+    if size == 4:
+        assert all(game.game_over for game in games)
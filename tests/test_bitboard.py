@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""位棋盘引擎：相同种子和移动序列下与CachedGame2048的4x4棋盘逐步一致"""
+
+import random
+
+import pytest
+
+from game.bitboard import BitboardGame2048
+from game.cached_game import CachedGame2048
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_cached_engine(seed):
+    bitboard = BitboardGame2048(seed=seed)
+    cached = CachedGame2048(4, seed=seed)
+    rng = random.Random(seed)
+    assert bitboard.get_state() == cached.get_state()
+    while not cached.game_over:
+        direction = rng.choice(('left', 'right', 'up', 'down'))
+        assert bitboard.move(direction) == cached.move(direction)
+        assert bitboard.get_state() == cached.get_state()
+    assert bitboard.game_over
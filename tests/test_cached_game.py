@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""CachedGame2048增量计数的随机性质测试：每次滑动和生成方块后与全量重新计数比较"""
+
+import random
+
+import pytest
+
+from game.cached_game import CachedGame2048
+from game.line_cache import LineCache
+
+DIRECTIONS = ('left', 'right', 'up', 'down')
+
+
+def recount(game):
+    """按棋盘全量计算空格数、每行空格数、可合并相邻对数和最大指数"""
+    grid = game.grid
+    n = game.size
+    row_empty = [row.count(0) for row in grid]
+    pairs = 0
+    for r in range(n):
+        for c in range(n):
+            value = grid[r][c]
+            if not value:
+                continue
+            pairs += c + 1 < n and grid[r][c + 1] == value
+            pairs += r + 1 < n and grid[r + 1][c] == value
+    return {
+        'empty_count': sum(row_empty),
+        'row_empty': row_empty,
+        'mergeable_pairs': pairs,
+        'max_exponent': max(max(row) for row in grid)
+    }
+
+
+def assert_counters(game):
+    expected = recount(game)
+    actual = {key: getattr(game, key) for key in expected}
+    assert actual == expected
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 5, 8])
+@pytest.mark.parametrize('seed', range(5))
+def test_counters_match_recount(size, seed):
+    # 很小的行缓存，让命中和淘汰都出现
+    game = CachedGame2048(size, seed=seed, cache=LineCache(max_size=8))
+    rng = random.Random(seed)
+    assert_counters(game)
+    for _ in range(2000):
+        if game.game_over:
+            assert game.empty_count == 0 and game.mergeable_pairs == 0
+            game = CachedGame2048(size, seed=rng.randrange(1 << 30), cache=game.cache)
+            assert_counters(game)
+        moved, _ = game._slide(rng.choice(DIRECTIONS))
+        assert_counters(game)
+        if moved:
+            game.add_random_tile()
+            assert_counters(game)
+        game.game_over = not game._can_move()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_counters_after_move_and_load(seed):
+    rng = random.Random(seed)
+    game = CachedGame2048(6, seed=seed)
+    for _ in range(500):
+        if game.move(rng.choice(DIRECTIONS)):
+            assert_counters(game)
+        if game.game_over:
+            break
+    # 解冻路径用load_exponents整体替换棋盘
+    other = CachedGame2048(6, seed=seed + 1)
+    other.load_exponents(game.pack_exponents())
+    assert other.grid == game.grid
+    assert_counters(other)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""GameStore降级和写日志与按键修改锁的配合，以及打包不改变游戏的随机数序列"""
+
+import os
+
+from game.engine import create_game, freeze_game, thaw_game
+from server.game_journal import GameJournal
+from server.game_store import GameStore
+
+DIRECTIONS = ('left', 'up', 'right', 'down')
+
+
+def other_key(store, key):
+    """取一个与key不共用分片锁的键"""
+    return next(k for k in map(str, range(1000)) if store.key_lock(k) is not store.key_lock(key))
+
+
+def test_freeze_does_not_change_future_spawns():
+    for size in (4, 6):
+        frozen = create_game(size, seed=3)
+        untouched = create_game(size, seed=3)
+        for i in range(200):
+            freeze_game(frozen)
+            frozen.move(DIRECTIONS[i % 4])
+            untouched.move(DIRECTIONS[i % 4])
+        assert frozen.get_state() == untouched.get_state()
+        data = freeze_game(frozen)
+        assert freeze_game(frozen) == data
+        assert thaw_game(data).get_state() == frozen.get_state()
+
+
+def test_flush_skips_game_being_edited(tmp_path):
+    journal = GameJournal(os.path.join(tmp_path, 'games.dat'))
+    store = GameStore(journal=journal)
+    store._loaded.set()
+    other = other_key(store, 'a')
+    store['a'] = create_game(4, seed=1)
+    store[other] = create_game(4, seed=2)
+    with store.key_lock('a'):
+        assert store.flush() == 1
+        assert store._dirty == {'a'}
+    assert store.flush() == 1
+    assert not store._dirty
+    store.close()
+    assert set(GameJournal(journal.path).load()) == {'a', other}
+
+
+def test_demotion_skips_game_being_edited():
+    store = GameStore(max_games=1)
+    other = other_key(store, 'a')
+    store['a'] = create_game(4, seed=1)
+    game = store.get('a')
+    with store.key_lock('a'):
+        store[other] = create_game(4, seed=2)
+        # 正在修改的a保持为活跃对象，改为降级另一个游戏
+        assert list(store._games) == ['a']
+        assert store._games['a'][0] is game
+        assert list(store._snapshots) == [other]
+    store['c'] = create_game(4, seed=3)
+    assert list(store._games) == ['c']
+    assert set(store._snapshots) == {'a', other}
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""排行榜：各分区的持久化与重启恢复、两种存储后端结果一致、快照写入互斥和interval策略的定时fsync"""
+
+import json
+import os
+import random
+import threading
+import time
+
+import pytest
+
+from server.leaderboard import LeaderboardManager
+from server.sqlite_leaderboard import SQLiteLeaderboardManager
+
+
+def open_board(tmp_path, storage):
+    """按存储方式打开临时目录中的排行榜"""
+    if storage == 'sqlite':
+        return SQLiteLeaderboardManager(os.path.join(tmp_path, 'leaderboard.db'), import_file=None)
+    return LeaderboardManager(os.path.join(tmp_path, 'leaderboard.json'), persistence=storage)
+
+
+def without_time(value):
+    """去掉记录中的时间戳，比较两个后端分别写入的同一组分数"""
+    if isinstance(value, list):
+        return [without_time(item) for item in value]
+    if isinstance(value, dict):
+        return {key: without_time(item) for key, item in value.items() if key != 'timestamp'}
+    return value
+
+
+@pytest.mark.parametrize('storage', ['journal', 'snapshot', 'sqlite'])
+def test_partition_best_survives_restart(tmp_path, storage):
+    board = open_board(tmp_path, storage)
+    assert board.add_or_update_score('alice', 1000, 64, 100, 4)
+    assert board.add_or_update_score('alice', 5000, 256, 300, 8)
+    # 不超过总榜最高分，但刷新了4x4榜和日/周榜中的4x4分区
+    assert board.add_or_update_score('alice', 1200, 128, 120, 4)
+    assert not board.add_or_update_score('alice', 1100, 128, 120, 4)
+    board.close()
+    
+    board = open_board(tmp_path, storage)
+    for window in ('all', 'daily', 'weekly'):
+        assert [e['score'] for e in board.get_top_scores(size=4, window=window)] == [1200]
+        assert [e['score'] for e in board.get_top_scores(size=8, window=window)] == [5000]
+        assert [e['score'] for e in board.get_top_scores(window=window)] == [5000]
+    board.close()
+
+
+def test_sqlite_matches_json(tmp_path):
+    json_board = LeaderboardManager(os.path.join(tmp_path, 'leaderboard.json'), persistence='journal')
+    sqlite_board = SQLiteLeaderboardManager(os.path.join(tmp_path, 'leaderboard.db'), import_file=None)
+    rng = random.Random(0)
+    for _ in range(2000):
+        args = (f"p{rng.randrange(200)}", rng.randrange(20000), 0, 0, rng.choice([4, 5, 6, 8]))
+        assert json_board.add_or_update_score(*args) == sqlite_board.add_or_update_score(*args)
+    
+    for window in ('all', 'daily', 'weekly'):
+        for size in (None, 4, 8, 7):
+            assert (without_time(json_board.get_top_scores(30, size, window))
+                    == without_time(sqlite_board.get_top_scores(30, size, window)))
+            assert json_board.get_stats(size, window) == sqlite_board.get_stats(size, window)
+            for score in (0, 10000, 19999, 30000):
+                assert (json_board.get_score_percentile(score, size, window)
+                        == sqlite_board.get_score_percentile(score, size, window))
+            for player in ('p1', 'p50', 'nobody'):
+                assert (without_time(json_board.get_player_rank(player, size, window, around=3))
+                        == without_time(sqlite_board.get_player_rank(player, size, window, around=3)))
+    json_board.close()
+    sqlite_board.close()
+
+
+def test_concurrent_snapshot_saves(tmp_path):
+    data_file = os.path.join(tmp_path, 'leaderboard.json')
+    manager = LeaderboardManager(data_file, persistence='snapshot')
+    
+    def submit(worker):
+        for i in range(20):
+            manager.add_or_update_score(f"p{worker}_{i}", 100 + i, 8, 10, 4)
+    
+    threads = [threading.Thread(target=submit, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(data_file, encoding='utf-8') as f:
+        assert len(json.load(f)) == 80
+    assert len(LeaderboardManager(data_file).get_top_scores(100)) == 80
+
+
+def test_interval_fsync_after_idle(tmp_path, monkeypatch):
+    data_file = os.path.join(tmp_path, 'leaderboard.json')
+    manager = LeaderboardManager(data_file, persistence='journal', fsync='interval', fsync_interval=0.2)
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: synced.append(fd) or real_fsync(fd))
+    
+    manager.add_or_update_score('alice', 100, 8, 10, 4)
+    manager.add_or_update_score('bob', 200, 8, 10, 4)
+    # 第一条立即同步，第二条在间隔之内，写入停顿后由定时器同步
+    assert len(synced) == 1
+    time.sleep(0.5)
+    assert len(synced) == 2
+    manager.close()
+
+
+class FakeSocketIO:
+    """记录emit的SocketIO替身，后台任务用线程运行"""
+    
+    def __init__(self):
+        self.emitted = []
+    
+    def start_background_task(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+    
+    def sleep(self, seconds):
+        time.sleep(seconds)
+    
+    def emit(self, event, data, to=None, ignore_queue=False):
+        self.emitted.append((event, data, to))
+
+
+def test_sqlite_shared_between_processes(tmp_path):
+    from server.leaderboard_push import LeaderboardPublisher
+    
+    # 两个管理器打开同一数据库，相当于两个工作进程
+    db_file = os.path.join(tmp_path, 'leaderboard.db')
+    first = SQLiteLeaderboardManager(db_file, import_file=None)
+    second = SQLiteLeaderboardManager(db_file, import_file=None)
+    socketio = FakeSocketIO()
+    publisher = LeaderboardPublisher(socketio, second, max_rate=20.0, remote=True)
+    publisher.subscribe('sid', 4)
+    
+    first.add_or_update_score('alice', 1000, 64, 100, 4)
+    second.add_or_update_score('bob', 900, 64, 100, 4)
+    first.add_or_update_score('carol', 900, 64, 100, 4)
+    assert first.version == second.version == 3
+    # 同分按写入顺序排名，序号跨进程递增
+    assert [e['player_name'] for e in second.get_top_scores()] == ['alice', 'bob', 'carol']
+    
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        entered = [item['entry']['player_name'] for event, diff, _ in socketio.emitted for item in diff['entered']]
+        if 'carol' in entered:
+            break
+        time.sleep(0.05)
+    assert 'carol' in entered
+    assert socketio.emitted[-1][1]['version'] == 3
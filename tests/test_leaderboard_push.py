@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""排行榜推送：50个订阅者与50个每秒轮询的客户端在同一段写入突发中的请求数和消息数"""
+
+import random
+import time
+
+from flask import request
+
+import server.flask_app
+
+CLIENTS = 50
+SECONDS = 4
+WRITES_PER_SECOND = 10
+
+
+def apply_diff(scores, diff):
+    """按前端applyLeaderboardDiff的规则把差异应用到前N名上"""
+    changed = diff['entered'] + diff['moved']
+    removed = set(diff['left']) | {item['entry']['player_name'] for item in changed}
+    result = {rank: entry for rank, entry in enumerate(scores, 1) if entry['player_name'] not in removed}
+    result.update((item['rank'], item['entry']) for item in changed)
+    return [result[rank] for rank in sorted(result)]
+
+
+def test_push_replaces_polling(isolated_app):
+    """订阅者不再发GET，收到的差异不多于改变前N名的写入次数，且还原出的排行榜与服务器一致"""
+    app = isolated_app()
+    socketio = app.extensions['socketio']
+    board = server.flask_app.leaderboard
+    rng = random.Random(0)
+    for i in range(200):
+        board.add_or_update_score(f"玩家_{i}", 10000 + rng.randrange(10000), 0, 0, 4)
+
+    gets = []
+
+    @app.before_request
+    def count_gets():
+        if request.method == 'GET' and request.path == '/api/leaderboard':
+            gets.append(request.path)
+
+    subscribers = [socketio.test_client(app) for _ in range(CLIENTS)]
+    for client in subscribers:
+        client.emit('subscribe_leaderboard', {})
+    pollers = [app.test_client() for _ in range(CLIENTS)]
+
+    # 写入突发：每秒若干名新玩家提交分数，隔一秒有一个分数进入前N名；轮询客户端每秒各请求一次排行榜
+    top_changes = 0
+    for second in range(SECONDS):
+        for i in range(WRITES_PER_SECOND):
+            score = 20000 + second if second % 2 == 0 and i == 0 else rng.randrange(10000)
+            before = board.get_top_scores()
+            app.test_client().post('/api/game/scores', json={'score': score, 'size': 4})
+            top_changes += board.get_top_scores() != before
+        for client in pollers:
+            assert client.get('/api/leaderboard').status_code == 200
+        time.sleep(1.0)
+    time.sleep(1.0)
+
+    pushed = 0
+    for client in subscribers:
+        received = client.get_received()
+        snapshot = [m['args'][0] for m in received if m['name'] == 'leaderboard_snapshot']
+        diffs = [m['args'][0] for m in received if m['name'] == 'leaderboard_diff']
+        assert len(snapshot) == 1
+        pushed += len(diffs)
+        scores = snapshot[0]['scores']
+        for diff in diffs:
+            scores = apply_diff(scores, diff)
+        assert scores == board.get_top_scores()
+        client.disconnect()
+
+    polled = len(gets)
+    assert polled == CLIENTS * SECONDS
+    # 订阅者只在订阅时发出一次请求，之后没有GET
+    assert CLIENTS < polled
+    # 进不了前N名的写入不推送：每个订阅者收到的差异不多于改变前N名的写入次数
+    assert top_changes == SECONDS // 2
+    assert 0 < pushed <= CLIENTS * top_changes < polled
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""行转换缓存：slide_line与逐格合并的朴素实现一致；LRU淘汰下命中和未命中计数正确"""
+
+import itertools
+import random
+
+from game.line_cache import LineCache, slide_line
+
+
+def plain_slide(line):
+    """逐格向起点滑动合并，每个方块每次移动最多合并一次"""
+    cells = list(line)
+    merged = [False] * len(cells)
+    score = 0
+    for i in range(1, len(cells)):
+        if not cells[i]:
+            continue
+        j = i
+        while j > 0 and not cells[j - 1]:
+            cells[j - 1], cells[j] = cells[j], 0
+            merged[j - 1], merged[j] = merged[j], False
+            j -= 1
+        if j > 0 and cells[j - 1] == cells[j] and not merged[j - 1]:
+            cells[j - 1] += 1
+            cells[j] = 0
+            merged[j - 1] = True
+            score += 1 << cells[j - 1]
+    return tuple(cells), score, tuple(cells) != tuple(line)
+
+
+def test_slide_line_matches_plain_merge():
+    for length in range(1, 6):
+        for line in itertools.product(range(4), repeat=length):
+            assert slide_line(line) == plain_slide(line), line
+    rng = random.Random(0)
+    for _ in range(2000):
+        line = tuple(rng.choice((0, 0, 1, 2, 3, 11, 17)) for _ in range(rng.randint(6, 12)))
+        assert slide_line(line) == plain_slide(line), line
+
+
+def test_lru_accounting_under_eviction():
+    cache = LineCache(max_size=2)
+    a, b, c = (1, 1, 0, 0), (0, 2, 0, 2), (3, 0, 0, 0)
+    assert cache.slide(a) == slide_line(a)
+    assert cache.slide(b) == slide_line(b)
+    assert cache.slide(a) == slide_line(a)
+    # 缓存已满，插入c淘汰最久未使用的b
+    assert cache.slide(c) == slide_line(c)
+    assert cache.slide(a) == slide_line(a)
+    assert cache.slide(b) == slide_line(b)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 4, 2, 2)
+    assert stats['hit_rate'] == 2 / 6
+
+    # 随机访问与参照LRU模型逐次比较
+    cache.clear()
+    assert cache.get_stats()['hits'] == cache.get_stats()['misses'] == 0
+    cache.max_size = 8
+    model, hits, misses, evictions = [], 0, 0, 0
+    rng = random.Random(1)
+    for _ in range(5000):
+        line = tuple(rng.randrange(3) for _ in range(4))
+        if line in model:
+            model.remove(line)
+            hits += 1
+        else:
+            misses += 1
+            if len(model) == cache.max_size:
+                model.pop(0)
+                evictions += 1
+        model.append(line)
+        assert cache.slide(line) == slide_line(line)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (hits, misses, evictions)
+    assert 0 < evictions and 0 < hits
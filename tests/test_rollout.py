@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""蒙特卡洛推演：完整评估的结果与进程数无关，某方向明显占优时提前停止"""
+
+import pytest
+
+from game.bitboard import BitboardGame2048
+from game.rollout import RolloutEvaluator
+
+
+@pytest.fixture(scope='module')
+def game():
+    game = BitboardGame2048(seed=1)
+    for direction in ('left', 'up', 'right', 'down') * 5:
+        game.move(direction)
+    return game
+
+
+def test_same_direction_with_one_and_many_workers(game):
+    """不提前停止时各任务种子由方向和批次确定，1个与多个进程得到相同的统计和推荐"""
+    results = []
+    for workers in (1, 3):
+        with RolloutEvaluator(workers=workers, batch_size=20, seed=7) as evaluator:
+            results.append(evaluator.evaluate(game, batches=4, min_samples=10 ** 9))
+    single, pooled = results
+    assert not single['stopped_early'] and not pooled['stopped_early']
+    assert single['direction'] == pooled['direction']
+    for direction, stats in single['moves'].items():
+        assert stats['count'] == pooled['moves'][direction]['count'] == 80
+        assert stats['mean'] == pytest.approx(pooled['moves'][direction]['mean'])
+
+
+def test_stops_early_when_one_direction_dominates():
+    """只剩左右可走且向左明显更好的残局：默认置信倍数下首轮任务后即停止，未用完全部任务"""
+    game = BitboardGame2048(seed=0)
+    game.load_exponents(bytes.fromhex('01010304020501020402030103050102'))
+    with RolloutEvaluator(workers=1, batch_size=20, seed=7) as evaluator:
+        result = evaluator.evaluate(game, batches=8, min_samples=20)
+    assert result['stopped_early']
+    assert result['direction'] == 'left'
+    assert sum(stats['count'] for stats in result['moves'].values()) < 8 * 20 * len(result['moves'])
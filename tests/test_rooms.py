@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""多人房间：多个房间并发操作时每个房间的广播有序、一致，并与服务器状态相符"""
+
+import threading
+
+from server.state_codec import decode_snapshot
+
+DIRECTIONS = ('move_left', 'move_up', 'move_right', 'move_down')
+
+
+def test_concurrent_rooms_broadcast_in_order(isolated_app):
+    """每个客户端在自己的线程中连续发送移动，检查广播序号、成员间一致性和最后的房间状态"""
+    app = isolated_app()
+    socketio = app.extensions['socketio']
+    room_count, clients_per_room, actions = 8, 4, 30
+    members = {}
+    for r in range(room_count):
+        room_id = f"stress-{r}"
+        members[room_id] = []
+        for _ in range(clients_per_room):
+            client = socketio.test_client(app)
+            client.emit('join_room', {'room_id': room_id})
+            client.emit('game_action', {'room_id': room_id, 'action': 'new_game', 'size': 4})
+            members[room_id].append(client)
+    for clients in members.values():
+        for client in clients:
+            client.get_received()
+
+    def play(client, room_id, offset):
+        for i in range(actions):
+            client.emit('game_action', {'room_id': room_id, 'action': DIRECTIONS[(i + offset) % 4]})
+
+    threads = [threading.Thread(target=play, args=(client, room_id, n))
+               for room_id, clients in members.items() for n, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    broadcasts = 0
+    for room_id, clients in members.items():
+        streams = [[m['args'][0] for m in client.get_received() if m['name'] == 'game_state'] for client in clients]
+        broadcasts += len(streams[0])
+        assert all(stream == streams[0] for stream in streams[1:]), f"{room_id}: 成员收到的广播不一致"
+        seqs = [state['seq'] for state in streams[0]]
+        assert seqs == list(range(seqs[0], seqs[0] + len(seqs))), f"{room_id}: 广播序号不连续"
+        # 以紧凑协议加入，取服务器当前的房间快照与最后一次广播比较
+        last = streams[0][-1]
+        probe = socketio.test_client(app)
+        probe.emit('join_room', {'room_id': room_id, 'compact': True})
+        snapshot = [m['args'][0] for m in probe.get_received() if m['name'] == 'game_delta'][-1]['snapshot']
+        expected = [value.bit_length() - 1 if value else 0 for row in last['grid'] for value in row]
+        assert snapshot['v'] == last['seq'], f"{room_id}: 最后的广播序号与服务器状态不一致"
+        assert list(decode_snapshot(snapshot)) == expected, f"{room_id}: 最后的广播与服务器状态不一致"
+        probe.disconnect()
+    assert broadcasts > 0
+    for clients in members.values():
+        for client in clients:
+            client.disconnect()
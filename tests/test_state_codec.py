@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""紧凑状态编码：按客户端的规则应用增量后与游戏状态一致，版本为每个游戏自己的小序号"""
+
+import random
+import time
+
+import pytest
+
+from game.cached_game import CachedGame2048
+from game.engine import pack_game
+from server.game_store import GameStore
+from server.state_backend import LocalBackend
+from server.state_codec import COUNTER_KEYS, StateEncoder, apply_delta, decode_snapshot
+
+
+def apply_counters(counters, packed, delta):
+    """与前端applyCompactState相同：只更新带出的字段，增量省略h时取原最高分与新分数的较大者"""
+    counters.update((key, packed[key]) for key in COUNTER_KEYS if key in packed)
+    if delta and 'h' not in packed:
+        counters['h'] = max(counters['h'], counters['s'])
+
+
+@pytest.mark.parametrize('size', [4, 6, 10])
+def test_client_reconstructs_state(size):
+    backend = LocalBackend(GameStore())
+    encoder = StateEncoder()
+    rng = random.Random(size)
+    with backend.edit('s') as entry:
+        entry.update(CachedGame2048(size, seed=size))
+    snapshot = encoder.encode('s', entry.game, entry.version)['snapshot']
+    cells, counters, held = decode_snapshot(snapshot), dict(snapshot), snapshot['v']
+    for step in range(300):
+        with backend.edit('s') as entry:
+            if entry.game.game_over or step == 150:
+                entry.update(CachedGame2048(size, seed=step))
+            elif entry.game.move(rng.choice(('left', 'right', 'up', 'down'))):
+                entry.update()
+            payload = encoder.encode('s', entry.game, entry.version, held)
+        delta = payload['delta']
+        assert 'b' not in delta
+        apply_delta(cells, delta)
+        apply_counters(counters, delta, True)
+        held = delta['v']
+        game = entry.game
+        assert bytes(cells) == pack_game(game)
+        assert [counters[key] for key in COUNTER_KEYS] == [game.score, game.high_score, game.moves,
+                                                             game.won, game.game_over]
+    # 版本是该游戏自己的序号，每次变化加1
+    assert held == backend.get('s').version <= 301
+
+
+def test_encoder_records_are_bounded(monkeypatch):
+    """超出容量或过期的接收方记录被丢弃，之后该接收方收到完整快照"""
+    encoder = StateEncoder(max_entries=3, ttl=60.0)
+    game = CachedGame2048(4, seed=0)
+    for key in range(5):
+        encoder.encode(key, game, 1)
+    assert list(encoder._sent) == [2, 3, 4]
+    assert 'snapshot' in encoder.encode(0, game, 1, 1)
+    assert 'delta' in encoder.encode(4, game, 1, 1)
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 61.0)
+    encoder.encode('late', game, 1)
+    assert list(encoder._sent) == ['late']
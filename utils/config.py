@@ -18,12 +18,61 @@ class GameConfig:
                 "min_size": 4,
                 "max_size": 10,
                 "mobile_max_size": 8,
-                "target_score": 2048
+                "target_score": 2048,
+                "engine": "auto",
+                "line_cache_size": 65536,
+                "hint_budget_ms": 200,
+                "hint_max_budget_ms": 2000,
+                "hint_workers": 2,
+                "hint_table_size": 100000
+            },
+            "leaderboard": {
+                "storage": "json",
+                "database": "leaderboard.db",
+                "data_file": "leaderboard.json",
+                "persistence": "journal",
+                "fsync": "interval",
+                "fsync_interval": 1.0,
+                "compact_bytes": 1048576,
+                # flush_interval和flush_max_dirty只用于persistence为snapshot时合并快照写入；
+                # journal模式每次写入追加一行日志，fsync按fsync_interval合并
+                "flush_interval": 1.0,
+                "flush_max_dirty": 100,
+                "response_cache_size": 256,
+                "push_top_n": 10,
+                "push_max_rate": 2.0
+            },
+            "rooms": {
+                "empty_ttl": 300,
+                "idle_ttl": 86400,
+                "sweep_interval": 60,
+                "spectator_max_rate": 5.0
+            },
+            "state": {
+                "backend": "local",
+                "address": "127.0.0.1:5099",
+                "key_file": "game_state.key"
+            },
+            "game_store": {
+                "max_games": 1000,
+                "idle_ttl": 600,
+                "max_snapshots": 20000,
+                "snapshot_ttl": 86400,
+                "sweep_interval": 30,
+                "persist_file": "game_sessions.dat",
+                "persist_interval": 5,
+                "compact_bytes": 4194304
             },
             "server": {
                 "host": "0.0.0.0",
+                # 桌面端内嵌服务器默认只监听127.0.0.1，为true时才按host对局域网开放
+                "desktop_lan": False,
                 "port": 5000,
-                "debug": False
+                "debug": False,
+                "runtime": "threading",
+                "drain_timeout": 10,
+                "hint_processes": 0,
+                "workers": 1
             },
             "ui": {
                 "window_width": 800,